@@ -1,102 +1,159 @@
 import html
-from time import time
+import json
+import logging
+import os
+import queue
+from time import time, monotonic
 from datetime import datetime
 import re
 import secrets
+from contextvars import copy_context
+from operator import attrgetter
 from urllib.parse import quote
 
+import requests
 from firebase_admin import db
 from concurrent.futures import ThreadPoolExecutor
-from flask import Blueprint, request, session, redirect, jsonify
+from flask import Blueprint, request, session, redirect, jsonify, Response, stream_with_context
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 from flask_limiter.errors import RateLimitExceeded
 
-from config.settings import API_BASE, BOT_TOKEN, CLIENT_ID, CLIENT_SECRET, REDIRECT_URI, PAYPAL_CLIENT_ID, PAYPAL_CLIENT_SECRET, PAYPAL_API_BASE, PREMIUM_ONE_TIME_PRICE, ALLOWED_PREMIUM_SERVERS
-from utils.firebase import save_user_to_firebase, save_experience_request, get_user_experiences, approve_experience, reject_experience, update_experience_end_date, get_all_experiences_for_server, get_user_data, log_history, get_experience_history, get_user_info_short
+from config.settings import API_BASE, BOT_TOKEN, CLIENT_ID, CLIENT_SECRET, REDIRECT_URI, PAYPAL_CLIENT_ID, PREMIUM_ONE_TIME_PRICE
+from utils.firebase import save_user_to_firebase, save_experience_request, get_user_experiences, get_user_experiences_by_status, approve_experience, reject_experience, update_experience_end_date, get_all_experiences_for_server, get_user_data, log_history, get_experience_history, get_user_info_short, moderate_experiences, get_latest_server_request, get_server_registry_page, make_server_experience_record, get_payment_order, claim_payment_order, grant_premium_for_order, get_server_meta, save_server_meta, server_meta_from_guild, resolve_vanity, invalidate_vanity, invalidate_user_info
+from utils.paypal import get_order as get_paypal_order
+from utils.entitlements import EXP_LIMIT_FREE, DESC_LIMIT_FREE, DESC_LIMIT_PREMIUM, SOCIAL_LIMIT_FREE, SOCIAL_LIMIT_PREMIUM, get_entitlements, invalidate_entitlements, is_premium_offer_server, can_redeem_server_premium
 from utils.request import requests_session
-from utils.theme import wrap_page, error_page
-
-PERMISSIONS = {
-    1: "Create Instant Invite",
-    2: "Kick Members",
-    4: "Ban Members",
-    8: "Administrator",
-    16: "Manage Channels",
-    32: "Manage Guild",
-    64: "Add Reactions",
-    128: "View Audit Log",
-    256: "Priority Speaker",
-    512: "Stream",
-    1024: "View Channel",
-    2048: "Send Messages",
-    4096: "Send TTS Messages",
-    8192: "Manage Messages",
-    16384: "Embed Links",
-    32768: "Attach Files",
-    65536: "Read Message History",
-    131072: "Mention Everyone",
-    262144: "Use External Emojis",
-    524288: "View Guild Insights",
-    1048576: "Connect",
-    2097152: "Speak",
-    4194304: "Mute Members",
-    8388608: "Deafen Members",
-    16777216: "Move Members",
-    33554432: "Use VAD",
-    67108864: "Change Nickname",
-    134217728: "Manage Nicknames",
-    268435456: "Manage Roles",
-    536870912: "Manage Webhooks",
-    1073741824: "Manage Emojis and Stickers",
-    2147483648: "Use Application Commands",
-    4294967296: "Request to Speak",
-    8589934592: "Manage Events",
-    17179869184: "Manage Threads",
-    34359738368: "Create Public Threads",
-    68719476736: "Create Private Threads",
-    137438953472: "Use External Stickers",
-    274877906944: "Send Messages in Threads",
-    549755813888: "Use Embedded Activities",
-    1099511627776: "Moderate Members",
-}
-
-MOD_PERMS = ["Manage Channels", "Manage Guild", "Kick Members", "Ban Members", "Manage Messages", "Manage Nicknames", "Manage Roles", "Manage Webhooks"]
-
-EXP_LIMIT_FREE = 5
-DESC_LIMIT_FREE = 200
-DESC_LIMIT_PREMIUM = 3000
-SOCIAL_LIMIT_FREE = 3
-SOCIAL_LIMIT_PREMIUM = 10
-
-def get_permissions_list(perm_int):
-    perms = []
-    for bit, name in PERMISSIONS.items():
-        if perm_int & bit:
-            perms.append(name)
-    return perms
+from utils.resilience import get_breaker
+from utils.permissions import classify_guild, classify_guilds
+from utils.cache import TTLCache
+from utils.live import LiveUnavailable, subscribe, unsubscribe
+from utils.search import SearchUnavailable, query_search_index
+from utils.snapshots import is_crawler
+from utils.images import discord_image_url
+from utils.stats import record_experience_change, record_experience_changes, get_server_stats
+from utils.theme import wrap_page, wrap_page_parts, error_page
+
+REGISTRY_PAGE_SIZE = int(os.environ.get("REGISTRY_PAGE_SIZE", 25))
+
+SSE_KEEPALIVE = 15
+SSE_MAX_AGE = int(os.environ.get("SSE_MAX_AGE", 300))
+# How often the server view reloads when it can't get a live stream
+LIVE_POLL_INTERVAL = int(os.environ.get("LIVE_POLL_INTERVAL", 30))
+
+BULK_ACTIONS = ("approve", "reject", "delete")
+BULK_LIMIT = int(os.environ.get("BULK_MODERATION_LIMIT", 100))
+
+# Role decisions are reused for a short while so moderation bursts don't refetch the guild list per item
+ROLE_CACHE_TTL = int(os.environ.get("ROLE_CACHE_TTL", 60))
+role_cache = TTLCache("user_role", ROLE_CACHE_TTL)
+
+PAYPAL_ORDER_ID_RE = re.compile(r"^[A-Za-z0-9-]{1,64}$")
+# Failures that say nothing about the order itself (RetryError: PayPal kept returning 5xx)
+PAYPAL_UNAVAILABLE_ERRORS = (requests.exceptions.ConnectionError, requests.exceptions.Timeout, requests.exceptions.RetryError)
+
+GUILD_PROFILE_TTL = int(os.environ.get("GUILD_PROFILE_TTL", 6 * 3600))
+# Last good copy of each guild, served while Discord is unreachable
+guild_profile_cache = TTLCache("discord_guild", GUILD_PROFILE_TTL, maxsize=2000)
+
+SEARCH_PAGE_SIZE = int(os.environ.get("SEARCH_PAGE_SIZE", 20))
+SEARCH_PAGE_MAX = 50
+SEARCH_ESCAPED_FIELDS = ("role_title", "server_name", "description", "user_name", "approver_name")
+
+CRAWLER_DASHBOARD_HTML = """<!DOCTYPE html>
+            <html lang="en">
+            <head>
+                <title>ServerCV | Showcase Your Discord Experience</title>
+                <meta name="description" content="Build a verified portfolio of your server contributions. Perfect for staff applications and sharing your achievements in the Discord community.">
+                <meta name="author" content="ServerCV">
+                <meta name="keywords" content="Discord Resume, Discord Portfolio, Discord Staff, Server Contributions, Discord Experience, Verified History, Discord Community, Staff Application, ServerCV">
+                <meta name="creator" content="ServerCV">
+                <meta name="publisher" content="ServerCV">
+                <meta name="robots" content="index, follow">
+                <meta property="og:title" content="ServerCV | Showcase Your Discord Experience">
+                <meta property="og:description" content="Build a verified portfolio of your server contributions. Perfect for staff applications and sharing your achievements in the Discord community.">
+                <meta property="og:type" content="website">
+                <meta property="og:site_name" content="ServerCV">
+                <meta property="og:image" content="https://servercv.com/assets/icon.png">
+                <meta property="og:url" content="https://servercv.com/dashboard">
+                <meta name="theme-color" content="#5A4BEB">
+                <meta name="twitter:card" content="summary">
+                <meta name="twitter:title" content="ServerCV | Showcase Your Discord Experience">
+                <meta name="twitter:description" content="Build a verified portfolio of your server contributions. Perfect for staff applications and sharing your achievements in the Discord community.">
+                <meta name="twitter:image" content="https://servercv.com/assets/icon.png">
+                <link rel="icon" href="https://servercv.com/assets/favicon.ico" sizes="48x48" type="image/x-icon">
+                <link rel="icon" href="https://servercv.com/assets/icon.png" sizes="1024x1024" type="image/png">
+                <link rel="apple-touch-icon" href="https://servercv.com/assets/apple-icon.png" sizes="180x180" type="image/png">
+                <link rel="canonical" href="https://servercv.com/dashboard">
+                <script type="application/ld+json">
+                {
+                "@context": "https://schema.org",
+                "@type": "WebPage",
+                "name": "Dashboard | ServerCV",
+                "url": "https://servercv.com/dashboard",
+                "description": "Build a verified portfolio of your server contributions. Perfect for staff applications and sharing your achievements in the Discord community.",
+                "publisher": {
+                    "@type": "Organization",
+                    "name": "ServerCV",
+                    "logo": "https://servercv.com/assets/icon.png"
+                }
+                }
+                </script>
+            </head>
+            <body>
+                <h1>ServerCV - Professional Discord Staff Portfolios</h1>
+                <p>ServerCV is the standard for tracking and verifying Discord staff experience. Create your profile today to showcase your contributions to communities.</p>
+                <a href="/login">Get Started</a>
+            </body>
+            </html>"""
+
+APPROVED_ESCAPED_FIELDS = ("role_title", "server_name", "description", "approved_by_name", "approved_by_slug", "approved_by")
+PENDING_ESCAPED_FIELDS = ("role_title", "server_name", "description")
+
+def sort_experiences(experiences, pinned_first=False):
+    # Newest first; with pinned_first, pinned entries go ahead of everything else
+    experiences.sort(key=attrgetter("pinned_sort_key" if pinned_first else "sort_key"), reverse=True)
+    return experiences
 
 def get_user_role_and_guild(user_id, server_id, discord_token):
-    guilds = requests_session.get(f"{API_BASE}/users/@me/guilds", headers={"Authorization": f"Bearer {discord_token}"}).json()
+    r = requests_session.get(f"{API_BASE}/users/@me/guilds", headers={"Authorization": f"Bearer {discord_token}"})
+    if r.status_code in (401, 403):
+        forget_user_roles(user_id)
+        return None, None
+    guilds = r.json()
     for g in guilds:
         if str(g['id']) == server_id:
-            perms = get_permissions_list(int(g.get("permissions", 0)))
-            if g.get("owner"):
-                print(g)
-                return "Server Owner", g
-            elif "Administrator" in perms:
-                return "Administrator", g
-            elif any(perm in perms for perm in MOD_PERMS):
-                return "Moderator", g
-            else:
-                return "Member", g
+            return classify_guild(g), g
     return None, None
 
 def get_user_role_in_server(user_id, server_id, discord_token):
     role, _ = get_user_role_and_guild(user_id, server_id, discord_token)
     return role
 
+def get_cached_user_role(user_id, server_id, discord_token):
+    """
+    Like get_user_role_in_server for the logged-in user, but reuses a role resolved in the last ROLE_CACHE_TTL seconds.
+    """
+    role = role_cache.get((user_id, server_id))
+    if role is None:
+        role = get_user_role_in_server(user_id, server_id, discord_token)
+        if role:
+            role_cache.set((user_id, server_id), role)
+    return role
+
+def forget_user_roles(user_id):
+    role_cache.delete_where(lambda key: key[0] == user_id)
+
+def can_approve_request(role, exp, user_id):
+    # Admins cannot approve/reject their own, other admins' or the owner's requests
+    if role == "Server Owner":
+        return True
+    if role == "Administrator":
+        return exp.get("requester_role") not in ["Server Owner", "Administrator"] and str(exp['user_id']) != user_id
+    return False
+
 dashboard = Blueprint('dashboard', __name__)
+logger = logging.getLogger(__name__)
 
 limiter = Limiter(key_func=lambda: session.get("user_id") or get_remote_address())
 
@@ -147,7 +204,6 @@ def view_dashboard():
         session["discord_token"] = tokens["access_token"]
 
         user = requests_session.get(f"{API_BASE}/users/@me", headers={"Authorization": f"Bearer {tokens['access_token']}"}).json()
-        print(user)
         save_user_to_firebase(user, tokens["access_token"])
         session["user_id"] = str(user["id"])
 
@@ -156,57 +212,9 @@ def view_dashboard():
             return redirect(redirect_to)
         return redirect("/dashboard")
 
-    user_agent = request.headers.get('User-Agent', '').lower()
-    bot_keywords = ['bot', 'crawler', 'spider', 'scraper', 'discordbot', 'twitterbot', 'facebookexternalhit']
-    is_bot = any(keyword in user_agent for keyword in bot_keywords)
-    
-    if is_bot:
-        return """<!DOCTYPE html>
-            <html lang="en">
-            <head>
-                <title>ServerCV | Showcase Your Discord Experience</title>
-                <meta name="description" content="Build a verified portfolio of your server contributions. Perfect for staff applications and sharing your achievements in the Discord community.">
-                <meta name="author" content="ServerCV">
-                <meta name="keywords" content="Discord Resume, Discord Portfolio, Discord Staff, Server Contributions, Discord Experience, Verified History, Discord Community, Staff Application, ServerCV">
-                <meta name="creator" content="ServerCV">
-                <meta name="publisher" content="ServerCV">
-                <meta name="robots" content="index, follow">
-                <meta property="og:title" content="ServerCV | Showcase Your Discord Experience">
-                <meta property="og:description" content="Build a verified portfolio of your server contributions. Perfect for staff applications and sharing your achievements in the Discord community.">
-                <meta property="og:type" content="website">
-                <meta property="og:site_name" content="ServerCV">
-                <meta property="og:image" content="https://servercv.com/assets/icon.png">
-                <meta property="og:url" content="https://servercv.com/dashboard">
-                <meta name="theme-color" content="#5A4BEB">
-                <meta name="twitter:card" content="summary">
-                <meta name="twitter:title" content="ServerCV | Showcase Your Discord Experience">
-                <meta name="twitter:description" content="Build a verified portfolio of your server contributions. Perfect for staff applications and sharing your achievements in the Discord community.">
-                <meta name="twitter:image" content="https://servercv.com/assets/icon.png">
-                <link rel="icon" href="https://servercv.com/assets/favicon.ico" sizes="48x48" type="image/x-icon">
-                <link rel="icon" href="https://servercv.com/assets/icon.png" sizes="1024x1024" type="image/png">
-                <link rel="apple-touch-icon" href="https://servercv.com/assets/apple-icon.png" sizes="180x180" type="image/png">
-                <link rel="canonical" href="https://servercv.com/dashboard">
-                <script type="application/ld+json">
-                {
-                "@context": "https://schema.org",
-                "@type": "WebPage",
-                "name": "Dashboard | ServerCV",
-                "url": "https://servercv.com/dashboard",
-                "description": "Build a verified portfolio of your server contributions. Perfect for staff applications and sharing your achievements in the Discord community.",
-                "publisher": {
-                    "@type": "Organization",
-                    "name": "ServerCV",
-                    "logo": "https://servercv.com/assets/icon.png"
-                }
-                }
-                </script>
-            </head>
-            <body>
-                <h1>ServerCV - Professional Discord Staff Portfolios</h1>
-                <p>ServerCV is the standard for tracking and verifying Discord staff experience. Create your profile today to showcase your contributions to communities.</p>
-                <a href="/login">Get Started</a>
-            </body>
-            </html>"""
+    # Prebuilt once at import; crawlers hit this on every visit
+    if is_crawler(request.headers.get('User-Agent')):
+        return CRAWLER_DASHBOARD_HTML
 
     if "discord_token" not in session:
         return redirect(f"/login?redirect_to={quote(request.full_path)}")
@@ -215,10 +223,11 @@ def view_dashboard():
     user = requests_session.get(f"{API_BASE}/users/@me", headers={"Authorization": f"Bearer {discord_token}"}).json()
     
     user_data = get_user_data(str(user["id"]))
-    is_premium = user_data.get('premium', False)
+    entitlements = get_entitlements(str(user["id"]), user_data)
+    is_premium = entitlements.is_premium
     
     profile_url = f"/u/{user['id']}"
-    if is_premium and user_data.get("vanity_url"):
+    if entitlements.can_set_vanity_url and user_data.get("vanity_url"):
         profile_url = f"/u/{user_data['vanity_url']}"
     
     content = f"""
@@ -261,155 +270,159 @@ def view_dashboard():
             const isPremium = {str(is_premium).lower()};
             const csrfToken = document.querySelector('meta[name="csrf-token"]').getAttribute('content');
             let experienceCount = 0;
+            let dashboardData = null;
 
             function getPremiumButtonHtml() {{
                 return '<a href="/premium" class="block w-full bg-transparent border-2 border-yellow-500 hover:border-orange-600 text-yellow-500 hover:text-orange-600 px-4 py-3 rounded-lg font-semibold transition-all transform hover:scale-[1.02] shadow-lg text-center"><span title="Verified Premium Member"><svg class="w-6 h-6 text-yellow-500 inline-block align-text-bottom" fill="currentColor" viewBox="0 0 20 20"><path fill-rule="evenodd" d="M6.267 3.455a3.066 3.066 0 001.745-.723 3.066 3.066 0 013.976 0 3.066 3.066 0 001.745.723 3.066 3.066 0 012.812 2.812c.051.643.304 1.254.723 1.745a3.066 3.066 0 010 3.976 3.066 3.066 0 00-.723 1.745 3.066 3.066 0 01-2.812 2.812 3.066 3.066 0 00-1.745.723 3.066 3.066 0 01-3.976 0 3.066 3.066 0 00-1.745-.723 3.066 3.066 0 01-2.812-2.812 3.066 3.066 0 00-.723-1.745 3.066 3.066 0 010-3.976 3.066 3.066 0 00.723-1.745 3.066 3.066 0 012.812-2.812zm7.44 5.252a1 1 0 00-1.414-1.414L9 10.586 7.707 9.293a1 1 0 00-1.414 1.414l2 2a1 1 0 001.414 0l4-4z" clip-rule="evenodd"></path></svg></span> Unlock the full potential of ServerCV with Premium</a>';
             }}
             
-            fetch('/api/guilds')
-                .then(response => response.json())
-                .then(data => {{
-                    if (data.error) {{
-                        document.getElementById('guilds-container').innerHTML = `<div class="text-red-400">${{data.error}}</div>`;
-                        return;
-                    }}
-
-                    const servers = data.servers || [];
-                    if (servers.length === 0) {{
-                        document.getElementById('guilds-container').innerHTML = '<div class="text-gray-400">No guilds found.</div>';
-                        return;
-                    }}
+            function renderGuilds(data) {{
+                if (data.guilds_error) {{
+                    document.getElementById('guilds-container').innerHTML = `<div class="text-red-400">${{data.guilds_error}}</div>`;
+                    return;
+                }}
 
-                    let requestEligible = servers.filter(s => ['Server Owner', 'Administrator', 'Moderator'].includes(s.label));
-                    let viewEligible = servers.filter(s => ['Server Owner', 'Administrator'].includes(s.label));
-                    
-                    let html = '<div class="space-y-6">';
-                    
-                    html += '<div><h3 class="text-lg font-semibold mb-1 text-gray-200">Submit Endorsement Request</h3>';
-                    html += '<p class="text-sm text-gray-400 mb-3">Select a server to request verification for your Discord experience in the server.</p>';
-                    html += '<div class="flex flex-col sm:flex-row gap-2">';
-                    html += '<select id="request-select" class="bg-gray-800 border border-gray-700 text-white rounded-lg px-4 py-2 focus:outline-none focus:border-indigo-500 w-full sm:flex-grow">';
-                    html += '<option value="">Choose a server...</option>';
-                    requestEligible.forEach(s => {{
-                        html += `<option value="${{s.id}}|${{s.name.replace(/'/g, "\\\\'")}}">${{s.name}} (${{s.id}}) - ${{s.label}}</option>`;
-                    }});
-                    html += '</select>';
-                    html += '<button onclick="submitRequest(this)" class="bg-indigo-600 hover:bg-indigo-700 text-white px-4 py-2 rounded-lg font-medium transition-colors w-full sm:w-auto">Submit</button>';
-                    html += '</div></div>';
-
-                    html += '<div><h3 class="text-lg font-semibold mb-1 text-gray-200">View/Approve Endorsement Requests</h3>';
-                    html += '<p class="text-sm text-gray-400 mb-3">Manage incoming and accepted requests for servers you administer or own.</p>';
-                    html += '<div class="flex flex-col sm:flex-row gap-2">';
-                    html += '<select id="view-select" class="bg-gray-800 border border-gray-700 text-white rounded-lg px-4 py-2 focus:outline-none focus:border-indigo-500 w-full sm:flex-grow">';
-                    html += '<option value="">Choose a server...</option>';
-                    viewEligible.forEach(s => {{
-                        html += `<option value="${{s.id}}">${{s.name}} (${{s.id}}) - ${{s.label}}</option>`;
-                    }});
-                    html += '</select>';
-                    html += '<button onclick="viewPending(this)" class="bg-indigo-600 hover:bg-indigo-700 text-white px-4 py-2 rounded-lg font-medium transition-colors w-full sm:w-auto">View</button>';
-                    html += '</div></div>';
-                    
-                    if (!isPremium) {{
-                        html += `<div class="pt-4 border-t border-gray-700">${{getPremiumButtonHtml()}}</div>`;
-                    }} else {{
-                        html += '<div class="pt-4 border-t border-gray-700"><div class="text-green-400 font-semibold"><span title="Verified Premium Member"><svg class="w-6 h-6 text-yellow-500 inline-block align-text-bottom" fill="currentColor" viewBox="0 0 20 20"><path fill-rule="evenodd" d="M6.267 3.455a3.066 3.066 0 001.745-.723 3.066 3.066 0 013.976 0 3.066 3.066 0 001.745.723 3.066 3.066 0 012.812 2.812c.051.643.304 1.254.723 1.745a3.066 3.066 0 010 3.976 3.066 3.066 0 00-.723 1.745 3.066 3.066 0 01-2.812 2.812 3.066 3.066 0 00-1.745.723 3.066 3.066 0 01-3.976 0 3.066 3.066 0 00-1.745-.723 3.066 3.066 0 01-2.812-2.812 3.066 3.066 0 00-.723-1.745 3.066 3.066 0 010-3.976 3.066 3.066 0 00.723-1.745 3.066 3.066 0 012.812-2.812zm7.44 5.252a1 1 0 00-1.414-1.414L9 10.586 7.707 9.293a1 1 0 00-1.414 1.414l2 2a1 1 0 001.414 0l4-4z" clip-rule="evenodd"></path></svg></span> You have Verified Premium Member access permanently. Enjoy adding unlimited experiences!</div></div>';
-                    }}
-                    
-                    html += '</div>';
+                const servers = data.servers || [];
+                if (servers.length === 0) {{
+                    document.getElementById('guilds-container').innerHTML = '<div class="text-gray-400">No guilds found.</div>';
+                    return;
+                }}
 
-                    document.getElementById('guilds-container').innerHTML = html;
-                }})
-                .catch(error => {{
-                    console.error('Error loading content:', error);
-                    document.getElementById('guilds-container').innerHTML = '<div class="text-red-400">Failed to load content. Please refresh the page.</div>';
+                let requestEligible = servers.filter(s => ['Server Owner', 'Administrator', 'Moderator'].includes(s.label));
+                let viewEligible = servers.filter(s => ['Server Owner', 'Administrator'].includes(s.label));
+                
+                let html = '<div class="space-y-6">';
+                
+                html += '<div><h3 class="text-lg font-semibold mb-1 text-gray-200">Submit Endorsement Request</h3>';
+                html += '<p class="text-sm text-gray-400 mb-3">Select a server to request verification for your Discord experience in the server.</p>';
+                html += '<div class="flex flex-col sm:flex-row gap-2">';
+                html += '<select id="request-select" class="bg-gray-800 border border-gray-700 text-white rounded-lg px-4 py-2 focus:outline-none focus:border-indigo-500 w-full sm:flex-grow">';
+                html += '<option value="">Choose a server...</option>';
+                requestEligible.forEach(s => {{
+                    html += `<option value="${{s.id}}|${{s.name.replace(/'/g, "\\\\'")}}">${{s.name}} (${{s.id}}) - ${{s.label}}</option>`;
+                }});
+                html += '</select>';
+                html += '<button onclick="submitRequest(this)" class="bg-indigo-600 hover:bg-indigo-700 text-white px-4 py-2 rounded-lg font-medium transition-colors w-full sm:w-auto">Submit</button>';
+                html += '</div></div>';
+
+                html += '<div><h3 class="text-lg font-semibold mb-1 text-gray-200">View/Approve Endorsement Requests</h3>';
+                html += '<p class="text-sm text-gray-400 mb-3">Manage incoming and accepted requests for servers you administer or own.</p>';
+                html += '<div class="flex flex-col sm:flex-row gap-2">';
+                html += '<select id="view-select" class="bg-gray-800 border border-gray-700 text-white rounded-lg px-4 py-2 focus:outline-none focus:border-indigo-500 w-full sm:flex-grow">';
+                html += '<option value="">Choose a server...</option>';
+                viewEligible.forEach(s => {{
+                    html += `<option value="${{s.id}}">${{s.name}} (${{s.id}}) - ${{s.label}}</option>`;
                 }});
+                html += '</select>';
+                html += '<button onclick="viewPending(this)" class="bg-indigo-600 hover:bg-indigo-700 text-white px-4 py-2 rounded-lg font-medium transition-colors w-full sm:w-auto">View</button>';
+                html += '</div></div>';
+                
+                if (!isPremium) {{
+                    html += `<div class="pt-4 border-t border-gray-700">${{getPremiumButtonHtml()}}</div>`;
+                }} else {{
+                    html += '<div class="pt-4 border-t border-gray-700"><div class="text-green-400 font-semibold"><span title="Verified Premium Member"><svg class="w-6 h-6 text-yellow-500 inline-block align-text-bottom" fill="currentColor" viewBox="0 0 20 20"><path fill-rule="evenodd" d="M6.267 3.455a3.066 3.066 0 001.745-.723 3.066 3.066 0 013.976 0 3.066 3.066 0 001.745.723 3.066 3.066 0 012.812 2.812c.051.643.304 1.254.723 1.745a3.066 3.066 0 010 3.976 3.066 3.066 0 00-.723 1.745 3.066 3.066 0 01-2.812 2.812 3.066 3.066 0 00-1.745.723 3.066 3.066 0 01-3.976 0 3.066 3.066 0 00-1.745-.723 3.066 3.066 0 01-2.812-2.812 3.066 3.066 0 00-.723-1.745 3.066 3.066 0 010-3.976 3.066 3.066 0 00.723-1.745 3.066 3.066 0 012.812-2.812zm7.44 5.252a1 1 0 00-1.414-1.414L9 10.586 7.707 9.293a1 1 0 00-1.414 1.414l2 2a1 1 0 001.414 0l4-4z" clip-rule="evenodd"></path></svg></span> You have Verified Premium Member access permanently. Enjoy adding unlimited experiences!</div></div>';
+                }}
+                
+                html += '</div>';
 
-            fetch('/api/experiences')
-                .then(response => response.json())
-                .then(data => {{
-                    const experiences = data.experiences || [];
-                    experienceCount = experiences.length;
-                    if (experiences.length === 0) {{
-                        document.getElementById('experience-timeline').innerHTML = '<div class="text-gray-400">No experiences found.</div>';
-                        return;
+                document.getElementById('guilds-container').innerHTML = html;
+            }}
+
+            function renderTimeline(data) {{
+                const experiences = data.experiences || [];
+                experienceCount = experiences.length;
+                if (experiences.length === 0) {{
+                    document.getElementById('experience-timeline').innerHTML = '<div class="text-gray-400">No experiences found.</div>';
+                    return;
+                }}
+                
+                let html = '<div class="space-y-4">';
+                experiences.forEach(exp => {{
+                    const end = exp.end_month ? `${{exp.end_month}}/${{exp.end_year}}` : '<span class="text-green-400">Present</span>';
+                    html += `<div class="bg-gray-800/50 p-4 rounded-lg border border-gray-700 hover:border-gray-600 transition-colors">`;
+                    html += `<div class="flex justify-between items-start gap-4">`;
+                    html += `<div class="min-w-0 flex-1">`;
+                    html += `<h3 class="font-semibold text-lg text-white break-words">${{exp.role_title}} <span class="text-gray-400 font-normal">at</span> <a href="/s/${{exp.server_id}}" class="hover:text-indigo-400 transition-colors" target="_blank">${{exp.server_name}}</a></h3>`;
+                    html += `<div class="text-sm text-indigo-400 mb-2">${{exp.start_month}}/${{exp.start_year}} - ${{end}}</div>`;
+                    if (exp.description) {{
+                        html += `<p class="text-gray-300 text-sm mb-2 break-words">${{exp.description}}</p>`;
                     }}
-                    
-                    let html = '<div class="space-y-4">';
-                    experiences.forEach(exp => {{
-                        const end = exp.end_month ? `${{exp.end_month}}/${{exp.end_year}}` : '<span class="text-green-400">Present</span>';
-                        html += `<div class="bg-gray-800/50 p-4 rounded-lg border border-gray-700 hover:border-gray-600 transition-colors">`;
-                        html += `<div class="flex justify-between items-start gap-4">`;
-                        html += `<div class="min-w-0 flex-1">`;
-                        html += `<h3 class="font-semibold text-lg text-white break-words">${{exp.role_title}} <span class="text-gray-400 font-normal">at</span> <a href="/s/${{exp.server_id}}" class="hover:text-indigo-400 transition-colors" target="_blank">${{exp.server_name}}</a></h3>`;
-                        html += `<div class="text-sm text-indigo-400 mb-2">${{exp.start_month}}/${{exp.start_year}} - ${{end}}</div>`;
-                        if (exp.description) {{
-                            html += `<p class="text-gray-300 text-sm mb-2 break-words">${{exp.description}}</p>`;
-                        }}
-                        html += `<div class="flex flex-col gap-1 text-xs text-gray-500 mt-2">`;
-                        html += `<div class="flex items-center gap-2">`;
-                        html += `<svg class="w-4 h-4 text-green-500" fill="none" stroke="currentColor" viewBox="0 0 24 24"><path stroke-linecap="round" stroke-linejoin="round" stroke-width="2" d="M9 12l2 2 4-4m6 2a9 9 0 11-18 0 9 9 0 0118 0z"></path></svg>`;
-                        html += `<span>Verified by <a href="/u/${{exp.approved_by_slug || exp.approved_by}}" target="_blank" class="hover:underline hover:text-indigo-400 transition-colors">${{exp.approved_by_name}}</a></span>`;
-                        html += `</div>`;
-                        html += `<div class="flex items-center gap-2">`;
-                        html += `<a href="/experience/${{exp.id}}" class="hover:text-indigo-400 transition-colors flex items-center gap-2" title="View Entry History"><svg class="w-4 h-4" fill="none" stroke="currentColor" viewBox="0 0 24 24"><path stroke-linecap="round" stroke-linejoin="round" stroke-width="2" d="M12 8v4l3 3m6-3a9 9 0 11-18 0 9 9 0 0118 0z"></path></svg> View Entry History</a>`;
-                        html += `</div>`;
-                        html += `</div>`;
-                        html += `</div>`;
-                        html += `<div class="flex flex-col gap-2 flex-shrink-0">`;
-                        if (isPremium) {{
-                            if (exp.is_pinned) {{
-                                html += `<button onclick="unpinExperience('${{exp.id}}', this)" class="text-xs bg-yellow-500/20 hover:bg-yellow-500/30 text-yellow-500 px-2 py-1 rounded transition-colors">Unpin</button>`;
-                            }} else {{
-                                html += `<button onclick="pinExperience('${{exp.id}}', this)" class="text-xs bg-gray-700 hover:bg-gray-600 text-white px-2 py-1 rounded transition-colors">Pin</button>`;
-                            }}
+                    html += `<div class="flex flex-col gap-1 text-xs text-gray-500 mt-2">`;
+                    html += `<div class="flex items-center gap-2">`;
+                    html += `<svg class="w-4 h-4 text-green-500" fill="none" stroke="currentColor" viewBox="0 0 24 24"><path stroke-linecap="round" stroke-linejoin="round" stroke-width="2" d="M9 12l2 2 4-4m6 2a9 9 0 11-18 0 9 9 0 0118 0z"></path></svg>`;
+                    html += `<span>Verified by <a href="/u/${{exp.approved_by_slug || exp.approved_by}}" target="_blank" class="hover:underline hover:text-indigo-400 transition-colors">${{exp.approved_by_name}}</a></span>`;
+                    html += `</div>`;
+                    html += `<div class="flex items-center gap-2">`;
+                    html += `<a href="/experience/${{exp.id}}" class="hover:text-indigo-400 transition-colors flex items-center gap-2" title="View Entry History"><svg class="w-4 h-4" fill="none" stroke="currentColor" viewBox="0 0 24 24"><path stroke-linecap="round" stroke-linejoin="round" stroke-width="2" d="M12 8v4l3 3m6-3a9 9 0 11-18 0 9 9 0 0118 0z"></path></svg> View Entry History</a>`;
+                    html += `</div>`;
+                    html += `</div>`;
+                    html += `</div>`;
+                    html += `<div class="flex flex-col gap-2 flex-shrink-0">`;
+                    if (isPremium) {{
+                        if (exp.is_pinned) {{
+                            html += `<button onclick="unpinExperience('${{exp.id}}', this)" class="text-xs bg-yellow-500/20 hover:bg-yellow-500/30 text-yellow-500 px-2 py-1 rounded transition-colors">Unpin</button>`;
+                        }} else {{
+                            html += `<button onclick="pinExperience('${{exp.id}}', this)" class="text-xs bg-gray-700 hover:bg-gray-600 text-white px-2 py-1 rounded transition-colors">Pin</button>`;
                         }}
-                        if (!exp.end_year) {{
-                            html += `<button onclick="editEndDate('${{exp.id}}')" class="text-xs bg-gray-700 hover:bg-gray-600 text-white px-2 py-1 rounded transition-colors">End Date</button>`;
-                        }}
-                        html += `<button onclick="deleteExperience('${{exp.id}}', this)" class="text-xs bg-red-900/50 hover:bg-red-900 text-red-200 px-2 py-1 rounded transition-colors">Delete</button>`;
-                        html += `</div>`;
-                        html += `</div>`;
-                        html += `</div>`;
-                    }});
-                    html += '</div>';
-                    document.getElementById('experience-timeline').innerHTML = html;
-                }})
-                .catch(error => {{
-                    console.error('Error loading timeline:', error);
-                    document.getElementById('experience-timeline').innerHTML = '<div class="text-red-400">Failed to load timeline.</div>';
+                    }}
+                    if (!exp.end_year) {{
+                        html += `<button onclick="editEndDate('${{exp.id}}')" class="text-xs bg-gray-700 hover:bg-gray-600 text-white px-2 py-1 rounded transition-colors">End Date</button>`;
+                    }}
+                    html += `<button onclick="deleteExperience('${{exp.id}}', this)" class="text-xs bg-red-900/50 hover:bg-red-900 text-red-200 px-2 py-1 rounded transition-colors">Delete</button>`;
+                    html += `</div>`;
+                    html += `</div>`;
+                    html += `</div>`;
                 }});
+                html += '</div>';
+                document.getElementById('experience-timeline').innerHTML = html;
+            }}
 
-            fetch('/api/pending_experiences')
+            function renderPending(data) {{
+                const pending = data.pending || [];
+                if (pending.length === 0) {{
+                    document.getElementById('pending-experiences').innerHTML = '<div class="text-gray-400">No pending requests.</div>';
+                    return;
+                }}
+                
+                let html = '<div class="space-y-4">';
+                pending.forEach(exp => {{
+                    const end = exp.end_month ? `${{exp.end_month}}/${{exp.end_year}}` : 'Present';
+                    html += `<div class="bg-gray-800/50 p-4 rounded-lg border border-gray-700 border-l-4 border-l-yellow-500">`;
+                    html += `<h3 class="font-semibold text-lg text-white">${{exp.role_title}} <span class="text-gray-400 font-normal">at</span> ${{exp.server_name}}</h3>`;
+                    html += `<div class="text-sm text-gray-400 mb-2">${{exp.start_month}}/${{exp.start_year}} - ${{end}}</div>`;
+                    if (exp.description) {{
+                        html += `<p class="text-gray-300 text-sm mb-2">${{exp.description}}</p>`;
+                    }}
+                    html += `<div class="flex justify-between items-center">`;
+                    html += `<div class="text-xs text-yellow-500 font-medium uppercase tracking-wide">Pending Approval</div>`;
+                    html += `<div class="flex gap-2">`;
+                    html += `<button onclick="editPendingExperience('${{exp.id}}')" class="text-xs bg-gray-700 hover:bg-gray-600 text-white px-2 py-1 rounded transition-colors">Edit</button>`;
+                    html += `<button onclick="deletePendingExperience('${{exp.id}}', this)" class="text-xs bg-red-900/50 hover:bg-red-900 text-red-200 px-2 py-1 rounded transition-colors">Delete</button>`;
+                    html += `</div></div>`;
+                    html += `</div>`;
+                }});
+                html += '</div>';
+                document.getElementById('pending-experiences').innerHTML = html;
+            }}
+
+            fetch('/api/dashboard')
                 .then(response => response.json())
                 .then(data => {{
-                    const pending = data.pending || [];
-                    if (pending.length === 0) {{
-                        document.getElementById('pending-experiences').innerHTML = '<div class="text-gray-400">No pending requests.</div>';
+                    if (data.error) {{
+                        document.getElementById('guilds-container').innerHTML = `<div class="text-red-400">${{data.error}}</div>`;
+                        document.getElementById('experience-timeline').innerHTML = `<div class="text-red-400">${{data.error}}</div>`;
+                        document.getElementById('pending-experiences').innerHTML = `<div class="text-red-400">${{data.error}}</div>`;
                         return;
                     }}
-                    
-                    let html = '<div class="space-y-4">';
-                    pending.forEach(exp => {{
-                        const end = exp.end_month ? `${{exp.end_month}}/${{exp.end_year}}` : 'Present';
-                        html += `<div class="bg-gray-800/50 p-4 rounded-lg border border-gray-700 border-l-4 border-l-yellow-500">`;
-                        html += `<h3 class="font-semibold text-lg text-white">${{exp.role_title}} <span class="text-gray-400 font-normal">at</span> ${{exp.server_name}}</h3>`;
-                        html += `<div class="text-sm text-gray-400 mb-2">${{exp.start_month}}/${{exp.start_year}} - ${{end}}</div>`;
-                        if (exp.description) {{
-                            html += `<p class="text-gray-300 text-sm mb-2">${{exp.description}}</p>`;
-                        }}
-                        html += `<div class="flex justify-between items-center">`;
-                        html += `<div class="text-xs text-yellow-500 font-medium uppercase tracking-wide">Pending Approval</div>`;
-                        html += `<div class="flex gap-2">`;
-                        html += `<button onclick="editPendingExperience('${{exp.id}}')" class="text-xs bg-gray-700 hover:bg-gray-600 text-white px-2 py-1 rounded transition-colors">Edit</button>`;
-                        html += `<button onclick="deletePendingExperience('${{exp.id}}', this)" class="text-xs bg-red-900/50 hover:bg-red-900 text-red-200 px-2 py-1 rounded transition-colors">Delete</button>`;
-                        html += `</div></div>`;
-                        html += `</div>`;
-                    }});
-                    html += '</div>';
-                    document.getElementById('pending-experiences').innerHTML = html;
+                    dashboardData = data;
+                    renderGuilds(data);
+                    renderTimeline(data);
+                    renderPending(data);
                 }})
                 .catch(error => {{
-                    console.error('Error loading pending:', error);
+                    console.error('Error loading content:', error);
+                    document.getElementById('guilds-container').innerHTML = '<div class="text-red-400">Failed to load content. Please refresh the page.</div>';
+                    document.getElementById('experience-timeline').innerHTML = '<div class="text-red-400">Failed to load timeline.</div>';
                     document.getElementById('pending-experiences').innerHTML = '<div class="text-red-400">Failed to load pending requests.</div>';
                 }});
 
@@ -422,7 +435,17 @@ def view_dashboard():
                         btn.disabled = true;
                         btn.innerHTML = '...';
                     }}
-                    fetch(`/delete_pending/${{expId}}`, {{method: 'POST', headers: {{'X-CSRF-Token': csrfToken}}}}).then(() => location.reload());
+                    fetch(`/delete_pending/${{expId}}`, {{method: 'POST', headers: {{'X-CSRF-Token': csrfToken}}}})
+                        .then(res => res.json())
+                        .then(data => {{
+                            if (data.error) {{
+                                alert(data.error);
+                                return location.reload();
+                            }}
+                            dashboardData.pending = dashboardData.pending.filter(exp => exp.id !== data.removed);
+                            renderPending(dashboardData);
+                        }})
+                        .catch(() => location.reload());
                 }}
             }}
 
@@ -458,29 +481,31 @@ def view_dashboard():
             function editEndDate(expId) {{
                 window.location.href = `/end/${{expId}}`;
             }}
-            function pinExperience(expId, btn) {{
+            function setPinned(action, expId, btn) {{
                 if (btn) {{
                     btn.disabled = true;
                     btn.innerHTML = '...';
                 }}
-                fetch(`/pin/${{expId}}`, {{method: 'POST', headers: {{'X-CSRF-Token': csrfToken}}}})
+                fetch(`/${{action}}/${{expId}}`, {{method: 'POST', headers: {{'X-CSRF-Token': csrfToken}}}})
                     .then(res => res.json())
                     .then(data => {{
-                        if (data.error) alert(data.error);
-                        else location.reload();
-                    }});
+                        if (data.error) {{
+                            alert(data.error);
+                            return renderTimeline(dashboardData);
+                        }}
+                        const exp = dashboardData.experiences.find(e => e.id === data.changes.id);
+                        if (exp) Object.assign(exp, data.changes);
+                        // Same order as the server: pinned first, then newest first
+                        dashboardData.experiences.sort((a, b) => (b.is_pinned ? 1 : 0) - (a.is_pinned ? 1 : 0) || b.sort_key - a.sort_key);
+                        renderTimeline(dashboardData);
+                    }})
+                    .catch(() => location.reload());
+            }}
+            function pinExperience(expId, btn) {{
+                setPinned('pin', expId, btn);
             }}
             function unpinExperience(expId, btn) {{
-                if (btn) {{
-                    btn.disabled = true;
-                    btn.innerHTML = '...';
-                }}
-                fetch(`/unpin/${{expId}}`, {{method: 'POST', headers: {{'X-CSRF-Token': csrfToken}}}})
-                    .then(res => res.json())
-                    .then(data => {{
-                        if (data.error) alert(data.error);
-                        else location.reload();
-                    }});
+                setPinned('unpin', expId, btn);
             }}
             function deleteExperience(expId, btn) {{
                 if (confirm('Are you sure you want to delete this experience?')) {{
@@ -495,7 +520,17 @@ def view_dashboard():
                         }}
                         btn.innerHTML = '<svg class="animate-spin h-5 w-5 text-white inline" xmlns="http://www.w3.org/2000/svg" fill="none" viewBox="0 0 24 24"><circle class="opacity-25" cx="12" cy="12" r="10" stroke="currentColor" stroke-width="4"></circle><path class="opacity-75" fill="currentColor" d="M4 12a8 8 0 018-8V0C5.373 0 0 5.373 0 12h4zm2 5.291A7.962 7.962 0 014 12H0c0 3.042 1.135 5.824 3 7.938l3-2.647z"></path></svg>';
                     }}
-                    fetch(`/delete/${{expId}}`, {{method: 'POST', headers: {{'X-CSRF-Token': csrfToken}}}}).then(() => location.reload());
+                    fetch(`/delete/${{expId}}`, {{method: 'POST', headers: {{'X-CSRF-Token': csrfToken}}}})
+                        .then(res => res.json())
+                        .then(data => {{
+                            if (data.error) {{
+                                alert(data.error);
+                                return location.reload();
+                            }}
+                            dashboardData.experiences = dashboardData.experiences.filter(exp => exp.id !== data.removed);
+                            renderTimeline(dashboardData);
+                        }})
+                        .catch(() => location.reload());
                 }}
             }}
         </script>
@@ -512,12 +547,13 @@ def settings():
     user = requests_session.get(f"{API_BASE}/users/@me", headers={"Authorization": f"Bearer {session['discord_token']}"}).json()
     user_id = str(user["id"])
     user_data = get_user_data(user_id)
-    is_premium = user_data.get("premium", False)
+    entitlements = get_entitlements(user_id, user_data)
+    is_premium = entitlements.is_premium
     
     if request.method == "POST":
         vanity_url = request.form.get("vanity_url", "").strip()
         if vanity_url:
-            if not is_premium:
+            if not entitlements.can_set_vanity_url:
                 return error_page("Vanity URLs are a Premium feature.", 403)
             if not re.match(r"^[a-zA-Z0-9_]+$", vanity_url):
                 return error_page("Invalid Vanity URL. Only alphanumeric characters and underscores allowed.", 400)
@@ -529,13 +565,15 @@ def settings():
                 return error_page("Vanity URL already taken.", 400)
             
             db.reference(f"Dashboard Users/{user_id}").update({"vanity_url": vanity_url})
-        elif is_premium:
+        elif entitlements.can_set_vanity_url:
             db.reference(f"Dashboard Users/{user_id}").update({"vanity_url": ""})
+        invalidate_user_info(user_id)
+        invalidate_vanity("user")
 
         socials = request.form.getlist("socials[]")
         socials = [s.strip() for s in socials if s.strip()]
         
-        limit = SOCIAL_LIMIT_PREMIUM if is_premium else SOCIAL_LIMIT_FREE
+        limit = entitlements.social_limit
         if len(socials) > limit:
              return error_page(f"You can only have {limit} social links.", 400)
         
@@ -547,7 +585,7 @@ def settings():
     current_socials = user_data.get("socials", [])
     
     social_inputs = ""
-    limit = SOCIAL_LIMIT_PREMIUM if is_premium else SOCIAL_LIMIT_FREE
+    limit = entitlements.social_limit
     
     for link in current_socials:
         social_inputs += f'<input type="url" name="socials[]" value="{html.escape(link)}" class="w-full bg-gray-800 border border-gray-700 text-white rounded-lg px-4 py-2 mb-2 focus:outline-none focus:border-indigo-500" placeholder="https://twitter.com/username">'
@@ -606,78 +644,78 @@ def settings():
 @dashboard.route("/pin/<exp_id>", methods=["POST"])
 @limiter.limit("1 per second")
 def pin_experience(exp_id):
-    if "discord_token" not in session:
+    if "user_id" not in session or "discord_token" not in session:
         return jsonify({"error": "Not authenticated"}), 401
         
-    user = requests_session.get(f"{API_BASE}/users/@me", headers={"Authorization": f"Bearer {session['discord_token']}"}).json()
-    user_id = str(user["id"])
-    user_data = get_user_data(user_id)
-    
-    if not user_data.get("premium", False):
+    user_id = session["user_id"]
+    if not get_entitlements(user_id).can_pin:
         return jsonify({"error": "Premium required"}), 403
         
-    ref = db.reference(f"Experiences/{exp_id}")
-    exp = ref.get()
-    if not exp or str(exp.get("user_id")) != user_id:
-        return jsonify({"error": "Experience not found or unauthorized"}), 404
-        
-    ref.update({"is_pinned": True})
-    return jsonify({"success": True})
+    return set_experience_pinned(exp_id, user_id, True)
 
 @dashboard.route("/unpin/<exp_id>", methods=["POST"])
 @limiter.limit("1 per second")
 def unpin_experience(exp_id):
-    if "discord_token" not in session:
+    if "user_id" not in session or "discord_token" not in session:
         return jsonify({"error": "Not authenticated"}), 401
         
-    user = requests_session.get(f"{API_BASE}/users/@me", headers={"Authorization": f"Bearer {session['discord_token']}"}).json()
-    user_id = str(user["id"])
-    
+    return set_experience_pinned(exp_id, session["user_id"], False)
+
+def set_experience_pinned(exp_id, user_id, pinned):
     ref = db.reference(f"Experiences/{exp_id}")
     exp = ref.get()
     if not exp or str(exp.get("user_id")) != user_id:
         return jsonify({"error": "Experience not found or unauthorized"}), 404
         
-    ref.update({"is_pinned": False})
-    return jsonify({"success": True})
+    ref.update({"is_pinned": pinned})
+    # Only the changed fields; the dashboard merges them into the entry it already has
+    return jsonify({"success": True, "changes": {"id": exp_id, "is_pinned": pinned}})
 
-@dashboard.route("/api/guilds")
-@limiter.limit("1 per 5 seconds")
-def api_dashboard_guilds():
-    if "discord_token" not in session:
-        return jsonify({"error": "Not authenticated"}), 401
+def fetch_dashboard_guilds(discord_token):
+    guilds = requests_session.get(f"{API_BASE}/users/@me/guilds", headers={"Authorization": f"Bearer {discord_token}"}).json()
 
-    try:
-        discord_token = session['discord_token']
-        guilds = requests_session.get(f"{API_BASE}/users/@me/guilds", headers={"Authorization": f"Bearer {discord_token}"}).json()
+    if not isinstance(guilds, list):
+        return None
 
-        if not isinstance(guilds, list):
-            return jsonify({"error": "Failed to load guilds"}), 500
+    guilds_sorted = sorted(guilds, key=lambda g: (g.get("name") or "").lower())
 
-        guilds_sorted = sorted(guilds, key=lambda g: (g.get("name") or "").lower())
+    servers = []
+    for g, label in zip(guilds_sorted, classify_guilds(guilds_sorted)):
+        icon = discord_image_url("icons", g['id'], g['icon'], 128) if g.get("icon") else None
 
-        servers = []
-        for g in guilds_sorted:
-            perms = get_permissions_list(int(g.get("permissions", 0)))
+        servers.append({
+            "name": html.escape(g.get('name', 'Unknown Server')),
+            "id": str(g.get('id')),
+            "label": label,
+            "icon": icon,
+        })
+    return servers
 
-            if g.get("owner"):
-                label = "Server Owner"
-            elif "Administrator" in perms:
-                label = "Administrator"
-            elif any(perm in perms for perm in MOD_PERMS):
-                label = "Moderator"
-            else:
-                label = "Member"
+def shape_experience(exp):
+    # sort_key lets the dashboard re-order the timeline itself after a pin or unpin
+    payload = exp.to_json(APPROVED_ESCAPED_FIELDS)
+    payload["sort_key"] = exp.sort_key
+    return payload
 
-            icon = f"https://cdn.discordapp.com/icons/{g['id']}/{g['icon']}.png?size=128" if g.get("icon") else None
+def shape_experiences(experiences):
+    # Sort: Pinned first, then by date (newest first)
+    sort_experiences(experiences, pinned_first=True)
+    return [shape_experience(exp) for exp in experiences]
 
-            servers.append({
-                "name": html.escape(g.get('name', 'Unknown Server')),
-                "id": str(g.get('id')),
-                "label": label,
-                "icon": icon,
-            })
+def shape_pending_experiences(pending):
+    sort_experiences(pending)
+    return [exp.to_json(PENDING_ESCAPED_FIELDS) for exp in pending]
 
+@dashboard.route("/api/guilds")
+@limiter.limit("1 per 5 seconds")
+def api_dashboard_guilds():
+    if "discord_token" not in session:
+        return jsonify({"error": "Not authenticated"}), 401
+
+    try:
+        servers = fetch_dashboard_guilds(session['discord_token'])
+        if servers is None:
+            return jsonify({"error": "Failed to load guilds"}), 500
         return jsonify({"servers": servers})
     
     except Exception as e:
@@ -690,20 +728,7 @@ def api_experiences():
         return jsonify({"error": "Not authenticated"}), 401
     user_id = session["user_id"]
     experiences = get_user_experiences(user_id)
-    
-    for exp in experiences:
-        exp['role_title'] = html.escape(str(exp.get('role_title', '')))
-        exp['server_name'] = html.escape(str(exp.get('server_name', '')))
-        exp['description'] = html.escape(str(exp.get('description', '')))
-        exp['approved_by_name'] = html.escape(str(exp.get('approved_by_name', '')))
-        if exp.get('approved_by_slug'):
-            exp['approved_by_slug'] = html.escape(str(exp['approved_by_slug']))
-        if exp.get('approved_by'):
-            exp['approved_by'] = html.escape(str(exp['approved_by']))
-
-    # Sort: Pinned first, then by date (newest first)
-    experiences.sort(key=lambda x: (x.get('is_pinned', False), int(x["start_year"]), int(x["start_month"]), int(x.get("end_year") or 9999), int(x.get("end_month") or 12)), reverse=True)
-    return jsonify({"experiences": experiences})
+    return jsonify({"experiences": shape_experiences(experiences)})
 
 @dashboard.route("/api/pending_experiences")
 @limiter.limit("10 per minute")
@@ -711,23 +736,44 @@ def api_pending_experiences():
     if "user_id" not in session:
         return jsonify({"error": "Not authenticated"}), 401
     user_id = session["user_id"]
-    ref = db.reference("Experiences")
-    experiences = ref.order_by_child("user_id").equal_to(user_id).get()
-    pending = []
-    if experiences:
-        for k, exp in experiences.items():
-            if exp.get("status") == "pending":
-                exp_copy = exp.copy()
-                exp_copy["id"] = k
-                
-                exp_copy['role_title'] = html.escape(str(exp_copy.get('role_title', '')))
-                exp_copy['server_name'] = html.escape(str(exp_copy.get('server_name', '')))
-                exp_copy['description'] = html.escape(str(exp_copy.get('description', '')))
-                
-                pending.append(exp_copy)
-    
-    pending.sort(key=lambda x: (int(x["start_year"]), int(x["start_month"]), int(x.get("end_year") or 9999), int(x.get("end_month") or 12)), reverse=True)
-    return jsonify({"pending": pending})
+    _, pending = get_user_experiences_by_status(user_id, include_approved=False)
+    return jsonify({"pending": shape_pending_experiences(pending)})
+
+@dashboard.route("/api/dashboard")
+@limiter.limit("10 per minute")
+def api_dashboard_bootstrap():
+    if "user_id" not in session or "discord_token" not in session:
+        return jsonify({"error": "Not authenticated"}), 401
+    user_id = session["user_id"]
+    discord_token = session['discord_token']
+
+    # Guild list comes from Discord, experiences from Firebase; fetch both at once
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        future_guilds = executor.submit(copy_context().run, fetch_dashboard_guilds, discord_token)
+        approved, pending = get_user_experiences_by_status(user_id)
+
+        try:
+            servers = future_guilds.result()
+            guilds_error = None if servers is not None else "Failed to load guilds"
+        except Exception as e:
+            servers = None
+            guilds_error = f"Failed to load guilds: {str(e)}"
+
+    return jsonify({
+        "experiences": shape_experiences(approved),
+        "pending": shape_pending_experiences(pending),
+        "servers": servers or [],
+        "guilds_error": guilds_error
+    })
+
+def count_user_experiences(user_id, entitlements):
+    """
+    Approved plus pending experiences toward the plan's cap. Plans without a cap skip the query.
+    """
+    if entitlements.experience_limit is None:
+        return 0
+    experiences = db.reference("Experiences").order_by_child("user_id").equal_to(user_id).get() or {}
+    return sum(1 for exp in experiences.values() if exp.get("status") in ("approved", "pending"))
 
 @dashboard.route("/request/<server_id>", methods=["GET", "POST"])
 @limiter.limit("10 per minute")
@@ -736,32 +782,19 @@ def request_endorsement(server_id):
         return redirect(f"/login?redirect_to={quote(request.full_path)}")
     user_id = session["user_id"]
 
-    user_data = get_user_data(user_id)
-    is_premium = user_data.get('premium', False)
+    entitlements = get_entitlements(user_id)
     
-    if not is_premium:
-        experiences = get_user_experiences(user_id)
-        ref = db.reference("Experiences")
-        pending_query = ref.order_by_child("user_id").equal_to(user_id).get()
-        pending = [exp for exp in pending_query.values() if exp.get("status") == "pending"] if pending_query else []
-        total = len(experiences) + len(pending)
-        if total >= EXP_LIMIT_FREE:
-            return redirect("/premium")
+    if not entitlements.can_add_experience(count_user_experiences(user_id, entitlements)):
+        return redirect("/premium")
 
     discord_token = session['discord_token']
     role, guild_data = get_user_role_and_guild(user_id, server_id, discord_token)
     if role not in ["Server Owner", "Administrator", "Moderator"]:
         return error_page("Not authorized", 403)
-    server_name = request.args.get("name", "Unknown Server")
+    meta = get_server_meta(server_id) or {}
+    server_name = meta.get("server_name") or (guild_data or {}).get("name") or request.args.get("name", "Unknown Server")
     if request.method == "POST":
-        experiences = get_user_experiences(user_id)
-        ref = db.reference("Experiences")
-        pending_query = ref.order_by_child("user_id").equal_to(user_id).get()
-        pending = [exp for exp in pending_query.values() if exp.get("status") == "pending"] if pending_query else []
-        total = len(experiences) + len(pending)
-        user_data = get_user_data(user_id)
-        is_premium = user_data.get('premium', False)
-        if total >= EXP_LIMIT_FREE and not is_premium:
+        if not entitlements.can_add_experience(count_user_experiences(user_id, entitlements)):
             return redirect("/premium")
         role_title = request.form.get("role_title")
         start_month = request.form.get("start_month")
@@ -782,13 +815,13 @@ def request_endorsement(server_id):
         except ValueError:
             return error_page("Invalid date format.", 400)
 
-        limit = DESC_LIMIT_PREMIUM if is_premium else DESC_LIMIT_FREE
+        limit = entitlements.description_limit
         if description and len(description) > limit:
             return error_page(f"Description exceeds limit of {limit} characters.", 400)
         
-        # Get server icon
-        server_icon = guild_data.get("icon") if guild_data else None
-        server_banner = guild_data.get("banner") if guild_data else None
+        # Copied onto the entry for the user profile and search; the bot rewrites them on guild updates
+        server_icon = meta.get("server_icon") or (guild_data.get("icon") if guild_data else None)
+        server_banner = meta.get("server_banner") or (guild_data.get("banner") if guild_data else None)
                 
         save_experience_request(user_id, server_id, server_name, role_title, start_month, request.form.get("start_year"), end_month, end_year, description, role, server_icon, server_banner)
         return redirect("/dashboard")
@@ -826,8 +859,8 @@ def request_endorsement(server_id):
                 </div>
                 
                 <div>
-                    <label class="block text-sm font-medium text-gray-400 mb-1">Description (Max {DESC_LIMIT_PREMIUM if is_premium else DESC_LIMIT_FREE} chars)</label>
-                    <textarea name="description" rows="4" maxlength="{DESC_LIMIT_PREMIUM if is_premium else DESC_LIMIT_FREE}" class="w-full bg-gray-800 border border-gray-700 rounded-lg px-4 py-2 text-white focus:outline-none focus:border-indigo-500 transition-colors"></textarea>
+                    <label class="block text-sm font-medium text-gray-400 mb-1">Description (Max {entitlements.description_limit} chars)</label>
+                    <textarea name="description" rows="4" maxlength="{entitlements.description_limit}" class="w-full bg-gray-800 border border-gray-700 rounded-lg px-4 py-2 text-white focus:outline-none focus:border-indigo-500 transition-colors"></textarea>
                 </div>
                 
                 <div class="flex gap-4 pt-4">
@@ -976,6 +1009,17 @@ def view(server_id):
                 </div>`;
         }}
 
+        const approvable = (data.pending || []).filter(exp => exp.can_approve).map(exp => exp.id);
+        if (approvable.length > 1) {{
+            html += `
+                <div class="mb-4 flex justify-end items-center gap-3">
+                    <span class="text-sm text-gray-400">${{approvable.length}} requests you can act on</span>
+                    <button onclick="bulkModerate('approve', this)" class="bg-green-600 hover:bg-green-700 text-white px-4 py-2 rounded-lg text-sm font-medium transition-colors">Approve all</button>
+                    <button onclick="bulkModerate('reject', this)" class="bg-red-600 hover:bg-red-700 text-white px-4 py-2 rounded-lg text-sm font-medium transition-colors">Reject all</button>
+                </div>`;
+        }}
+        bulkIds = approvable;
+
         html += `<div class="space-y-4">`;
 
         if (data.pending && data.pending.length > 0) {{
@@ -1071,10 +1115,14 @@ def view(server_id):
         document.getElementById('view-content').innerHTML = html;
     }}
 
+    let currentData = null;
     function loadData() {{
         fetch(`/api/guild/${{serverId}}`)
             .then(res => res.json())
-            .then(data => renderView(data))
+            .then(data => {{
+                currentData = data;
+                renderView(data);
+            }})
             .catch(err => {{
                 console.error(err);
                 document.getElementById('view-content').innerHTML = '<div class="text-red-400">Failed to load content.</div>';
@@ -1087,7 +1135,7 @@ def view(server_id):
             .then(res => res.json())
             .then(data => {{
                 if (data.success) {{
-                    loadData();
+                    applyLiveUpdate('approved', data.approved);
                 }} else {{
                     alert(data.error || 'Failed');
                     location.reload();
@@ -1101,7 +1149,7 @@ def view(server_id):
             .then(res => res.json())
             .then(data => {{
                 if (data.success) {{
-                    loadData();
+                    applyLiveUpdate(null, {{id: data.removed}});
                 }} else {{
                     alert(data.error || 'Failed');
                     location.reload();
@@ -1109,6 +1157,63 @@ def view(server_id):
             }})
             .catch(() => location.reload());
     }}
+    function applyLiveUpdate(list, entry) {{
+        if (!currentData || !currentData.pending) return;
+        currentData.pending = currentData.pending.filter(exp => exp.id !== entry.id);
+        currentData.approved = currentData.approved.filter(exp => exp.id !== entry.id);
+        if (list) {{
+            currentData[list].push(entry);
+            currentData[list].sort((a, b) => b.sort_key - a.sort_key);
+        }}
+        renderView(currentData);
+    }}
+    let pollTimer = null;
+    function startPolling() {{
+        if (!pollTimer) pollTimer = setInterval(loadData, {LIVE_POLL_INTERVAL * 1000});
+    }}
+    function connectLive() {{
+        if (!window.EventSource) return startPolling();
+        const source = new EventSource(`/api/guild/${{serverId}}/events`);
+        let opened = false;
+        // Reconnects may have missed changes, so reload the full view once the stream is back
+        source.onopen = () => {{
+            if (opened) loadData();
+            opened = true;
+        }};
+        source.addEventListener('pending', e => applyLiveUpdate('pending', JSON.parse(e.data)));
+        source.addEventListener('approved', e => applyLiveUpdate('approved', JSON.parse(e.data)));
+        source.addEventListener('remove', e => applyLiveUpdate(null, JSON.parse(e.data)));
+        source.addEventListener('resync', () => loadData());
+        source.addEventListener('close', () => {{
+            source.close();
+            startPolling();
+        }});
+        // Closed rather than reconnecting means the server refused the stream
+        source.onerror = () => {{
+            if (source.readyState === EventSource.CLOSED) startPolling();
+        }};
+    }}
+
+    let bulkIds = [];
+    function bulkModerate(action, btn) {{
+        if (!confirm(`${{action === 'approve' ? 'Approve' : 'Reject'}} ${{bulkIds.length}} pending requests?`)) return;
+        disableBtn(btn);
+        fetch(`/api/guild/${{serverId}}/moderate`, {{
+            method: 'POST',
+            headers: {{'X-CSRF-Token': csrfToken, 'Content-Type': 'application/json'}},
+            body: JSON.stringify({{action: action, ids: bulkIds}})
+        }})
+            .then(res => res.json())
+            .then(data => {{
+                if (!data.success) {{
+                    alert(data.error || 'Failed');
+                }} else if (Object.keys(data.skipped).length > 0) {{
+                    alert(`${{data.applied.length}} done, ${{Object.keys(data.skipped).length}} skipped.`);
+                }}
+                loadData();
+            }})
+            .catch(() => location.reload());
+    }}
     function edit_pending(id) {{
         window.location.href = `/edit_pending/${{id}}`;
     }}
@@ -1118,7 +1223,17 @@ def view(server_id):
     function delete_experience(id, btn) {{
         if (confirm('Are you sure you want to delete this experience?')) {{
             disableBtn(btn);
-            fetch(`/delete/${{id}}`, {{method: 'POST', headers: {{'X-CSRF-Token': csrfToken}}}}).then(() => location.reload());
+            fetch(`/delete/${{id}}`, {{method: 'POST', headers: {{'X-CSRF-Token': csrfToken}}}})
+                .then(res => res.json())
+                .then(data => {{
+                    if (data.success) {{
+                        applyLiveUpdate(null, {{id: data.removed}});
+                    }} else {{
+                        alert(data.error || 'Failed');
+                        location.reload();
+                    }}
+                }})
+                .catch(() => location.reload());
         }}
     }}
 
@@ -1156,11 +1271,73 @@ def view(server_id):
     }}
 
     loadData();
+    connectLive();
     </script>
     """
     
     return wrap_page(f"Manage Server", content, nav_links=[("/dashboard", "Dashboard", ""), ("/settings", "Settings", ""), ("/premium", "Premium", ""), ("/logout", "Logout", "")])
 
+def build_server_view_lists(all_exp, role, user_id):
+    pending_list = [exp for exp in all_exp if exp.get("status") == "pending"]
+    approved_list = [exp for exp in all_exp if exp.get("status") == "approved"]
+
+    sort_experiences(pending_list)
+    sort_experiences(approved_list)
+
+    # Process pending
+    pending_data = []
+    for exp in pending_list:
+        can_approve = can_approve_request(role, exp, user_id)
+
+        pending_data.append({
+            "id": exp['id'],
+            "role_title": exp.escaped('role_title'),
+            "user_name": exp.escaped('user_name'),
+            "user_id": exp.escaped('user_id'),
+            "start_month": exp['start_month'],
+            "start_year": exp['start_year'],
+            "end_month": exp.get('end_month', 'N/A'),
+            "end_year": exp.get('end_year', 'N/A'),
+            "description": exp.escaped('description', 'No description provided.'),
+            "can_approve": can_approve,
+            "can_reject": can_approve,
+            "can_edit": can_approve,
+            "sort_key": exp.sort_key
+        })
+
+    # Process approved
+    approved_data = []
+    for exp in approved_list:
+        exp_user_role = exp.get("requester_role", "Member")
+        can_edit = False
+        can_delete = False
+        if role == "Server Owner":
+            can_edit = True
+            can_delete = True
+        elif role == "Administrator":
+            if exp_user_role not in ["Server Owner", "Administrator"] and str(exp['user_id']) != user_id:
+                can_edit = True
+
+        end = f"{exp.get('end_month')}/{exp.get('end_year')}" if exp.get('end_month') else 'Present';
+
+        approved_data.append({
+            "id": exp['id'],
+            "role_title": exp.escaped('role_title'),
+            "user_name": exp.escaped('user_name'),
+            "user_id": exp.escaped('user_id'),
+            "start_month": exp['start_month'],
+            "start_year": exp['start_year'],
+            "end_display": end,
+            "description": exp.escaped('description'),
+            "approver_name": exp.escaped('approver_name', 'Unknown'),
+            "approver_id": exp.escaped('approved_by'),
+            "can_edit": can_edit,
+            "can_delete": can_delete,
+            "sort_key": exp.sort_key
+        })
+
+    return pending_data, approved_data
+
 @dashboard.route("/api/guild/<server_id>")
 @limiter.limit("10 per minute")
 def api_server_view(server_id):
@@ -1171,77 +1348,18 @@ def api_server_view(server_id):
     
     try:
         role, guild_data = get_user_role_and_guild(user_id, server_id, discord_token)
+        if role:
+            role_cache.set((user_id, server_id), role)
         if role not in ["Server Owner", "Administrator"]:
             return jsonify({"error": "Not authorized"}), 403
         
         all_exp = get_all_experiences_for_server(server_id)
-        pending_list = [exp for exp in all_exp if exp.get("status") == "pending"]
-        approved_list = [exp for exp in all_exp if exp.get("status") == "approved"]
-        
-        pending_list.sort(key=lambda x: (int(x["start_year"]), int(x["start_month"]), int(x.get("end_year") or 9999), int(x.get("end_month") or 12)), reverse=True)
-        approved_list.sort(key=lambda x: (int(x["start_year"]), int(x["start_month"]), int(x.get("end_year") or 9999), int(x.get("end_month") or 12)), reverse=True)
+        pending_data, approved_data = build_server_view_lists(all_exp, role, user_id)
 
         # Get server name
         server_name = guild_data.get("name", "Unknown Server") if guild_data else "Unknown Server"
         
-        # Process pending
-        pending_data = []
-        for exp in pending_list:
-            if role == "Server Owner":
-                can_approve = True
-            elif role == "Administrator":
-                requester_role = exp.get("requester_role")
-                can_approve = requester_role not in ["Server Owner", "Administrator"] and str(exp['user_id']) != user_id
-            else:
-                can_approve = False
-            
-            pending_data.append({
-                "id": exp['id'],
-                "role_title": html.escape(exp['role_title']),
-                "user_name": html.escape(exp['user_name']),
-                "user_id": html.escape(str(exp['user_id'])),
-                "start_month": exp['start_month'],
-                "start_year": exp['start_year'],
-                "end_month": exp.get('end_month', 'N/A'),
-                "end_year": exp.get('end_year', 'N/A'),
-                "description": html.escape(exp.get('description', 'No description provided.')),
-                "can_approve": can_approve,
-                "can_reject": can_approve,
-                "can_edit": can_approve
-            })
-
-        # Process approved
-        approved_data = []
-        for exp in approved_list:
-            exp_user_role = exp.get("requester_role", "Member")
-            can_edit = False
-            can_delete = False
-            if role == "Server Owner":
-                can_edit = True
-                can_delete = True
-            elif role == "Administrator":
-                if exp_user_role not in ["Server Owner", "Administrator"] and str(exp['user_id']) != user_id:
-                    can_edit = True
-            
-            end = f"{exp.get('end_month')}/{exp.get('end_year')}" if exp.get('end_month') else 'Present';
-            
-            approved_data.append({
-                "id": exp['id'],
-                "role_title": html.escape(exp['role_title']),
-                "user_name": html.escape(exp['user_name']),
-                "user_id": html.escape(str(exp['user_id'])),
-                "start_month": exp['start_month'],
-                "start_year": exp['start_year'],
-                "end_display": end,
-                "description": html.escape(exp.get('description', '')),
-                "approver_name": html.escape(exp.get('approver_name', 'Unknown')),
-                "approver_id": html.escape(str(exp.get('approved_by', ''))),
-                "can_edit": can_edit,
-                "can_delete": can_delete
-            })
-
-        user_data = get_user_data(user_id)
-        is_premium = user_data.get("premium", False)
+        is_premium = get_entitlements(user_id).is_premium
         is_owner = role == "Server Owner"
         
         server_vanity = "";
@@ -1280,7 +1398,7 @@ def api_server_view(server_id):
                     else:
                         notification_channel_name = "bot cannot see/view the channel. double check permissions."
         except Exception as e:
-            print(f"Error checking bot status: {e}")
+            logger.warning("Error checking bot status for %s: %s", server_id, e)
 
         return jsonify({
             "server_name": html.escape(server_name),
@@ -1297,6 +1415,105 @@ def api_server_view(server_id):
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+def format_sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@dashboard.route("/api/guild/<server_id>/events")
+@limiter.limit("10 per minute")
+def server_events(server_id):
+    if "user_id" not in session:
+        return jsonify({"error": "Not authenticated"}), 401
+    user_id = session["user_id"]
+    discord_token = session['discord_token']
+
+    role = get_cached_user_role(user_id, server_id, discord_token)
+    if role not in ["Server Owner", "Administrator"]:
+        return jsonify({"error": "Not authorized"}), 403
+
+    try:
+        q = subscribe(server_id, user_id)
+    except LiveUnavailable:
+        # EventSource gives up on a non-200 answer and the page switches to polling
+        return jsonify({"error": "Live updates are unavailable right now.", "poll_interval": LIVE_POLL_INTERVAL}), 503, {"Retry-After": str(LIVE_POLL_INTERVAL)}
+
+    def stream():
+        # Streams are closed after SSE_MAX_AGE so the browser reconnects and the role is checked again
+        deadline = monotonic() + SSE_MAX_AGE
+        yield "retry: 5000\n\n"
+        while monotonic() < deadline:
+            try:
+                kind, payload = q.get(timeout=SSE_KEEPALIVE)
+            except queue.Empty:
+                yield ": keepalive\n\n"
+                continue
+            if kind == "upsert":
+                pending_data, approved_data = build_server_view_lists([payload], role, user_id)
+                if pending_data:
+                    yield format_sse("pending", pending_data[0])
+                elif approved_data:
+                    yield format_sse("approved", approved_data[0])
+                else:
+                    yield format_sse("remove", {"id": payload.id})
+            elif kind == "close":
+                # The server's listener failed; the page polls instead of reconnecting
+                yield format_sse("close", {})
+                return
+            else:
+                yield format_sse(kind, {"id": payload})
+
+    response = Response(stream(), mimetype="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+    # Runs even if the client disconnects before the first chunk, unlike a finally in the generator
+    response.call_on_close(lambda: unsubscribe(server_id, q, user_id))
+    return response
+
+@dashboard.route("/api/guild/<server_id>/moderate", methods=["POST"])
+@limiter.limit("10 per minute")
+def bulk_moderate(server_id):
+    if "user_id" not in session:
+        return jsonify({"error": "Not authenticated"}), 401
+    user_id = session["user_id"]
+    discord_token = session['discord_token']
+
+    data = request.get_json(silent=True) or {}
+    action = data.get("action")
+    exp_ids = data.get("ids")
+    if action not in BULK_ACTIONS:
+        return jsonify({"error": "Invalid action"}), 400
+    if not isinstance(exp_ids, list) or not exp_ids or not all(isinstance(i, str) for i in exp_ids):
+        return jsonify({"error": "No experiences selected"}), 400
+    if len(exp_ids) > BULK_LIMIT:
+        return jsonify({"error": f"You can moderate up to {BULK_LIMIT} experiences at once."}), 400
+
+    role = get_cached_user_role(user_id, server_id, discord_token)
+    if role not in ["Server Owner", "Administrator"]:
+        return jsonify({"error": "Not authorized"}), 403
+
+    experiences = db.reference("Experiences").order_by_child("server_id").equal_to(server_id).get() or {}
+
+    changes = []
+    skipped = {}
+    for exp_id in dict.fromkeys(exp_ids):
+        exp = experiences.get(exp_id)
+        if not exp:
+            skipped[exp_id] = "Not found"
+        elif action == "delete":
+            if exp.get("status") != "approved":
+                skipped[exp_id] = "Not approved"
+            elif role != "Server Owner" and str(exp.get("user_id")) != user_id:
+                skipped[exp_id] = "Not authorized"
+            else:
+                changes.append((exp_id, action))
+        elif exp.get("status") != "pending":
+            skipped[exp_id] = "Not pending"
+        elif not can_approve_request(role, exp, user_id):
+            skipped[exp_id] = "Only the server owner can approve or reject this request"
+        else:
+            changes.append((exp_id, action))
+
+    moderate_experiences(changes, user_id)
+    record_experience_changes([(experiences[exp_id], dict(experiences[exp_id], status="approved") if action == "approve" else None) for exp_id, action in changes])
+    return jsonify({"success": True, "applied": [exp_id for exp_id, _ in changes], "skipped": skipped})
+
 @dashboard.route("/api/server_settings/<server_id>", methods=["POST"])
 @limiter.limit("5 per minute")
 def save_server_settings(server_id):
@@ -1307,8 +1524,7 @@ def save_server_settings(server_id):
     discord_token = session['discord_token']
     
     # Check premium
-    user_data = get_user_data(user_id)
-    if not user_data.get("premium", False):
+    if not get_entitlements(user_id).can_set_vanity_url:
         return jsonify({"error": "Premium required"}), 403
         
     # Check owner
@@ -1331,33 +1547,32 @@ def save_server_settings(server_id):
                     return jsonify({"error": "Vanity URL already taken"}), 400
     
     db.reference(f"Dashboard Servers/{server_id}").update({"vanity_url": vanity_url})
+    invalidate_vanity("server")
     return jsonify({"success": True})
 
 @dashboard.route("/approve/<exp_id>", methods=["POST"])
 @limiter.limit("1 per second")
 def approve(exp_id):
     if "user_id" not in session:
-        return "Not logged in", 401
+        return jsonify({"error": "Not logged in"}), 401
     user_id = session["user_id"]
     discord_token = session['discord_token']
     exp = db.reference(f"Experiences/{exp_id}").get()
     if not exp:
-        return "Not found", 404
+        return jsonify({"error": "Not found"}), 404
     server_id = exp["server_id"]
-    role = get_user_role_in_server(user_id, server_id, discord_token)
+    role = get_cached_user_role(user_id, server_id, discord_token)
     if role not in ["Server Owner", "Administrator"]:
-        return "Not authorized", 403
-    if role == "Server Owner":
-        can_approve = True
-    elif role == "Administrator":
-        requester_role = exp.get("requester_role")
-        can_approve = requester_role not in ["Server Owner", "Administrator"] and str(exp['user_id']) != user_id
-    else:
-        can_approve = False
-    if not can_approve:
+        return jsonify({"error": "Not authorized"}), 403
+    if not can_approve_request(role, exp, user_id):
         return jsonify({"error": "You cannot approve this request. You cannot approve your own, other admins', or the owner's request. Only the server owner can approve such request."}), 403
     approve_experience(exp_id, user_id)
-    return jsonify({"success": True})
+    record_experience_change(exp, dict(exp, status="approved"))
+
+    # Hand back the entry as the manage-server view shows it, so the page moves one card instead of reloading
+    exp.update({"approved_by": user_id, "status": "approved"})
+    _, approved_data = build_server_view_lists([make_server_experience_record(exp_id, exp)], role, user_id)
+    return jsonify({"success": True, "approved": approved_data[0]})
 
 @dashboard.route("/reject/<exp_id>", methods=["POST"])
 @limiter.limit("1 per second")
@@ -1370,16 +1585,14 @@ def reject(exp_id):
     if not exp:
         return jsonify({"error": "Not found"}), 404
     server_id = exp["server_id"]
-    role = get_user_role_in_server(user_id, server_id, discord_token)
+    role = get_cached_user_role(user_id, server_id, discord_token)
     if role not in ["Server Owner", "Administrator"]:
         return jsonify({"error": "Not authorized"}), 403
-    if role == "Administrator":
-        requester_role = exp.get("requester_role")
-        if requester_role in ["Server Owner", "Administrator"] or str(exp['user_id']) == user_id:
-             return jsonify({"error": "You cannot reject this request. You cannot approve/reject/edit your own, other admins', or the owner's request. Only the server owner can approve/reject/edit such request."}), 403
+    if not can_approve_request(role, exp, user_id):
+        return jsonify({"error": "You cannot reject this request. You cannot approve/reject/edit your own, other admins', or the owner's request. Only the server owner can approve/reject/edit such request."}), 403
     log_history(exp_id, "Rejected", user_id)
     reject_experience(exp_id)
-    return jsonify({"success": True})
+    return jsonify({"success": True, "removed": exp_id})
 
 @dashboard.route("/edit_pending/<exp_id>", methods=["GET", "POST"])
 @limiter.limit("10 per minute")
@@ -1392,7 +1605,7 @@ def edit_pending(exp_id):
     if not exp:
         return error_page("Not found", 404)
     server_id = exp["server_id"]
-    role = get_user_role_in_server(user_id, server_id, discord_token)
+    role = get_cached_user_role(user_id, server_id, discord_token)
     
     # Allow if server owner/admin OR if it's the user's own request
     if role not in ["Server Owner", "Administrator"] and str(exp.get("user_id")) != user_id:
@@ -1404,9 +1617,7 @@ def edit_pending(exp_id):
              return error_page("You cannot edit this request. You cannot approve/reject/edit your own, other admins', or the owner's request. Only the server owner can approve/reject/edit such request.", 403)
     
     exp_user_id = str(exp["user_id"])
-    user_data = get_user_data(exp_user_id)
-    is_premium = user_data.get("premium", False)
-    limit = DESC_LIMIT_PREMIUM if is_premium else DESC_LIMIT_FREE
+    limit = get_entitlements(exp_user_id).description_limit
 
     if request.method == "POST":
         start_month = request.form.get("start_month")
@@ -1501,7 +1712,7 @@ def edit_accepted(exp_id):
     if not exp or exp.get("status") != "approved":
         return error_page("Not found or not approved", 404)
     server_id = exp["server_id"]
-    role = get_user_role_in_server(user_id, server_id, discord_token)
+    role = get_cached_user_role(user_id, server_id, discord_token)
     if role not in ["Server Owner", "Administrator"]:
         return error_page("Not authorized", 403)
     if role == "Administrator":
@@ -1510,9 +1721,7 @@ def edit_accepted(exp_id):
             return error_page("You cannot edit this request. You cannot approve/reject/edit your own, other admins', or the owner's request. Only the server owner can approve/reject/edit such request.", 403)
             
     exp_user_id = str(exp["user_id"])
-    user_data = get_user_data(exp_user_id)
-    is_premium = user_data.get("premium", False)
-    limit = DESC_LIMIT_PREMIUM if is_premium else DESC_LIMIT_FREE
+    limit = get_entitlements(exp_user_id).description_limit
 
     if request.method == "POST":
         # Validation
@@ -1542,6 +1751,7 @@ def edit_accepted(exp_id):
             if val or field in ["end_month", "end_year", "description"]:  # allow empty for end and description
                 updates[field] = val if val else None
         db.reference(f"Experiences/{exp_id}").update(updates)
+        record_experience_change(exp, dict(exp, **updates))
         log_history(exp_id, "Edited Approved", user_id, updates)
         return redirect(f"/view/{server_id}")
     
@@ -1613,6 +1823,7 @@ def end(exp_id):
                 return error_page("Invalid date format.", 400)
 
         update_experience_end_date(exp_id, end_month, end_year, session.get("user_id"))
+        record_experience_change(exp, dict(exp, end_month=end_month, end_year=end_year))
         return redirect("/dashboard")
     
     content = f"""
@@ -1646,62 +1857,103 @@ def end(exp_id):
 @limiter.limit("1 per second")
 def delete(exp_id):
     if "user_id" not in session:
-        return "Not logged in", 401
+        return jsonify({"error": "Not logged in"}), 401
     user_id = session["user_id"]
     discord_token = session['discord_token']
     exp = db.reference(f"Experiences/{exp_id}").get()
     if not exp or exp.get("status") != "approved":
-        return "Not found or not approved", 404
+        return jsonify({"error": "Not found or not approved"}), 404
     
     # Allow if user is the creator OR Server Owner
     if str(exp.get("user_id")) != user_id:
         server_id = exp["server_id"]
-        role = get_user_role_in_server(user_id, server_id, discord_token)
+        role = get_cached_user_role(user_id, server_id, discord_token)
         if role != "Server Owner":
-            return "Not authorized", 403
+            return jsonify({"error": "Not authorized"}), 403
 
     log_history(exp_id, "Deleted", user_id)
     reject_experience(exp_id)
-    return "Deleted"
+    record_experience_change(exp, None)
+    return jsonify({"success": True, "removed": exp_id})
 
 @dashboard.route("/delete_pending/<exp_id>", methods=["POST"])
 @limiter.limit("1 per second")
 def delete_pending(exp_id):
     if "user_id" not in session:
-        return "Not logged in", 401
+        return jsonify({"error": "Not logged in"}), 401
     user_id = session["user_id"]
     
     exp_ref = db.reference(f"Experiences/{exp_id}")
     exp = exp_ref.get()
     if not exp:
-        return "Not found", 404
+        return jsonify({"error": "Not found"}), 404
         
     if exp.get("status") != "pending":
-        return "Not a pending request", 400
+        return jsonify({"error": "Not a pending request"}), 400
         
     # Allow if user is the creator
     if str(exp.get("user_id")) != user_id:
-        return "Not authorized", 403
+        return jsonify({"error": "Not authorized"}), 403
         
     log_history(exp_id, "Deleted", user_id)
     exp_ref.delete()
-    return "Deleted"
+    return jsonify({"success": True, "removed": exp_id})
+
+def render_timeline_cards(experiences):
+    cards = ""
+    for exp in experiences:
+        end = f"{exp.get('end_month', '')}/{exp.get('end_year', '')}" if exp.get('end_month') else '<span class="text-green-400">Present</span>';
+        is_pinned = exp.get('is_pinned', False)
+
+        border_class = "border-yellow-500/50 shadow-[0_0_15px_rgba(234,179,8,0.1)]" if is_pinned else "hover:bg-white/5"
+        pin_badge = '<div class="absolute top-0 right-0 bg-yellow-500 text-black text-[10px] font-bold px-2 py-0.5 rounded-bl-lg z-10">PINNED</div>' if is_pinned else '';
+
+        cards += f"""
+        <div class="glass p-6 rounded-xl {border_class} transition-colors relative overflow-hidden group">
+            {pin_badge}
+            <div class="absolute top-0 left-0 w-1 h-full bg-gradient-to-b from-indigo-500 to-purple-500"></div>
+            <div class="flex justify-between items-start gap-4">
+                <div class="flex-grow min-w-0">
+                    <h3 class="text-xl font-semibold text-white mb-1">{exp.escaped('role_title')}</h3>
+                    <div class="text-indigo-400 font-medium mb-2">
+                        <a href="/s/{exp['server_id']}" class="hover:underline" target="_blank">{exp.escaped('server_name')}</a>
+                    </div>
+                    <p class="text-gray-300 text-sm leading-relaxed mb-4">{exp.escaped('description')}</p>
+                    <div class="flex flex-col gap-1 text-xs text-gray-500">
+                        <div class="flex items-center gap-2">
+                            <svg class="w-4 h-4 text-green-500" fill="none" stroke="currentColor" viewBox="0 0 24 24"><path stroke-linecap="round" stroke-linejoin="round" stroke-width="2" d="M9 12l2 2 4-4m6 2a9 9 0 11-18 0 9 9 0 0118 0z"></path></svg>
+                            <span>Verified by <a href="/u/{exp.get('approved_by_slug') or exp['approved_by']}" target="_blank" class="hover:underline hover:text-indigo-400 transition-colors">{exp.escaped('approved_by_name')}</a></span>
+                        </div>
+                        <div class="flex items-center gap-2">
+                            <a href="/experience/{exp['id']}" class="hover:text-indigo-400 transition-colors flex items-center gap-2" title="View Entry History">
+                                <svg class="w-4 h-4" fill="none" stroke="currentColor" viewBox="0 0 24 24"><path stroke-linecap="round" stroke-linejoin="round" stroke-width="2" d="M12 8v4l3 3m6-3a9 9 0 11-18 0 9 9 0 0118 0z"></path></svg>
+                                View Entry History
+                            </a>
+                        </div>
+                    </div>
+                </div>
+                <div class="text-right flex-shrink-0">
+                    <div class="text-sm font-mono text-gray-400 bg-gray-800/50 px-3 py-1 rounded-full inline-block whitespace-nowrap">
+                        {exp['start_month']}/{exp['start_year']} - {end}
+                    </div>
+                </div>
+            </div>
+        </div>
+        """
+    return cards
 
 @dashboard.route("/u/<user_id>")
 @limiter.limit("20 per minute")
 def public_timeline(user_id):
     if not user_id.isdigit():
-        ref = db.reference("Dashboard Users")
-        users = ref.order_by_child("vanity_url").equal_to(user_id).get()
-        if users:
-            user_id = list(users.keys())[0]
-        else:
+        user_id = resolve_vanity("user", user_id)
+        if user_id is None:
             return error_page("User not found", 404)
 
     experiences = get_user_experiences(user_id)
     # Sort: Pinned first, then by date (newest first)
     # Pinned (True) > Unpinned (False), so reverse=True puts Pinned first.
-    experiences.sort(key=lambda x: (x.get('is_pinned', False), int(x["start_year"]), int(x["start_month"]), int(x.get("end_year") or 9999), int(x.get("end_month") or 12)), reverse=True)
+    sort_experiences(experiences, pinned_first=True)
     
     user_data = get_user_data(user_id)
     if not user_data:
@@ -1711,7 +1963,7 @@ def public_timeline(user_id):
     display_name = global_name if global_name else username
     
     avatar = user_data.get("avatar")
-    avatar_url = f"https://cdn.discordapp.com/avatars/{user_id}/{avatar}.png?size=128" if avatar else "https://cdn.discordapp.com/embed/avatars/0.png"
+    avatar_url = discord_image_url("avatars", user_id, avatar, 128) if avatar else "https://cdn.discordapp.com/embed/avatars/0.png"
     
     banner = user_data.get("banner")
     banner_color = user_data.get("banner_color")
@@ -1720,8 +1972,7 @@ def public_timeline(user_id):
     banner_height_class = "h-32 sm:h-48"
     
     if banner:
-        ext = "gif" if banner.startswith("a_") else "png"
-        banner_url = f"https://cdn.discordapp.com/banners/{user_id}/{banner}.{ext}?size=1024"
+        banner_url = discord_image_url("banners", user_id, banner, 1024)
         banner_style = f'background-image: url({banner_url}); background-size: cover; background-position: center;'
         banner_height_class = "h-48 sm:h-80"
     elif banner_color:
@@ -1729,7 +1980,7 @@ def public_timeline(user_id):
     else:
         banner_style = 'background-color: #1f2937;'
 
-    is_premium = user_data.get("premium", False)
+    is_premium = get_entitlements(user_id, user_data).is_premium
     socials = user_data.get("socials", [])
     
     def get_social_icon(url):
@@ -1812,92 +2063,232 @@ def public_timeline(user_id):
         </div>
         """
     else:
-        for exp in experiences:
-            end = f"{exp.get('end_month', '')}/{exp.get('end_year', '')}" if exp.get('end_month') else '<span class="text-green-400">Present</span>';
-            is_pinned = exp.get('is_pinned', False)
-            
-            border_class = "border-yellow-500/50 shadow-[0_0_15px_rgba(234,179,8,0.1)]" if is_pinned else "hover:bg-white/5"
-            pin_badge = '<div class="absolute top-0 right-0 bg-yellow-500 text-black text-[10px] font-bold px-2 py-0.5 rounded-bl-lg z-10">PINNED</div>' if is_pinned else '';
+        content += render_timeline_cards(experiences)
             
-            content += f"""
-            <div class="glass p-6 rounded-xl {border_class} transition-colors relative overflow-hidden group">
-                {pin_badge}
-                <div class="absolute top-0 left-0 w-1 h-full bg-gradient-to-b from-indigo-500 to-purple-500"></div>
-                <div class="flex justify-between items-start gap-4">
-                    <div class="flex-grow min-w-0">
-                        <h3 class="text-xl font-semibold text-white mb-1">{html.escape(exp['role_title'])}</h3>
-                        <div class="text-indigo-400 font-medium mb-2">
-                            <a href="/s/{exp['server_id']}" class="hover:underline" target="_blank">{html.escape(exp['server_name'])}</a>
+    content += "</div></div>"
+    
+    return wrap_page(f"{username}'s Timeline", content, nav_links=[("/dashboard", "Dashboard", ""), ("/settings", "Settings", ""), ("/premium", "Premium", ""), ("/logout", "Logout", "")])
+
+def render_registry_cards(approved_list):
+    cards = ""
+    for exp in approved_list:
+        end = f"{exp.get('end_month')}/{exp.get('end_year')}" if exp.get('end_month') else '<span class="text-green-400">Present</span>'
+
+        approver_name = exp.escaped('approver_name') or 'Unknown'
+
+        cards += f"""
+        <div class="glass p-6 rounded-xl hover:bg-white/5 transition-colors relative overflow-hidden group">
+            <div class="absolute top-0 left-0 w-1 h-full bg-gradient-to-b from-indigo-500 to-purple-500"></div>
+            <div class="flex justify-between items-start gap-4">
+                <div class="flex-grow min-w-0">
+                    <h3 class="text-xl font-semibold text-white mb-1">{exp.escaped('role_title')}</h3>
+                    <div class="text-indigo-400 font-medium mb-2">
+                        <a href="/u/{exp.get('user_slug') or exp['user_id']}" class="hover:underline" target="_blank">{exp.escaped('user_name')}</a>
+                    </div>
+                    <p class="text-gray-300 text-sm leading-relaxed mb-4">{exp.escaped('description')}</p>
+                    <div class="flex flex-col gap-1 text-xs text-gray-500">
+                        <div class="flex items-center gap-2">
+                            <svg class="w-4 h-4 text-green-500" fill="none" stroke="currentColor" viewBox="0 0 24 24"><path stroke-linecap="round" stroke-linejoin="round" stroke-width="2" d="M9 12l2 2 4-4m6 2a9 9 0 11-18 0 9 9 0 0118 0z"></path></svg>
+                            <span>Verified by <a href="/u/{exp.get('approver_slug') or exp.get('approved_by')}" target="_blank" class="hover:underline hover:text-indigo-400 transition-colors">{approver_name}</a></span>
                         </div>
-                        <p class="text-gray-300 text-sm leading-relaxed mb-4">{html.escape(exp.get('description', ''))}</p>
-                        <div class="flex flex-col gap-1 text-xs text-gray-500">
-                            <div class="flex items-center gap-2">
-                                <svg class="w-4 h-4 text-green-500" fill="none" stroke="currentColor" viewBox="0 0 24 24"><path stroke-linecap="round" stroke-linejoin="round" stroke-width="2" d="M9 12l2 2 4-4m6 2a9 9 0 11-18 0 9 9 0 0118 0z"></path></svg>
-                                <span>Verified by <a href="/u/{exp.get('approved_by_slug') or exp['approved_by']}" target="_blank" class="hover:underline hover:text-indigo-400 transition-colors">{html.escape(exp['approved_by_name'])}</a></span>
-                            </div>
-                            <div class="flex items-center gap-2">
-                                <a href="/experience/{exp['id']}" class="hover:text-indigo-400 transition-colors flex items-center gap-2" title="View Entry History">
-                                    <svg class="w-4 h-4" fill="none" stroke="currentColor" viewBox="0 0 24 24"><path stroke-linecap="round" stroke-linejoin="round" stroke-width="2" d="M12 8v4l3 3m6-3a9 9 0 11-18 0 9 9 0 0118 0z"></path></svg>
-                                    View Entry History
-                                </a>
-                            </div>
+                        <div class="flex items-center gap-2">
+                            <a href="/experience/{exp['id']}" class="hover:text-indigo-400 transition-colors flex items-center gap-2" title="View Entry History">
+                                <svg class="w-4 h-4" fill="none" stroke="currentColor" viewBox="0 0 24 24"><path stroke-linecap="round" stroke-linejoin="round" stroke-width="2" d="M12 8v4l3 3m6-3a9 9 0 11-18 0 9 9 0 0118 0z"></path></svg>
+                                View Entry History
+                            </a>
                         </div>
                     </div>
-                    <div class="text-right flex-shrink-0">
-                        <div class="text-sm font-mono text-gray-400 bg-gray-800/50 px-3 py-1 rounded-full inline-block whitespace-nowrap">
-                            {exp['start_month']}/{exp['start_year']} - {end}
-                        </div>
+                </div>
+                <div class="text-right flex-shrink-0">
+                    <div class="text-sm font-mono text-gray-400 bg-gray-800/50 px-3 py-1 rounded-full inline-block whitespace-nowrap">
+                        {exp['start_month']}/{exp['start_year']} - {end}
                     </div>
                 </div>
             </div>
-            """
-            
-    content += "</div></div>"
-    
-    return wrap_page(f"{username}'s Timeline", content, nav_links=[("/dashboard", "Dashboard", ""), ("/settings", "Settings", ""), ("/premium", "Premium", ""), ("/logout", "Logout", "")])
+        </div>
+        """
+    return cards
+
+def format_tenure(months):
+    months = int(round(months))
+    years, months = divmod(months, 12)
+    parts = []
+    if years:
+        parts.append(f"{years} yr{'s' if years != 1 else ''}")
+    if months or not years:
+        parts.append(f"{months} mo{'s' if months != 1 else ''}")
+    return " ".join(parts)
+
+def render_server_stats(stats):
+    if not stats:
+        return ""
+    tenure = format_tenure(stats["average_tenure_months"]) if stats["average_tenure_months"] is not None else "Unknown"
+    roles_html = "".join(
+        f'<div class="flex justify-between gap-4"><span class="truncate">{html.escape(label)}</span><span class="text-gray-500">{count}</span></div>'
+        for label, count in stats["roles"][:5]
+    ) or '<div class="text-gray-500">No active staff</div>'
+
+    history = stats["staff_by_year"][-10:]
+    peak = max((staff for _, staff in history), default=0) or 1
+    bars_html = "".join(
+        f'<div class="flex-1 flex flex-col items-center justify-end gap-1" title="{year}: {staff} staff"><div class="w-full bg-indigo-500/60 rounded-t" style="height: {max(2, round(staff / peak * 64))}px"></div><span class="text-[10px] text-gray-500">{str(year)[2:]}</span></div>'
+        for year, staff in history
+    )
+
+    return f"""
+        <div class="grid grid-cols-1 sm:grid-cols-3 gap-4 mb-8 text-sm">
+            <div class="glass p-5 rounded-xl">
+                <div class="text-gray-400 mb-1">Active Staff</div>
+                <div class="text-2xl font-semibold text-white">{stats["active"]:,}</div>
+                <div class="text-gray-500 mt-1">{stats["approved"]:,} verified all time</div>
+                <div class="text-gray-400 mt-4 mb-1">Average Tenure</div>
+                <div class="text-lg font-semibold text-white">{tenure}</div>
+            </div>
+            <div class="glass p-5 rounded-xl">
+                <div class="text-gray-400 mb-3">Current Roles</div>
+                <div class="space-y-1 text-gray-300">{roles_html}</div>
+            </div>
+            <div class="glass p-5 rounded-xl">
+                <div class="text-gray-400 mb-3">Staff Over Time</div>
+                <div class="flex items-end gap-1 h-20">{bars_html}</div>
+            </div>
+        </div>
+    """
+
+def render_registry_loader(server_id, next_cursor):
+    if not next_cursor:
+        return ""
+    return f"""
+        <div id="registry-loader" class="text-center mt-6">
+            <button id="registry-more" data-cursor="{html.escape(next_cursor)}" class="bg-gray-800 hover:bg-gray-700 text-gray-300 px-6 py-2 rounded-lg text-sm font-medium transition-colors">Load more</button>
+        </div>
+        <script>
+        (function() {{
+            const button = document.getElementById('registry-more');
+            let loading = false;
+            function loadMore() {{
+                if (loading || !button.dataset.cursor) return;
+                loading = true;
+                button.disabled = true;
+                button.textContent = 'Loading...';
+                fetch(`/api/server/{server_id}/registry?cursor=${{encodeURIComponent(button.dataset.cursor)}}`)
+                    .then(res => res.json())
+                    .then(data => {{
+                        document.getElementById('registry-list').insertAdjacentHTML('beforeend', data.html || '');
+                        if (data.next_cursor) {{
+                            button.dataset.cursor = data.next_cursor;
+                            button.disabled = false;
+                            button.textContent = 'Load more';
+                        }} else {{
+                            document.getElementById('registry-loader').remove();
+                            observer.disconnect();
+                        }}
+                    }})
+                    .catch(() => {{
+                        button.disabled = false;
+                        button.textContent = 'Load more';
+                    }})
+                    .finally(() => {{ loading = false; }});
+            }}
+            button.addEventListener('click', loadMore);
+            const observer = new IntersectionObserver(entries => {{
+                if (entries.some(entry => entry.isIntersecting)) loadMore();
+            }}, {{rootMargin: '400px'}});
+            observer.observe(button);
+        }})();
+        </script>
+    """
+
+@dashboard.route("/api/server/<server_id>/registry")
+@limiter.limit("60 per minute")
+def api_server_registry(server_id):
+    if not server_id.isdigit():
+        return jsonify({"error": "Server not found"}), 404
+    try:
+        records, next_cursor = get_server_registry_page(server_id, request.args.get("cursor"), REGISTRY_PAGE_SIZE)
+    except ValueError:
+        return jsonify({"error": "Invalid cursor"}), 400
+    return jsonify({"html": render_registry_cards(records), "next_cursor": next_cursor})
+
+@dashboard.route("/api/search")
+@limiter.limit("60 per minute")
+def api_search():
+    """
+    Full-text search over approved experiences' role titles, server names and descriptions.
+    All query terms must match; results are newest first and paged with next_cursor.
+    """
+    query = request.args.get("q", "").strip()
+    if not query:
+        return jsonify({"error": "Missing query"}), 400
+    try:
+        limit = min(max(int(request.args.get("limit", SEARCH_PAGE_SIZE)), 1), SEARCH_PAGE_MAX)
+        matches, next_cursor = query_search_index(query, request.args.get("cursor"), limit)
+    except ValueError:
+        return jsonify({"error": "Invalid cursor or limit"}), 400
+    except SearchUnavailable:
+        return jsonify({"error": "Search is warming up. Please try again shortly."}), 503, {"Retry-After": "5"}
+    users = {}
+    results = [make_server_experience_record(exp_id, doc, users).to_json(escape=SEARCH_ESCAPED_FIELDS) for exp_id, doc in matches]
+    return jsonify({"results": results, "next_cursor": next_cursor})
+
+def fetch_guild_profile(server_id):
+    """
+    Fetches a guild with approximate counts using the bot token, or None if the bot can't see it.
+    While Discord is unreachable (timeout or open breaker) the last good copy is returned without
+    the member count, which would be stale.
+    """
+    try:
+        r = requests_session.get(f"{API_BASE}/guilds/{server_id}", params={"with_counts": "true"}, headers={"Authorization": f"Bot {BOT_TOKEN}"})
+    except requests.exceptions.RequestException:
+        cached = guild_profile_cache.get(server_id)
+        if cached is None:
+            return None
+        return {k: v for k, v in cached.items() if k not in ("approximate_member_count", "approximate_presence_count")}
+    if r.status_code != 200:
+        return None
+    guild = r.json()
+    guild_profile_cache.set(server_id, guild)
+    return guild
+
+def load_server_meta(server_id):
+    """
+    Server name, icon, banner, description and member count from Servers/<id>/meta. Only a server the
+    bot hasn't synced yet costs a Discord call, and the result seeds the node.
+    """
+    meta = get_server_meta(server_id)
+    if meta is None:
+        guild = fetch_guild_profile(server_id)
+        if guild is None:
+            return None
+        meta = server_meta_from_guild(guild)
+        # Without a member count this is the stale copy kept for Discord outages; don't persist it
+        if guild.get("approximate_member_count") is not None:
+            save_server_meta(server_id, meta)
+    return meta
 
 @dashboard.route("/s/<server_id>")
 @limiter.limit("20 per minute")
 def public_server_profile(server_id):
     if not server_id.isdigit():
-        servers_ref = db.reference("Dashboard Servers")
-        result = servers_ref.order_by_child("vanity_url").equal_to(server_id).get()
-        if result:
-            server_id = list(result.keys())[0]
-        else:
+        server_id = resolve_vanity("server", server_id)
+        if server_id is None:
             return error_page("Server not found", 404)
 
-    r = requests_session.get(f"{API_BASE}/guilds/{server_id}", params={"with_counts": "true"}, headers={"Authorization": f"Bot {BOT_TOKEN}"})
-    
-    server_name = "Unknown Server"
-    icon_url = "https://cdn.discordapp.com/embed/avatars/0.png"
-    member_count = None
-    created_at = "Unknown"
-    description = None
-    banner = None
-    
-    all_exp = get_all_experiences_for_server(server_id)
-    
-    if r.status_code == 200:
-        guild = r.json()
-        server_name = guild.get("name", "Unknown Server")
-        icon = guild.get("icon")
-        icon_url = f"https://cdn.discordapp.com/icons/{server_id}/{icon}.png?size=128" if icon else "https://cdn.discordapp.com/embed/avatars/0.png"
-        member_count = guild.get("approximate_member_count", 0)
-        description = guild.get("description")
-        banner = guild.get("banner")
-    else:
-        if not all_exp:
+    meta = load_server_meta(server_id)
+    if meta is None:
+        # Not synced by the bot yet: the newest request carries the most recent copy of the server's info
+        latest = get_latest_server_request(server_id)
+        if latest is None:
             return error_page("Server not found or bot not in server", 404)
-        
-        # Sort by requested_at to get latest info
-        sorted_exp = sorted(all_exp, key=lambda x: x.get("requested_at", 0), reverse=True)
-        latest = sorted_exp[0]
-        server_name = latest.get("server_name", "Unknown Server")
-        icon = latest.get("server_icon")
-        if icon:
-            icon_url = f"https://cdn.discordapp.com/icons/{server_id}/{icon}.png?size=128"
-        banner = latest.get("server_banner")
+        meta = {field: latest.get(field) for field in ("server_name", "server_icon", "server_banner")}
+
+    server_name = meta.get("server_name") or "Unknown Server"
+    icon = meta.get("server_icon")
+    icon_url = discord_image_url("icons", server_id, icon, 128) if icon else "https://cdn.discordapp.com/embed/avatars/0.png"
+    member_count = meta.get("member_count")
+    created_at = "Unknown"
+    description = meta.get("description")
+    banner = meta.get("server_banner")
 
     # Calculate creation date from snowflake
     try:
@@ -1907,9 +2298,6 @@ def public_server_profile(server_id):
     except:
         pass
 
-    approved_list = [exp for exp in all_exp if exp.get("status") == "approved"]
-    approved_list.sort(key=lambda x: (int(x["start_year"]), int(x["start_month"]), int(x.get("end_year") or 9999), int(x.get("end_month") or 12)), reverse=True)
-
     member_count_html = ""
     if member_count is not None:
         member_count_html = f"""
@@ -1921,8 +2309,8 @@ def public_server_profile(server_id):
 
     banner_style = ""
     if banner:
-        ext = "gif" if banner.startswith("a_") else "png"
-        banner_url = f"https://cdn.discordapp.com/banners/{server_id}/{banner}.{ext}?size=1024"
+        # Shown behind a dark overlay, so half the width is plenty
+        banner_url = discord_image_url("banners", server_id, banner, 512)
         banner_style = f'background-image: linear-gradient(rgba(0, 0, 0, 0.8), rgba(0, 0, 0, 0.8)), url({banner_url}); background-size: cover; background-position: center;'
 
     content = f"""
@@ -1948,80 +2336,40 @@ def public_server_profile(server_id):
             <p class="text-gray-400 font-medium border-t border-gray-700 pt-6">Server Experience Registry</p>
         </div>
         
-        <div class="space-y-6">
+        {render_server_stats(get_server_stats(server_id))}
+        
+        <div id="registry-list" class="space-y-6">
     """
     
-    if not approved_list:
-        content += """
+    page_head, page_tail = wrap_page_parts(f"{server_name} - Server Profile", nav_links=[("/dashboard", "Dashboard", ""), ("/settings", "Settings", ""), ("/premium", "Premium", ""), ("/logout", "Logout", "")])
+
+    def generate():
+        # The header goes out before the registry is queried, so time to first byte doesn't grow with its size
+        yield page_head + content
+        records, next_cursor = get_server_registry_page(server_id, limit=REGISTRY_PAGE_SIZE)
+        if not records:
+            yield """
         <div class="glass p-8 rounded-xl text-center text-gray-400">
             No experiences found for this server.
         </div>
         """
-    else:
-        for exp in approved_list:
-            end = f"{exp.get('end_month')}/{exp.get('end_year')}" if exp.get('end_month') else '<span class="text-green-400">Present</span>'
-            
-            approver_name = exp.get('approver_name') or 'Unknown';
-            
-            content += f"""
-            <div class="glass p-6 rounded-xl hover:bg-white/5 transition-colors relative overflow-hidden group">
-                <div class="absolute top-0 left-0 w-1 h-full bg-gradient-to-b from-indigo-500 to-purple-500"></div>
-                <div class="flex justify-between items-start gap-4">
-                    <div class="flex-grow min-w-0">
-                        <h3 class="text-xl font-semibold text-white mb-1">{html.escape(exp['role_title'])}</h3>
-                        <div class="text-indigo-400 font-medium mb-2">
-                            <a href="/u/{exp.get('user_slug') or exp['user_id']}" class="hover:underline" target="_blank">{html.escape(exp['user_name'])}</a>
-                        </div>
-                        <p class="text-gray-300 text-sm leading-relaxed mb-4">{html.escape(exp.get('description', ''))}</p>
-                        <div class="flex flex-col gap-1 text-xs text-gray-500">
-                            <div class="flex items-center gap-2">
-                                <svg class="w-4 h-4 text-green-500" fill="none" stroke="currentColor" viewBox="0 0 24 24"><path stroke-linecap="round" stroke-linejoin="round" stroke-width="2" d="M9 12l2 2 4-4m6 2a9 9 0 11-18 0 9 9 0 0118 0z"></path></svg>
-                                <span>Verified by <a href="/u/{exp.get('approver_slug') or exp.get('approved_by')}" target="_blank" class="hover:underline hover:text-indigo-400 transition-colors">{html.escape(approver_name)}</a></span>
-                            </div>
-                            <div class="flex items-center gap-2">
-                                <a href="/experience/{exp['id']}" class="hover:text-indigo-400 transition-colors flex items-center gap-2" title="View Entry History">
-                                    <svg class="w-4 h-4" fill="none" stroke="currentColor" viewBox="0 0 24 24"><path stroke-linecap="round" stroke-linejoin="round" stroke-width="2" d="M12 8v4l3 3m6-3a9 9 0 11-18 0 9 9 0 0118 0z"></path></svg>
-                                    View Entry History
-                                </a>
-                            </div>
-                        </div>
-                    </div>
-                    <div class="text-right flex-shrink-0">
-                        <div class="text-sm font-mono text-gray-400 bg-gray-800/50 px-3 py-1 rounded-full inline-block whitespace-nowrap">
-                            {exp['start_month']}/{exp['start_year']} - {end}
-                        </div>
-                    </div>
-                </div>
-            </div>
-            """
-            
-    content += "</div></div>"
-    
-    return wrap_page(f"{server_name} - Server Profile", content, nav_links=[("/dashboard", "Dashboard", ""), ("/settings", "Settings", ""), ("/premium", "Premium", ""), ("/logout", "Logout", "")])
+        else:
+            yield render_registry_cards(records)
+        yield "</div>" + render_registry_loader(server_id, next_cursor) + "</div>" + page_tail
+
+    return Response(stream_with_context(generate()), mimetype="text/html")
 
 def verify_payment(order_id):
-    auth = (PAYPAL_CLIENT_ID, PAYPAL_CLIENT_SECRET)
-    
-    token_url = f"{PAYPAL_API_BASE}/v1/oauth2/token"
-    headers = {"Accept": "application/json", "Accept-Language": "en_US"}
-    data = {"grant_type": "client_credentials"}
-    
     try:
-        r = requests_session.post(token_url, auth=auth, headers=headers, data=data)
-        r.raise_for_status()
-        access_token = r.json()["access_token"]
+        order_data = get_paypal_order(order_id)
+    except PAYPAL_UNAVAILABLE_ERRORS:
+        # PayPal being unreachable says nothing about the order; let the caller ask for a retry
+        raise
     except Exception as e:
-        print(f"PayPal Token Error: {e}")
+        logger.error("PayPal order verification error for %s: %s", order_id, e)
         return False
 
-    order_url = f"{PAYPAL_API_BASE}/v2/checkout/orders/{order_id}"
-    headers = {"Authorization": f"Bearer {access_token}"}
-    
     try:
-        r = requests_session.get(order_url, headers=headers)
-        r.raise_for_status()
-        order_data = r.json()
-        
         if order_data["status"] != "COMPLETED":
             return False
             
@@ -2035,7 +2383,7 @@ def verify_payment(order_id):
             
         return True
     except Exception as e:
-        print(f"PayPal Order Verification Error: {e}")
+        logger.error("Unexpected PayPal order payload for %s: %s", order_id, e)
         return False
 
 @dashboard.route("/payment/activate", methods=["POST"])
@@ -2050,33 +2398,57 @@ def activate_premium():
     
     if session["user_id"] != user_id:
         return jsonify({"error": "Unauthorized"}), 403
-        
-    if not verify_payment(order_id):
+
+    # Order IDs become Firebase keys
+    if not isinstance(order_id, str) or not PAYPAL_ORDER_ID_RE.match(order_id):
         return jsonify({"error": "Invalid payment verification"}), 400
+
+    # A replayed callback for an order this user already activated needs no PayPal call
+    claim = get_payment_order(order_id)
+    if claim:
+        if claim.get("user_id") != user_id:
+            return jsonify({"error": "This order ID has already been used."}), 400
+        if claim.get("status") == "activated":
+            return jsonify({"success": True})
         
-    # Check if order_id is already used
-    users_ref = db.reference("Dashboard Users")
-    existing_users = users_ref.order_by_child("paypal_order_id").equal_to(order_id).get()
-    
-    if existing_users:
-        for uid in existing_users:
-            if uid != user_id:
-                return jsonify({"error": "This order ID has already been used."}), 400
+    try:
+        verified = verify_payment(order_id)
+    except PAYPAL_UNAVAILABLE_ERRORS as e:
+        logger.warning("PayPal unavailable during verification of %s: %s", order_id, e)
+        return jsonify({"error": "Payment verification is temporarily unavailable. Your payment is safe; please try again in a minute."}), 503, {"Retry-After": str(get_breaker("paypal").retry_after())}
+    if not verified:
+        return jsonify({"error": "Invalid payment verification"}), 400
         
     try:
-        # Update user premium status
-        ref = db.reference(f"Dashboard Users/{user_id}")
-        ref.update({
-            "premium": True,
-            "premium_since": int(time()),
-            "paypal_order_id": order_id,
-            "payment_details": data.get("payment_details")
-        })
+        claim = claim_payment_order(order_id, user_id)
+        if claim.get("user_id") != user_id:
+            return jsonify({"error": "This order ID has already been used."}), 400
+        if claim.get("status") != "activated":
+            grant_premium_for_order(order_id, user_id, data.get("payment_details"))
+            invalidate_entitlements(user_id)
         return jsonify({"success": True})
     except Exception as e:
-        print(f"Payment activation error: {e}")
+        logger.exception("Payment activation error for %s", order_id)
         return jsonify({"error": str(e)}), 500
 
+@dashboard.route("/api/payment/status/<order_id>")
+@limiter.limit("60 per minute")
+def payment_status(order_id):
+    """
+    Polled by the premium page after checkout while the webhook worker activates the order.
+    """
+    if "user_id" not in session:
+        return jsonify({"error": "Not authenticated"}), 401
+    if not PAYPAL_ORDER_ID_RE.match(order_id):
+        return jsonify({"error": "Invalid order"}), 400
+
+    claim = get_payment_order(order_id)
+    if not claim:
+        return jsonify({"status": "pending"})
+    if claim.get("user_id") != session["user_id"]:
+        return jsonify({"status": "used"})
+    return jsonify({"status": "activated" if claim.get("status") == "activated" else "pending"})
+
 @dashboard.route("/premium")
 @limiter.limit("20 per minute")
 def premium_page():
@@ -2084,8 +2456,7 @@ def premium_page():
         return redirect(f"/login?redirect_to={quote(request.full_path)}")
     
     user_id = session["user_id"]
-    user_data = get_user_data(user_id)
-    is_premium = user_data.get('premium', False)
+    is_premium = get_entitlements(user_id).is_premium
     premium_price = PREMIUM_ONE_TIME_PRICE
     
     content = f"""
@@ -2179,6 +2550,35 @@ def premium_page():
         if (isPremium) {{
             document.getElementById('paypal-button-container').innerHTML = '<div class="w-full bg-green-600 text-white font-semibold py-3 px-6 rounded-lg text-center">Plan Active</div>';
         }} else {{
+            // The PayPal webhook activates premium in the background; poll for it and only
+            // fall back to verifying the order ourselves if it hasn't arrived after a while
+            function waitForActivation(orderId, details, attempt = 0) {{
+                return fetch(`/api/payment/status/${{orderId}}`)
+                    .then(res => res.json())
+                    .then(result => {{
+                        if (result.status === 'activated') {{
+                            window.location.href = '/dashboard';
+                        }} else if (result.status === 'used') {{
+                            alert('This payment has already been used by another account. Contact support.');
+                        }} else if (attempt < 8) {{
+                            return new Promise(resolve => setTimeout(resolve, 1500)).then(() => waitForActivation(orderId, details, attempt + 1));
+                        }} else {{
+                            return activatePayment(orderId, details);
+                        }}
+                    }})
+                    .catch(() => activatePayment(orderId, details));
+            }}
+            function activatePayment(orderId, details) {{
+                return fetch('/payment/activate', {{
+                    method: 'POST',
+                    headers: {{ 'Content-Type': 'application/json', 'X-CSRF-Token': csrfToken }},
+                    body: JSON.stringify({{ user_id: "{user_id}", order_id: orderId, payment_details: details }})
+                }}).then(response => {{
+                    if (response.ok) window.location.href = '/dashboard';
+                    else alert('Payment processed but activation failed. Contact support.');
+                }});
+            }}
+
             paypal.Buttons({{
                 createOrder: function(data, actions) {{
                     return actions.order.create({{
@@ -2193,14 +2593,7 @@ def premium_page():
                 onApprove: function(data, actions) {{
                     return actions.order.capture().then(function(details) {{
                         document.getElementById('paypal-button-container').innerHTML = '<div class="text-center text-white">Processing payment...</div>';
-                        return fetch('/payment/activate', {{
-                            method: 'POST',
-                            headers: {{ 'Content-Type': 'application/json', 'X-CSRF-Token': csrfToken }},
-                            body: JSON.stringify({{ user_id: "{user_id}", order_id: data.orderID, payment_details: details }})
-                        }}).then(response => {{
-                            if (response.ok) window.location.href = '/dashboard';
-                            else alert('Payment processed but activation failed. Contact support.');
-                        }});
+                        return waitForActivation(data.orderID, details);
                     }});
                 }},
                 onError: function(err) {{
@@ -2221,38 +2614,22 @@ def server_premium_page(server_id):
     if "user_id" not in session:
         return redirect(f"/login?redirect_to={quote(request.full_path)}")
     
-    if server_id not in ALLOWED_PREMIUM_SERVERS:
+    if not is_premium_offer_server(server_id):
         return error_page("This server is not eligible for the premium offer.", 404)
 
     user_id = session["user_id"]
     discord_token = session.get("discord_token")
     
     role = get_user_role_in_server(user_id, server_id, discord_token)
-    if not role or role not in ["Server Owner", "Administrator", "Moderator"]:
+    if not can_redeem_server_premium(server_id, role):
         return error_page("You must be a staff member (Owner, Admin, Mod) of this server to access this page.", 403)
 
-    r = requests_session.get(f"{API_BASE}/guilds/{server_id}", params={"with_counts": "true"}, headers={"Authorization": f"Bot {BOT_TOKEN}"})
-    
-    server_name = "Unknown Server"
-    icon_url = "https://cdn.discordapp.com/embed/avatars/0.png"
-    
-    if r.status_code == 200:
-        guild = r.json()
-        server_name = guild.get("name", "Unknown Server")
-        icon = guild.get("icon")
-        icon_url = f"https://cdn.discordapp.com/icons/{server_id}/{icon}.png?size=128" if icon else "https://cdn.discordapp.com/embed/avatars/0.png"
-    else:
-        all_exp = get_all_experiences_for_server(server_id)
-        if all_exp:
-            sorted_exp = sorted(all_exp, key=lambda x: x.get("requested_at", 0), reverse=True)
-            latest = sorted_exp[0]
-            server_name = latest.get("server_name", "Unknown Server")
-            icon = latest.get("server_icon")
-            if icon:
-                icon_url = f"https://cdn.discordapp.com/icons/{server_id}/{icon}.png?size=128"
+    meta = load_server_meta(server_id) or {}
+    server_name = meta.get("server_name") or "Unknown Server"
+    icon = meta.get("server_icon")
+    icon_url = discord_image_url("icons", server_id, icon, 128) if icon else "https://cdn.discordapp.com/embed/avatars/0.png"
 
-    user_data = get_user_data(user_id)
-    is_premium = user_data.get('premium', False)
+    is_premium = get_entitlements(user_id).is_premium
     premium_price = PREMIUM_ONE_TIME_PRICE
 
     content = f"""
@@ -2393,14 +2770,14 @@ def redeem_premium():
     data = request.get_json()
     server_id = data.get("server_id")
     
-    if not server_id or server_id not in ALLOWED_PREMIUM_SERVERS:
+    if not server_id or not is_premium_offer_server(server_id):
         return jsonify({"error": "Invalid server ID"}), 400
         
     user_id = session["user_id"]
     discord_token = session.get("discord_token")
     
     role = get_user_role_in_server(user_id, server_id, discord_token)
-    if not role or role not in ["Server Owner", "Administrator", "Moderator"]:
+    if not can_redeem_server_premium(server_id, role):
         return jsonify({"error": "Unauthorized"}), 403
         
     try:
@@ -2410,9 +2787,10 @@ def redeem_premium():
             "premium_since": int(time()),
             "premium_source": f"server_redemption_{server_id}"
         })
+        invalidate_entitlements(user_id)
         return jsonify({"success": True})
     except Exception as e:
-        print(f"Redemption error: {e}")
+        logger.exception("Premium redemption error")
         return jsonify({"error": str(e)}), 500
 
 @dashboard.route("/experience/<exp_id>")
@@ -0,0 +1,70 @@
+import io
+import logging
+
+import requests
+from flask import Blueprint, request, jsonify, send_file
+from PIL import UnidentifiedImageError
+
+from app.dashboard import limiter
+from utils.images import IMAGE_KINDS, IMAGE_HASH_RE, image_cache, snap_size, source_url, to_webp
+from utils.request import requests_session
+from utils.resilience import get_breaker
+
+images = Blueprint('images', __name__)
+logger = logging.getLogger(__name__)
+
+# URLs embed the image hash, so a response never changes
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+def fetch_variant(kind, entity_id, image_hash, size, key):
+    """
+    Downloads one size from the CDN, re-encodes it and stores it. Returns (digest, file) like
+    ImageCache.open, or None if Discord no longer has the image.
+    """
+    r = requests_session.get(source_url(kind, entity_id, image_hash, size))
+    if r.status_code != 200:
+        return None
+    try:
+        data = to_webp(r.content, size)
+        # Served from memory, since another worker may evict the blob before it is sent
+        return image_cache.put(key, data), io.BytesIO(data)
+    except (UnidentifiedImageError, OSError) as e:
+        logger.warning("Could not convert %s: %s", key, e)
+        return None
+
+@images.route("/img/<kind>/<entity_id>/<image_hash>.webp")
+@limiter.limit("300 per minute")
+def discord_image(kind, entity_id, image_hash):
+    """
+    Serves a Discord avatar, icon or banner as resized WebP from the local cache, fetching it from
+    the CDN on the first request for each size.
+    """
+    if kind not in IMAGE_KINDS or not entity_id.isdigit() or not IMAGE_HASH_RE.match(image_hash):
+        return jsonify({"error": "Not found"}), 404
+    try:
+        size = snap_size(int(request.args.get("size", 128)))
+    except ValueError:
+        return jsonify({"error": "Invalid size"}), 400
+
+    key = f"{kind}/{entity_id}/{image_hash}/{size}"
+    cached = image_cache.open(key)
+    if cached is None:
+        try:
+            with image_cache.fetch_lock(key):
+                # Another request may have fetched it while this one waited
+                cached = image_cache.open(key) or fetch_variant(kind, entity_id, image_hash, size, key)
+        except requests.exceptions.RequestException as e:
+            logger.warning("Discord CDN unavailable for %s: %s", key, e)
+            breaker = get_breaker("cdn.discordapp.com")
+            retry_after = breaker.retry_after() if breaker.state == "open" else 5
+            return jsonify({"error": "Image temporarily unavailable"}), 503, {"Retry-After": str(retry_after)}
+        finally:
+            image_cache.release_fetch_lock(key)
+        if cached is None:
+            return jsonify({"error": "Not found"}), 404
+
+    digest, blob = cached
+    response = send_file(blob, mimetype="image/webp", etag=digest, max_age=IMMUTABLE_MAX_AGE, conditional=True)
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
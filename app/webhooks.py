@@ -0,0 +1,29 @@
+import json
+import logging
+
+from flask import Blueprint, request, jsonify
+
+from utils.paypal import verify_webhook_signature
+from utils.payments import record_webhook_event
+
+# Separate from the dashboard blueprint: PayPal can't send a CSRF token
+webhooks = Blueprint('webhooks', __name__)
+logger = logging.getLogger(__name__)
+
+@webhooks.route("/payment/webhook", methods=["POST"])
+def paypal_webhook():
+    body = request.get_data()
+    if not verify_webhook_signature(request.headers, body):
+        logger.warning("Rejected PayPal webhook with invalid signature")
+        return jsonify({"error": "Invalid signature"}), 400
+
+    try:
+        event = json.loads(body)
+        event_id = event["id"]
+    except (ValueError, KeyError, TypeError):
+        return jsonify({"error": "Invalid event"}), 400
+
+    # Processing happens on the background worker; PayPal only needs a fast 2xx
+    queued = record_webhook_event(event)
+    logger.info("PayPal webhook received", extra={"event": "paypal_webhook", "event_id": event_id, "event_type": event.get("event_type"), "duplicate": not queued})
+    return jsonify({"success": True})
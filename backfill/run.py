@@ -0,0 +1,51 @@
+"""
+Data backfills to run once when deploying the changes that introduced them, and again to repair drift.
+
+    stats            recompute Server Stats for every server from Experiences (utils/stats.py)
+    payment-orders   create Payment Orders claims for orders activated before claims existed
+
+Both are safe to re-run. Server profiles and premium activation also work before a backfill has run,
+at the cost of extra reads; once payment-orders has run, set PAYMENT_LEGACY_ORDER_LOOKUP=0.
+
+Usage (from the repository root):
+    python -m backfill.run stats
+    python -m backfill.run stats payment-orders
+"""
+import argparse
+import logging
+import sys
+import time
+
+logger = logging.getLogger("backfill")
+
+
+def backfill_stats():
+    from utils.stats import backfill_server_stats
+    return f"{backfill_server_stats()} servers with stats written"
+
+
+def backfill_orders():
+    from utils.firebase import backfill_payment_orders
+    return f"{backfill_payment_orders()} order claims created"
+
+
+BACKFILLS = {
+    "stats": backfill_stats,
+    "payment-orders": backfill_orders,
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("names", nargs="+", choices=sorted(BACKFILLS), metavar="backfill", help=f"one or more of: {', '.join(sorted(BACKFILLS))}")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(message)s", stream=sys.stdout)
+
+    for name in dict.fromkeys(args.names):
+        started = time.perf_counter()
+        result = BACKFILLS[name]()
+        print(f"{name}: {result} ({time.perf_counter() - started:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+"""
+Microbenchmarks for the hot pure-Python paths of the web app: experience sorting and shaping,
+the server view lists, timeline/registry card rendering, guild role classification and page wrapping.
+
+Each benchmark runs against synthetic experience sets of several sizes (1 to 10,000 entries).
+Inputs are rebuilt before every repetition outside the timed section, so in-place sorts and
+escaping are measured on fresh data. The median of --repeat runs is reported.
+
+Results can be saved as a baseline and later runs compared against it; a run exits with
+status 1 if any benchmark is slower than the baseline by more than --threshold percent.
+Baselines are machine-specific, so save one on the machine you compare on.
+
+Usage (from the repository root):
+    python -m benchmarks.run --save
+    python -m benchmarks.run --threshold 15
+    python -m benchmarks.run --sizes 100,1000 --filter render
+"""
+import argparse
+import copy
+import json
+import os
+import random
+import statistics
+import sys
+import time
+import types
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+DEFAULT_SIZES = (1, 10, 100, 1000, 10000)
+
+
+def load_app_modules():
+    """
+    app.dashboard reads config.settings and initializes firebase_admin at import time.
+    Nothing here talks to the network, so placeholder settings are enough.
+    """
+    from loadtest.run import install_settings
+
+    discord = types.SimpleNamespace(api_base="http://127.0.0.1:1/api/v10")
+    database = types.SimpleNamespace(database_url="http://127.0.0.1:1?ns=servercv")
+    paypal = types.SimpleNamespace(base_url="http://127.0.0.1:1", price="5.00")
+    os.environ.setdefault("CALL_SUMMARY_ENABLED", "0")
+    install_settings(discord, database, paypal)
+
+    from app import dashboard
+    from utils import experience, permissions, theme
+    return dashboard, experience, permissions, theme
+
+
+def build_experiences(count, seed):
+    rng = random.Random(seed)
+    experiences = []
+    for i in range(count):
+        start_year = rng.randint(2015, 2025)
+        status = "approved" if rng.random() < 0.7 else "pending"
+        exp = {
+            "id": f"-Nexp{i:012d}",
+            "user_id": str(100000000000000000 + rng.randint(0, 5000)),
+            "user_name": f"User <{i}>",
+            "user_slug": f"user{i}" if i % 3 == 0 else None,
+            "server_id": str(900000000000000000 + rng.randint(0, 200)),
+            "server_name": f"Server & Co {i % 200}",
+            "role_title": rng.choice(["Moderator", "Administrator", "Event Manager", "Support Staff", "Developer"]),
+            "description": "Handled reports, ran events & wrote <docs> for the staff team. " * rng.randint(1, 4),
+            "start_month": str(rng.randint(1, 12)),
+            "start_year": str(start_year),
+            "requester_role": rng.choice(["Member", "Moderator", "Administrator", "Server Owner"]),
+            "status": status,
+            "requested_at": 1700000000 + rng.randint(0, 10 ** 7),
+            "is_pinned": rng.random() < 0.05,
+        }
+        if rng.random() < 0.5:
+            exp["end_month"] = str(rng.randint(1, 12))
+            exp["end_year"] = str(start_year + rng.randint(0, 2))
+        if status == "approved":
+            exp["approved_by"] = str(100000000000000000 + rng.randint(0, 50))
+            exp["approved_by_name"] = f"Approver {i % 50}"
+            exp["approver_name"] = exp["approved_by_name"]
+            exp["approved_by_slug"] = None
+            exp["approver_slug"] = None
+        experiences.append(exp)
+    return experiences
+
+
+def build_guilds(count, seed):
+    rng = random.Random(seed)
+    return [{"id": str(900000000000000000 + i), "name": f"Server {i}", "owner": i % 17 == 0, "permissions": str(rng.getrandbits(41))} for i in range(count)]
+
+
+def define_benchmarks(dashboard, experience, permissions, theme):
+    """
+    Returns {name: (setup(size, seed) -> args, func(*args))}.
+    """
+    def records(size, seed, status=None):
+        return [experience.ExperienceRecord(exp["id"], exp) for exp in build_experiences(size, seed) if status in (None, exp["status"])]
+
+    def approved_only(size, seed):
+        return (records(size, seed, "approved"),)
+
+    def parse_records(raw):
+        return [experience.ExperienceRecord(exp_id, exp) for exp_id, exp in raw.items()]
+
+    def card_html(size, seed):
+        exps = approved_only(size, seed)[0]
+        return ("Timeline", dashboard.render_timeline_cards(exps))
+
+    return {
+        "parse_records": (lambda size, seed: ({exp["id"]: exp for exp in build_experiences(size, seed)},), parse_records),
+        "sort_experiences": (lambda size, seed: (records(size, seed),), dashboard.sort_experiences),
+        "sort_experiences_pinned": (lambda size, seed: (records(size, seed),), lambda exps: dashboard.sort_experiences(exps, pinned_first=True)),
+        "shape_experiences": (approved_only, dashboard.shape_experiences),
+        "shape_pending_experiences": (lambda size, seed: (records(size, seed, "pending"),), dashboard.shape_pending_experiences),
+        "build_server_view_lists": (lambda size, seed: (records(size, seed), "Administrator", "100000000000000001"), dashboard.build_server_view_lists),
+        "render_timeline_cards": (approved_only, dashboard.render_timeline_cards),
+        "render_registry_cards": (approved_only, dashboard.render_registry_cards),
+        "classify_guilds": (lambda size, seed: (build_guilds(size, seed),), permissions.classify_guilds),
+        "wrap_page": (card_html, theme.wrap_page),
+    }
+
+
+def time_benchmark(setup, func, size, repeat, seed):
+    # Inputs are built once and deep-copied per run so every repetition sees identical, unsorted data
+    template = setup(size, seed)
+    samples = []
+    for _ in range(repeat):
+        args = copy.deepcopy(template)
+        start = time.perf_counter()
+        func(*args)
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def repeat_for(size, requested):
+    if requested:
+        return requested
+    return max(5, min(200, 20000 // max(size, 1)))
+
+
+def format_seconds(seconds):
+    if seconds < 1e-3:
+        return f"{seconds * 1e6:.1f} us"
+    if seconds < 1:
+        return f"{seconds * 1e3:.2f} ms"
+    return f"{seconds:.3f} s"
+
+
+def compare(results, baseline, threshold):
+    regressions = []
+    print(f"{'benchmark':<28}{'size':>7}{'median':>13}{'baseline':>13}{'change':>10}")
+    for key, seconds in sorted(results.items()):
+        name, size = key.rsplit(":", 1)
+        base = baseline.get(key)
+        if base:
+            change = (seconds - base) / base * 100
+            flag = "  REGRESSION" if change > threshold else ""
+            if flag:
+                regressions.append(key)
+            print(f"{name:<28}{size:>7}{format_seconds(seconds):>13}{format_seconds(base):>13}{change:>+9.1f}%{flag}")
+        else:
+            print(f"{name:<28}{size:>7}{format_seconds(seconds):>13}{'-':>13}{'-':>10}")
+    return regressions
+
+
+def parse_sizes(value):
+    try:
+        return tuple(int(v) for v in value.split(",") if v.strip())
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Invalid sizes: {value}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=parse_sizes, default=DEFAULT_SIZES, help="comma-separated experience counts")
+    parser.add_argument("--filter", default="", help="only run benchmarks whose name contains this string")
+    parser.add_argument("--repeat", type=int, default=0, help="runs per benchmark and size (default scales with size)")
+    parser.add_argument("--save", action="store_true", help="write results to the baseline file")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--threshold", type=float, default=10.0, help="percent slowdown that counts as a regression")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    dashboard, experience, permissions, theme = load_app_modules()
+    benchmarks = {name: bench for name, bench in define_benchmarks(dashboard, experience, permissions, theme).items() if args.filter in name}
+    if not benchmarks:
+        parser.error(f"No benchmark matches --filter {args.filter!r}")
+
+    results = {}
+    for name, (setup, func) in benchmarks.items():
+        for size in args.sizes:
+            results[f"{name}:{size}"] = time_benchmark(setup, func, size, repeat_for(size, args.repeat), args.seed)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f).get("results", {})
+
+    regressions = compare(results, {} if args.save else baseline, args.threshold)
+
+    if args.save:
+        merged = {**baseline, **results}
+        with open(args.baseline, "w") as f:
+            json.dump({"python": sys.version.split()[0], "saved_at": int(time.time()), "results": merged}, f, indent=2, sort_keys=True)
+        print(f"Saved {len(results)} results to {args.baseline}")
+        return 0
+
+    if regressions:
+        print(f"{len(regressions)} benchmark(s) regressed by more than {args.threshold:g}%")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
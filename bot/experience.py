@@ -1,20 +1,161 @@
 import discord
 import datetime
 import asyncio
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 from discord import app_commands
-from discord.ext import commands
+from discord.ext import commands, tasks
 from firebase_admin import db
 
+from utils.cache import TTLCache
+from utils.warmup import record_access, start_access_stats, warm_up
+
+logger = logging.getLogger(__name__)
+
+META_FLUSH_INTERVAL = float(os.environ.get("SERVER_META_FLUSH_INTERVAL", 5))
+META_RESYNC_INTERVAL = float(os.environ.get("SERVER_META_RESYNC_INTERVAL", 3600))
+META_READ_CONCURRENCY = int(os.environ.get("SERVER_META_READ_CONCURRENCY", 16))
+# Servers whose experiences are queried for a rewrite per flush; the rest wait for the next one
+META_REWRITES_PER_FLUSH = int(os.environ.get("SERVER_META_REWRITES_PER_FLUSH", 25))
+NOTIFICATION_CONFIG_CACHE_TTL = int(os.environ.get("NOTIFICATION_CONFIG_CACHE_TTL", 300))
+# Copied onto each experience for the user profile and search
+DENORMALIZED_FIELDS = ('server_name', 'server_icon', 'server_banner')
+
+def guild_meta(guild):
+    return {
+        'server_name': guild.name,
+        'server_icon': guild.icon.key if guild.icon else None,
+        'server_banner': guild.banner.key if guild.banner else None,
+        'description': guild.description,
+        'member_count': guild.member_count,
+    }
+
+def write_server_meta(pending, written):
+    """
+    Writes {server id: meta} to Servers/<id>/meta in one multi-path update, then rewrites the copies
+    stored on the experiences of servers whose name, icon or banner changed, also in one update.
+    Only META_REWRITES_PER_FLUSH servers needing a rewrite are handled per call (on first deploy that
+    is every server); returns the pending entries left for the next call.
+    """
+    rewrites = [server_id for server_id, meta in pending.items()
+                if not (written.get(server_id) and all(written[server_id].get(field) == meta[field] for field in DENORMALIZED_FIELDS))]
+    deferred = {server_id: pending[server_id] for server_id in rewrites[META_REWRITES_PER_FLUSH:]}
+    now = time.time()
+    db.reference('Servers').update({f'{server_id}/meta': dict(meta, updated_at=now) for server_id, meta in pending.items() if server_id not in deferred})
+
+    experience_updates = {}
+    for server_id in rewrites[:META_REWRITES_PER_FLUSH]:
+        meta = pending[server_id]
+        experiences = db.reference('Experiences').order_by_child('server_id').equal_to(server_id).get() or {}
+        for exp_id, exp in experiences.items():
+            for field in DENORMALIZED_FIELDS:
+                if exp.get(field) != meta[field]:
+                    experience_updates[f'{exp_id}/{field}'] = meta[field]
+    if experience_updates:
+        db.reference('Experiences').update(experience_updates)
+    return deferred
+
+def read_server_meta(server_ids):
+    """
+    Reads Servers/<id>/meta for each server, META_READ_CONCURRENCY at a time. Returns the stored meta
+    without its timestamp for the servers that have one.
+    """
+    def read(server_id):
+        return server_id, db.reference(f'Servers/{server_id}/meta').get()
+
+    with ThreadPoolExecutor(max_workers=META_READ_CONCURRENCY) as pool:
+        return {server_id: {k: v for k, v in meta.items() if k != 'updated_at'} for server_id, meta in pool.map(read, server_ids) if isinstance(meta, dict)}
+
 class Experience(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
         self.db_ref = db.reference('Experiences')
         self.ready = False
         self.listener = self.db_ref.listen(self.on_experience_change)
+        # Server meta waiting for the next flush, and what was last written, by server ID
+        self.pending_meta = {}
+        self.written_meta = None
+        self.meta_seed_lock = asyncio.Lock()
+        self.notification_configs = TTLCache("notification_config", NOTIFICATION_CONFIG_CACHE_TTL, maxsize=5000)
+
+    async def cog_load(self):
+        self.flush_server_meta.start()
+        self.resync_server_meta.start()
 
     def cog_unload(self):
         if self.listener:
             self.listener.close()
+        self.flush_server_meta.cancel()
+        self.resync_server_meta.cancel()
+
+    def queue_server_meta(self, guild):
+        meta = guild_meta(guild)
+        server_id = str(guild.id)
+        previous = self.written_meta.get(server_id) if self.written_meta is not None else None
+        # Firebase drops null fields, so compare against the fields actually stored
+        if previous is not None and all(previous.get(k) == v for k, v in meta.items()):
+            return
+        self.pending_meta[server_id] = meta
+
+    @commands.Cog.listener()
+    async def on_guild_update(self, before, after):
+        if guild_meta(before) != guild_meta(after):
+            self.queue_server_meta(after)
+
+    @commands.Cog.listener()
+    async def on_guild_join(self, guild):
+        self.queue_server_meta(guild)
+
+    @tasks.loop(seconds=META_FLUSH_INTERVAL)
+    async def flush_server_meta(self):
+        # Until the stored meta has been read everything would look changed; retry the read here
+        # rather than wait for the next hourly resync
+        if self.written_meta is None and (not self.bot.is_ready() or not await self.seed_written_meta()):
+            return
+        if not self.pending_meta:
+            return
+        pending, self.pending_meta = self.pending_meta, {}
+        try:
+            deferred = await asyncio.to_thread(write_server_meta, pending, self.written_meta)
+        except Exception:
+            logger.exception("Could not write meta for %d servers", len(pending))
+            # Keep anything queued since, it is newer
+            self.pending_meta = {**pending, **self.pending_meta}
+            return
+        self.written_meta.update({server_id: meta for server_id, meta in pending.items() if server_id not in deferred})
+        self.pending_meta = {**deferred, **self.pending_meta}
+
+    async def seed_written_meta(self):
+        """
+        Reads the stored meta of every guild so only changes get written, then queues every guild to
+        catch up on changes made meanwhile. Returns False if the read failed.
+        """
+        async with self.meta_seed_lock:
+            if self.written_meta is not None:
+                return True
+            try:
+                self.written_meta = await asyncio.to_thread(read_server_meta, [str(guild.id) for guild in self.bot.guilds])
+            except Exception:
+                logger.exception("Could not load server meta")
+                return False
+        for guild in self.bot.guilds:
+            self.queue_server_meta(guild)
+        return True
+
+    @tasks.loop(seconds=META_RESYNC_INTERVAL)
+    async def resync_server_meta(self):
+        """
+        Catches up on changes made while disconnected and refreshes member counts, which don't
+        trigger on_guild_update.
+        """
+        await self.bot.wait_until_ready()
+        if self.written_meta is None:
+            await self.seed_written_meta()
+            return
+        for guild in self.bot.guilds:
+            self.queue_server_meta(guild)
 
     def on_experience_change(self, event):
         if not self.ready:
@@ -36,13 +177,20 @@ class Experience(commands.Cog):
                 if data and isinstance(data, dict) and data.get('status') == 'pending':
                     asyncio.run_coroutine_threadsafe(self.notify_new_request(exp_id, data), self.bot.loop)
 
+    def get_notification_config(self, server_id):
+        record_access('notification_config', server_id)
+        config = self.notification_configs.get(server_id)
+        if config is None:
+            config = db.reference(f'Request Notification Config/{server_id}').get() or {}
+            self.notification_configs.set(server_id, config)
+        return config
+
     async def notify_new_request(self, exp_id, data):
         server_id = data.get('server_id')
         if not server_id:
             return
 
-        config_ref = db.reference(f'Request Notification Config/{server_id}')
-        config = config_ref.get()
+        config = await asyncio.to_thread(self.get_notification_config, server_id)
         
         if not config or not config.get('notification_channel'):
             return
@@ -87,7 +235,7 @@ class Experience(commands.Cog):
             await channel.send(content=content, embed=embed)
 
         except Exception as e:
-            print(f"Error sending notification: {e}")
+            logger.exception("Error sending notification for %s", exp_id)
 
     @app_commands.command(name="setup", description="Setup notifications for new experience requests")
     @app_commands.describe(channel="The channel to send notifications to", role="Optional role to ping")
@@ -114,6 +262,7 @@ class Experience(commands.Cog):
             return
             
         db.reference(f'Request Notification Config/{server_id}').update(update_data)
+        self.notification_configs.delete(server_id)
         
         msg = f"✅ Notifications for new experience requests will be sent to {channel.mention}."
         if role:
@@ -122,4 +271,7 @@ class Experience(commands.Cog):
         await interaction.response.send_message(msg, ephemeral=True)
 
 async def setup(bot: commands.Bot) -> None:
-    await bot.add_cog(Experience(bot))
\ No newline at end of file
+    cog = Experience(bot)
+    start_access_stats()
+    await asyncio.to_thread(warm_up, {'notification_config': cog.get_notification_config}, 'bot')
+    await bot.add_cog(cog)
\ No newline at end of file
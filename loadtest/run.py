@@ -0,0 +1,355 @@
+"""
+Offline load test for the ServerCV web app.
+
+Starts local stand-ins for Discord, the Firebase Realtime Database and PayPal (see loadtest/stubs.py),
+seeds them with synthetic users, servers and experiences, points API_BASE, DATABASE_URL and
+PAYPAL_API_BASE at them and serves the Flask app in-process. Scripted user journeys are then
+started at a rate that targets --rps requests per second, and p50/p95/p99 latencies are reported.
+
+Usage (from the repository root):
+    python -m loadtest.run --rps 50 --duration 30 --discord-latency-ms 80 --discord-429-ratio 0.02
+"""
+import argparse
+import json
+import logging
+import math
+import os
+import random
+import re
+import sys
+import threading
+import time
+import types
+from collections import defaultdict, Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from loadtest.stubs import FakeDiscord, FakeRealtimeDatabase, FakePayPal
+
+ADMINISTRATOR = 0x8
+MANAGE_MESSAGES = 0x2000
+
+
+def generate_service_account():
+    """
+    firebase_admin parses the credential at import time, so a throwaway key is generated.
+    It is never used to authenticate: emulator-mode database URLs skip OAuth entirely.
+    """
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric import rsa
+
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    pem = key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()).decode()
+    return {
+        "type": "service_account",
+        "project_id": "servercv-loadtest",
+        "private_key_id": "loadtest",
+        "private_key": pem,
+        "client_email": "loadtest@servercv-loadtest.iam.gserviceaccount.com",
+        "client_id": "0",
+        "token_uri": "http://127.0.0.1:1/token",
+    }
+
+
+def build_dataset(user_count, server_count, experiences_per_user, premium_ratio, seed):
+    rng = random.Random(seed)
+    user_ids = [str(100000000000000000 + i) for i in range(user_count)]
+    server_ids = [str(900000000000000000 + i) for i in range(server_count)]
+
+    discord_users = {
+        uid: {"id": uid, "username": f"user{i}", "global_name": f"User {i}", "avatar": None, "banner": None, "banner_color": "#5865f2"}
+        for i, uid in enumerate(user_ids)
+    }
+
+    guilds = {}
+    channels = {}
+    notification_config = {}
+    for i, sid in enumerate(server_ids):
+        owner = user_ids[i % user_count]
+        members = {owner: ADMINISTRATOR}
+        for uid in rng.sample(user_ids, min(user_count, max(5, user_count // 4))):
+            if uid != owner:
+                members[uid] = rng.choice([0, 0, 0, MANAGE_MESSAGES, ADMINISTRATOR])
+        guilds[sid] = {"id": sid, "name": f"Server {i}", "icon": None, "banner": None, "description": f"Synthetic server {i}", "owner_id": owner, "members": members}
+        if i % 2 == 0:
+            channel_id = str(800000000000000000 + i)
+            channels[channel_id] = {"id": channel_id, "name": f"staff-requests-{i}", "guild_id": sid, "type": 0}
+            notification_config[sid] = {"notification_channel": channel_id}
+
+    dashboard_users = {}
+    for i, uid in enumerate(user_ids):
+        premium = rng.random() < premium_ratio
+        dashboard_users[uid] = {
+            "username": f"user{i}",
+            "global_name": f"User {i}",
+            "avatar": "",
+            "discord_token": f"token-{uid}",
+            "premium": premium,
+            "vanity_url": f"user{i}" if premium else "",
+            "socials": ["https://github.com/servercv"],
+        }
+
+    experiences = {}
+    member_guilds = defaultdict(list)
+    for sid, guild in guilds.items():
+        for uid in guild["members"]:
+            member_guilds[uid].append(sid)
+
+    for uid in user_ids:
+        for _ in range(experiences_per_user):
+            if not member_guilds[uid]:
+                break
+            sid = rng.choice(member_guilds[uid])
+            guild = guilds[sid]
+            start_year = rng.randint(2018, 2024)
+            status = "approved" if rng.random() < 0.8 else "pending"
+            exp = {
+                "user_id": uid,
+                "server_id": sid,
+                "server_name": guild["name"],
+                "role_title": rng.choice(["Moderator", "Administrator", "Event Manager", "Support Staff", "Developer"]),
+                "start_month": str(rng.randint(1, 12)),
+                "start_year": str(start_year),
+                "description": "Synthetic experience entry for load testing.",
+                "requester_role": "Moderator",
+                "status": status,
+                "requested_at": time.time() - rng.randint(0, 10 ** 7),
+            }
+            if rng.random() < 0.5:
+                exp["end_month"] = str(rng.randint(1, 12))
+                exp["end_year"] = str(start_year + rng.randint(1, 2))
+            if status == "approved":
+                exp["approved_by"] = guild["owner_id"]
+                exp["approved_at"] = exp["requested_at"] + 3600
+            experiences[f"exp-{len(experiences):07d}"] = exp
+
+    db_data = {
+        "Dashboard Users": dashboard_users,
+        "Experiences": experiences,
+        "Request Notification Config": notification_config,
+        "Dashboard Servers": {},
+    }
+    return user_ids, server_ids, discord_users, guilds, channels, db_data
+
+
+def install_settings(discord, database, paypal):
+    settings = types.ModuleType("config.settings")
+    settings.API_BASE = discord.api_base
+    settings.BOT_TOKEN = "loadtest-bot-token"
+    settings.CLIENT_ID = "0"
+    settings.CLIENT_SECRET = "loadtest"
+    settings.REDIRECT_URI = "http://127.0.0.1/dashboard"
+    settings.FIREBASE_CRED = generate_service_account()
+    settings.DATABASE_URL = database.database_url
+    settings.PAYPAL_CLIENT_ID = "loadtest"
+    settings.PAYPAL_CLIENT_SECRET = "loadtest"
+    settings.PAYPAL_API_BASE = paypal.base_url
+    settings.PREMIUM_ONE_TIME_PRICE = paypal.price
+    settings.ALLOWED_PREMIUM_SERVERS = []
+
+    package = types.ModuleType("config")
+    package.__path__ = []
+    package.settings = settings
+    sys.modules["config"] = package
+    sys.modules["config.settings"] = settings
+
+
+def start_app(keep_rate_limits):
+    from werkzeug.serving import make_server
+    from main import app
+    from app.dashboard import limiter
+
+    if not keep_rate_limits:
+        limiter.enabled = False
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, name="servercv-app", daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+class Recorder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(Counter)
+
+    def record(self, step, seconds, status):
+        with self.lock:
+            self.latencies[step].append(seconds)
+            self.statuses[step][status] += 1
+
+
+class VirtualUser:
+    def __init__(self, base_url, recorder, user_id=None):
+        self.base_url = base_url
+        self.recorder = recorder
+        self.user_id = user_id
+        self.http = requests.Session()
+        self.csrf_token = None
+
+    def call(self, step, method, path, **kwargs):
+        kwargs.setdefault("allow_redirects", False)
+        kwargs.setdefault("timeout", 60)
+        start = time.perf_counter()
+        try:
+            response = self.http.request(method, self.base_url + path, **kwargs)
+            status = response.status_code
+        except requests.RequestException as e:
+            response, status = None, type(e).__name__
+        self.recorder.record(step, time.perf_counter() - start, status)
+        return response
+
+    def login(self):
+        self.call("login", "GET", f"/dashboard?code={self.user_id}")
+        response = self.call("GET /dashboard", "GET", "/dashboard")
+        if response is not None:
+            match = re.search(r'name="csrf-token" content="([0-9a-f]+)"', response.text)
+            self.csrf_token = match.group(1) if match else None
+
+
+def journey_visitor(base_url, recorder, dataset, rng):
+    user_ids, server_ids, _, _, _, db_data = dataset
+    visitor = VirtualUser(base_url, recorder)
+    visitor.call("GET /u/<id>", "GET", f"/u/{rng.choice(user_ids)}")
+    visitor.call("GET /s/<id>", "GET", f"/s/{rng.choice(server_ids)}")
+    visitor.call("GET /experience/<id>", "GET", f"/experience/{rng.choice(list(db_data['Experiences']))}")
+
+
+def journey_member(base_url, recorder, dataset, rng):
+    user_ids = dataset[0]
+    member = VirtualUser(base_url, recorder, rng.choice(user_ids))
+    member.login()
+    member.call("GET /api/dashboard", "GET", "/api/dashboard")
+    member.call("GET /settings", "GET", "/settings")
+
+
+def journey_admin(base_url, recorder, dataset, rng):
+    _, server_ids, _, guilds, _, db_data = dataset
+    server_id = rng.choice(server_ids)
+    admin = VirtualUser(base_url, recorder, guilds[server_id]["owner_id"])
+    admin.login()
+    admin.call("GET /view/<id>", "GET", f"/view/{server_id}")
+    admin.call("GET /api/guild/<id>", "GET", f"/api/guild/{server_id}")
+    pending = [k for k, v in db_data["Experiences"].items() if v["server_id"] == server_id and v["status"] == "pending"]
+    if pending and admin.csrf_token:
+        admin.call("POST /approve/<id>", "POST", f"/approve/{rng.choice(pending)}", headers={"X-CSRF-Token": admin.csrf_token})
+
+
+def journey_premium(base_url, recorder, dataset, rng):
+    user_ids = dataset[0]
+    buyer = VirtualUser(base_url, recorder, rng.choice(user_ids))
+    buyer.login()
+    buyer.call("GET /premium", "GET", "/premium")
+    if buyer.csrf_token:
+        buyer.call("POST /payment/activate", "POST", "/payment/activate", json={"user_id": buyer.user_id, "order_id": f"LOADTEST-{rng.randrange(10 ** 9)}"}, headers={"X-CSRF-Token": buyer.csrf_token})
+
+
+JOURNEYS = {
+    # name: (function, requests issued, default weight)
+    "visitor": (journey_visitor, 3, 6),
+    "member": (journey_member, 4, 3),
+    "admin": (journey_admin, 5, 1),
+    "premium": (journey_premium, 4, 0),
+}
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    index = max(0, math.ceil(p / 100 * len(sorted_values)) - 1)
+    return sorted_values[index]
+
+
+def report(recorder, elapsed):
+    total = sum(len(v) for v in recorder.latencies.values())
+    rows = []
+    for step in sorted(recorder.latencies):
+        values = sorted(recorder.latencies[step])
+        errors = sum(c for s, c in recorder.statuses[step].items() if not isinstance(s, int) or s >= 500)
+        rows.append((step, len(values), errors, percentile(values, 50), percentile(values, 95), percentile(values, 99), values[-1]))
+
+    all_values = sorted(v for values in recorder.latencies.values() for v in values)
+    print(f"\n{total} requests in {elapsed:.1f}s ({total / elapsed:.1f} req/s)\n")
+    print(f"{'step':<28}{'count':>8}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for step, count, errors, p50, p95, p99, worst in rows:
+        print(f"{step:<28}{count:>8}{errors:>8}{p50 * 1000:>10.1f}{p95 * 1000:>10.1f}{p99 * 1000:>10.1f}{worst * 1000:>10.1f}")
+    if all_values:
+        print(f"{'all':<28}{len(all_values):>8}{'':>8}{percentile(all_values, 50) * 1000:>10.1f}{percentile(all_values, 95) * 1000:>10.1f}{percentile(all_values, 99) * 1000:>10.1f}{all_values[-1] * 1000:>10.1f}")
+    print("\nstatus codes: " + json.dumps({step: dict(counter) for step, counter in recorder.statuses.items()}, default=str))
+
+
+def parse_mix(value):
+    mix = {name: weight for name, (_, _, weight) in JOURNEYS.items()}
+    if value:
+        mix = {name: 0 for name in JOURNEYS}
+        for part in value.split(","):
+            name, _, weight = part.partition("=")
+            if name not in JOURNEYS:
+                raise argparse.ArgumentTypeError(f"Unknown journey: {name}")
+            mix[name] = float(weight or 1)
+    return mix
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rps", type=float, default=20, help="target requests per second")
+    parser.add_argument("--duration", type=float, default=30, help="seconds to generate load for")
+    parser.add_argument("--concurrency", type=int, default=64, help="max journeys in flight")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix(None), help="journey weights, e.g. visitor=6,member=3,admin=1,premium=0")
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--servers", type=int, default=50)
+    parser.add_argument("--experiences-per-user", type=int, default=4)
+    parser.add_argument("--premium-ratio", type=float, default=0.1)
+    parser.add_argument("--discord-latency-ms", type=float, default=50)
+    parser.add_argument("--discord-jitter-ms", type=float, default=50)
+    parser.add_argument("--discord-429-ratio", type=float, default=0.0, help="fraction of Discord calls answered with 429")
+    parser.add_argument("--discord-retry-after", type=int, default=1, help="Retry-After seconds sent with 429s")
+    parser.add_argument("--firebase-latency-ms", type=float, default=20)
+    parser.add_argument("--paypal-latency-ms", type=float, default=150)
+    parser.add_argument("--keep-rate-limits", action="store_true", help="leave Flask-Limiter enabled")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    dataset = build_dataset(args.users, args.servers, args.experiences_per_user, args.premium_ratio, args.seed)
+    _, _, discord_users, guilds, channels, db_data = dataset
+
+    discord = FakeDiscord(discord_users, guilds, channels, latency_ms=args.discord_latency_ms, jitter_ms=args.discord_jitter_ms,
+                          rate_limit_ratio=args.discord_429_ratio, retry_after=args.discord_retry_after).start()
+    database = FakeRealtimeDatabase(json.loads(json.dumps(db_data)), latency_ms=args.firebase_latency_ms).start()
+    paypal = FakePayPal(latency_ms=args.paypal_latency_ms).start()
+
+    os.environ.setdefault("CALL_SUMMARY_ENABLED", "0")
+    # The search index runs as its own service (searchd); its change stream would keep this process alive
+    os.environ.setdefault("SEARCH_INDEX_ENABLED", "0")
+    install_settings(discord, database, paypal)
+    server, base_url = start_app(args.keep_rate_limits)
+    print(f"app {base_url} | discord {discord.api_base} | firebase {database.database_url} | paypal {paypal.base_url}")
+
+    names = [name for name, weight in args.mix.items() if weight > 0]
+    weights = [args.mix[name] for name in names]
+    mean_requests = sum(JOURNEYS[n][1] * w for n, w in zip(names, weights)) / sum(weights)
+    journeys_per_second = args.rps / mean_requests
+
+    recorder = Recorder()
+    rng = random.Random(args.seed)
+    total_journeys = int(journeys_per_second * args.duration)
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        for i in range(total_journeys):
+            # Open-loop arrivals: slow responses do not slow the offered load
+            delay = started + i / journeys_per_second - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            name = rng.choices(names, weights)[0]
+            executor.submit(JOURNEYS[name][0], base_url, recorder, dataset, random.Random(rng.random()))
+    elapsed = time.perf_counter() - started
+
+    report(recorder, elapsed)
+    server.shutdown()
+    for stub in (discord, database, paypal):
+        stub.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,325 @@
+"""
+Local stand-ins for the services ServerCV talks to, used by loadtest/run.py:
+
+- FakeDiscord: Discord REST API (users, guilds, channels, OAuth2 token exchange)
+- FakeRealtimeDatabase: Firebase Realtime Database REST protocol, in emulator mode
+- FakePayPal: PayPal OAuth2 token and order lookup
+
+Each stand-in is a ThreadingHTTPServer running on a daemon thread.
+"""
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs, unquote
+
+
+class StubServer:
+    def __init__(self, handler_cls, host="127.0.0.1", port=0):
+        handler = type(handler_cls.__name__, (handler_cls,), {"stub": self})
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name=handler_cls.__name__, daemon=True)
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class JSONHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def read_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode() if status != 204 else b""
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        if body:
+            self.wfile.write(body)
+
+
+# Discord
+
+class DiscordHandler(JSONHandler):
+    def dispatch(self):
+        stub = self.stub
+        stub.simulate_latency()
+        if stub.should_rate_limit():
+            return self.send_json(429, {"message": "You are being rate limited.", "retry_after": stub.retry_after, "global": False}, {"Retry-After": str(stub.retry_after)})
+
+        parts = urlsplit(self.path)
+        path = parts.path[len(stub.prefix):] if parts.path.startswith(stub.prefix) else parts.path
+        auth = self.headers.get("Authorization", "")
+
+        if self.command == "POST" and path == "/oauth2/token":
+            form = parse_qs(self.read_body().decode())
+            code = form.get("code", [""])[0]
+            if code not in stub.users:
+                return self.send_json(400, {"error": "invalid_grant"})
+            return self.send_json(200, {"access_token": f"token-{code}", "token_type": "Bearer", "expires_in": 604800, "scope": "identify guilds"})
+
+        if path == "/users/@me":
+            user_id = stub.user_for_token(auth)
+            if not user_id:
+                return self.send_json(401, {"message": "401: Unauthorized", "code": 0})
+            return self.send_json(200, stub.users[user_id])
+
+        if path == "/users/@me/guilds":
+            if auth.startswith("Bot "):
+                return self.send_json(200, [stub.partial_guild(gid) for gid in stub.bot_guilds])
+            user_id = stub.user_for_token(auth)
+            if not user_id:
+                return self.send_json(401, {"message": "401: Unauthorized", "code": 0})
+            return self.send_json(200, [stub.partial_guild(gid, user_id) for gid in stub.member_guilds.get(user_id, [])])
+
+        match = re.fullmatch(r"/guilds/(\d+)", path)
+        if match:
+            gid = match.group(1)
+            if gid not in stub.bot_guilds:
+                return self.send_json(404, {"message": "Unknown Guild", "code": 10004})
+            guild = dict(stub.guilds[gid])
+            guild["approximate_member_count"] = len(guild.pop("members"))
+            return self.send_json(200, guild)
+
+        match = re.fullmatch(r"/channels/(\d+)", path)
+        if match:
+            channel = stub.channels.get(match.group(1))
+            if not channel:
+                return self.send_json(404, {"message": "Unknown Channel", "code": 10003})
+            return self.send_json(200, channel)
+
+        return self.send_json(404, {"message": "404: Not Found", "code": 0})
+
+    do_GET = do_POST = dispatch
+
+
+class FakeDiscord(StubServer):
+    """
+    users: {user_id: user object}
+    guilds: {guild_id: {"id", "name", "icon", "banner", "owner_id", "members": {user_id: permissions int}}}
+    Access tokens are "token-<user_id>"; the OAuth2 code is the user ID.
+    """
+    def __init__(self, users, guilds, channels=None, bot_guilds=None, latency_ms=0, jitter_ms=0, rate_limit_ratio=0.0, retry_after=1, prefix="/api/v10", **kwargs):
+        self.users = users
+        self.guilds = guilds
+        self.channels = channels or {}
+        self.bot_guilds = set(bot_guilds if bot_guilds is not None else guilds)
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.rate_limit_ratio = rate_limit_ratio
+        self.retry_after = retry_after
+        self.prefix = prefix
+        self.member_guilds = {}
+        for gid, guild in guilds.items():
+            for uid in guild["members"]:
+                self.member_guilds.setdefault(uid, []).append(gid)
+        super().__init__(DiscordHandler, **kwargs)
+
+    @property
+    def api_base(self):
+        return self.base_url + self.prefix
+
+    def simulate_latency(self):
+        delay = self.latency_ms + random.uniform(0, self.jitter_ms)
+        if delay > 0:
+            time.sleep(delay / 1000)
+
+    def should_rate_limit(self):
+        return self.rate_limit_ratio > 0 and random.random() < self.rate_limit_ratio
+
+    def user_for_token(self, auth):
+        if not auth.startswith("Bearer token-"):
+            return None
+        user_id = auth[len("Bearer token-"):]
+        return user_id if user_id in self.users else None
+
+    def partial_guild(self, gid, user_id=None):
+        guild = self.guilds[gid]
+        partial = {"id": gid, "name": guild["name"], "icon": guild.get("icon"), "banner": guild.get("banner"), "owner": False, "permissions": "0"}
+        if user_id:
+            partial["owner"] = guild["owner_id"] == user_id
+            partial["permissions"] = str(guild["members"].get(user_id, 0))
+        return partial
+
+
+# Firebase Realtime Database
+
+class RealtimeDatabaseHandler(JSONHandler):
+    def dispatch(self):
+        stub = self.stub
+        stub.simulate_latency()
+        parts = urlsplit(self.path)
+        path = unquote(parts.path)
+        if path.endswith(".json"):
+            path = path[:-len(".json")]
+        keys = [k for k in path.strip("/").split("/") if k]
+        params = {k: v[0] for k, v in parse_qs(parts.query).items()}
+        silent = params.get("print") == "silent"
+
+        if self.command == "GET":
+            value = stub.query(keys, params) if "orderBy" in params else stub.read(keys)
+            return self.send_json(200, value, {"ETag": stub.etag(keys)})
+
+        body = json.loads(self.read_body() or b"null")
+        if self.command == "PUT":
+            stub.write(keys, body)
+        elif self.command == "PATCH":
+            for child, value in (body or {}).items():
+                stub.write(keys + [k for k in child.strip("/").split("/") if k], value)
+        elif self.command == "POST":
+            key = stub.push_id()
+            stub.write(keys + [key], body)
+            return self.send_json(200, {"name": key})
+        elif self.command == "DELETE":
+            stub.write(keys, None)
+        else:
+            return self.send_json(405, {"error": "Method not allowed"})
+
+        if silent:
+            return self.send_json(204, None)
+        return self.send_json(200, body)
+
+    do_GET = do_PUT = do_PATCH = do_POST = do_DELETE = dispatch
+
+
+class FakeRealtimeDatabase(StubServer):
+    """
+    In-memory Realtime Database speaking the REST protocol used by firebase_admin in emulator mode.
+    Supports get/set/update/push/delete and orderBy + equalTo/startAt/endAt/limitToFirst/limitToLast queries.
+    """
+    def __init__(self, data=None, namespace="servercv", latency_ms=0, **kwargs):
+        self.data = data or {}
+        self.namespace = namespace
+        self.latency_ms = latency_ms
+        self.lock = threading.Lock()
+        super().__init__(RealtimeDatabaseHandler, **kwargs)
+
+    @property
+    def database_url(self):
+        return f"{self.base_url}?ns={self.namespace}"
+
+    def simulate_latency(self):
+        if self.latency_ms > 0:
+            time.sleep(self.latency_ms / 1000)
+
+    def push_id(self):
+        return "-" + uuid.uuid4().hex[:19]
+
+    def etag(self, keys):
+        return str(hash(json.dumps(self.read(keys), sort_keys=True)))
+
+    def read(self, keys):
+        with self.lock:
+            node = self.data
+            for key in keys:
+                if not isinstance(node, dict) or key not in node:
+                    return None
+                node = node[key]
+            return json.loads(json.dumps(node))
+
+    def write(self, keys, value):
+        with self.lock:
+            if not keys:
+                self.data = value if isinstance(value, dict) else {}
+                return
+            node = self.data
+            for key in keys[:-1]:
+                if not isinstance(node.get(key), dict):
+                    if value is None:
+                        return
+                    node[key] = {}
+                node = node[key]
+            if value is None:
+                node.pop(keys[-1], None)
+            else:
+                node[keys[-1]] = value
+
+    def query(self, keys, params):
+        children = self.read(keys) or {}
+        if not isinstance(children, dict):
+            return {}
+        order_by = json.loads(params["orderBy"])
+
+        def sort_value(item):
+            key, child = item
+            if order_by == "$key":
+                return key
+            if order_by == "$value":
+                return child
+            return child.get(order_by) if isinstance(child, dict) else None
+
+        items = [(k, v) for k, v in children.items()]
+        if "equalTo" in params:
+            target = json.loads(params["equalTo"])
+            items = [item for item in items if sort_value(item) == target]
+        if "startAt" in params:
+            start = json.loads(params["startAt"])
+            items = [item for item in items if sort_value(item) is not None and sort_value(item) >= start]
+        if "endAt" in params:
+            end = json.loads(params["endAt"])
+            items = [item for item in items if sort_value(item) is not None and sort_value(item) <= end]
+        items.sort(key=lambda item: (sort_value(item) is None, str(sort_value(item))))
+        if "limitToFirst" in params:
+            items = items[:int(params["limitToFirst"])]
+        if "limitToLast" in params:
+            items = items[-int(params["limitToLast"]):]
+        return dict(items)
+
+
+# PayPal
+
+class PayPalHandler(JSONHandler):
+    def dispatch(self):
+        stub = self.stub
+        stub.simulate_latency()
+        path = urlsplit(self.path).path
+        self.read_body()
+
+        if self.command == "POST" and path == "/v1/oauth2/token":
+            return self.send_json(200, {"access_token": f"A21AA-{uuid.uuid4().hex}", "token_type": "Bearer", "expires_in": 32400})
+
+        match = re.fullmatch(r"/v2/checkout/orders/([A-Za-z0-9-]+)", path)
+        if match and self.command == "GET":
+            order_id = match.group(1)
+            return self.send_json(200, {
+                "id": order_id,
+                "status": "COMPLETED",
+                "purchase_units": [{"amount": {"currency_code": "USD", "value": str(stub.price)}}]
+            })
+
+        return self.send_json(404, {"name": "RESOURCE_NOT_FOUND"})
+
+    do_GET = do_POST = dispatch
+
+
+class FakePayPal(StubServer):
+    def __init__(self, price="5.00", latency_ms=0, **kwargs):
+        self.price = price
+        self.latency_ms = latency_ms
+        super().__init__(PayPalHandler, **kwargs)
+
+    def simulate_latency(self):
+        if self.latency_ms > 0:
+            time.sleep(self.latency_ms / 1000)
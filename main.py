@@ -1,22 +1,80 @@
 import os
 
-from flask import Flask, redirect, request, session, render_template
+from flask import Flask, redirect, request, session, render_template, abort, Response, g, jsonify, send_file
 from werkzeug.middleware.proxy_fix import ProxyFix
+from firebase_admin.exceptions import UnavailableError, DeadlineExceededError
 from config.settings import API_BASE, CLIENT_ID, REDIRECT_URI
 
-from app.dashboard import dashboard, limiter
+from app.dashboard import dashboard, limiter, forget_user_roles
+from app.webhooks import webhooks
+from app.images import images
+from utils.metrics import init_metrics, render_prometheus, is_metrics_request_authorized
+from utils.call_budget import init_call_budget
+from utils.resilience import UpstreamUnavailable, get_breaker, init_deadlines
+from utils.bulkhead import BulkheadFull, init_bulkheads
+from utils.log import configure_logging, init_request_ids
+from utils.firebase import get_server_meta, get_user_info_short, resolve_vanity
+from utils.warmup import start_access_stats, warm_up
+from utils.payments import start_worker as start_payment_worker
+from utils.snapshots import init_snapshots, sitemap_path
+from utils.theme import error_page
+from utils.profiler import requested_profile_format, start_profiling
+
+configure_logging()
 
 app = Flask(__name__, static_url_path="")
 app.wsgi_app = ProxyFix(app.wsgi_app, x_for=2, x_proto=1, x_host=1, x_port=1)
 
+init_request_ids(app)
+# Crawler snapshots are answered before rate limits and bulkheads; they cost one file read
+init_snapshots(app)
 limiter.init_app(app)
+init_metrics(app)
+init_call_budget(app)
+init_deadlines(app)
+init_bulkheads(app)
 app.secret_key = os.urandom(24)
 app.url_map.strict_slashes = False
 
-blueprints = [dashboard]
+blueprints = [dashboard, webhooks, images]
 for blueprint in blueprints:
     app.register_blueprint(blueprint)
 
+start_access_stats()
+# Picks up webhook events stored before a restart but never processed
+start_payment_worker()
+# Fill the caches with the keys hit most over the last few flushes before the worker takes traffic
+warm_up({
+    "user_vanity": lambda name: resolve_vanity("user", name),
+    "server_vanity": lambda name: resolve_vanity("server", name),
+    "user_info": get_user_info_short,
+    "server_meta": get_server_meta,
+}, "web")
+
+@app.before_request
+def start_request_profiler():
+    profile_format = requested_profile_format(request, session)
+    if profile_format:
+        g.profile_format = profile_format
+        g.profiler = start_profiling()
+
+@app.after_request
+def return_request_profile(response):
+    profiler = g.pop("profiler", None)
+    if profiler is None:
+        return response
+    profiler.stop()
+    if g.profile_format == "html":
+        return Response(profiler.html_report(f"{request.method} {request.full_path}"), mimetype="text/html")
+    filename = f"profile-{request.endpoint or 'request'}.collapsed"
+    return Response(profiler.collapsed(), mimetype="text/plain", headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+
+@app.teardown_request
+def stop_request_profiler(exc):
+    profiler = g.pop("profiler", None)
+    if profiler is not None:
+        profiler.stop()
+
 @app.errorhandler(404)
 def page_not_found(e):
     return render_template("404.html"), 404
@@ -29,6 +87,26 @@ def internal_server_error(e):
 def too_many_requests(e):
     return render_template("429.html"), 429
 
+@app.errorhandler(UpstreamUnavailable)
+@app.errorhandler(UnavailableError)
+@app.errorhandler(DeadlineExceededError)
+def upstream_unavailable(e):
+    # Firebase reports its own outages; everything else comes from a breaker or the request deadline
+    breaker = get_breaker(getattr(e, "service", "firebase"))
+    retry_after = breaker.retry_after() if breaker.state == "open" else 5
+    return service_unavailable("This page depends on a service that is temporarily unavailable. Please try again shortly.", retry_after)
+
+@app.errorhandler(BulkheadFull)
+def bulkhead_full(e):
+    return service_unavailable("We're handling a lot of requests right now. Please try again in a moment.", e.retry_after)
+
+def service_unavailable(message, retry_after):
+    headers = {"Retry-After": str(retry_after)}
+    if request.path.startswith("/api/") or request.is_json:
+        return jsonify({"error": message}), 503, headers
+    body, status = error_page(message, 503)
+    return body, status, headers
+
 @app.route("/")
 def home():
     return app.send_static_file("index.html")
@@ -45,6 +123,14 @@ def privacy():
 def partners():
     return app.send_static_file("partners.html")
 
+@app.route("/sitemap.xml")
+@app.route("/sitemap-<int:shard>.xml")
+def sitemap(shard=None):
+    path = sitemap_path("sitemap.xml" if shard is None else f"sitemap-{shard}.xml")
+    if path is None or not os.path.isfile(path):
+        abort(404)
+    return send_file(path, mimetype="application/xml", max_age=3600, conditional=True)
+
 @app.route("/login")
 def login():
     redirect_to = request.args.get("redirect_to")
@@ -59,8 +145,16 @@ def login():
         f"&prompt=none"
     )
 
+@app.route("/metrics")
+def metrics():
+    if not is_metrics_request_authorized():
+        abort(404)
+    return Response(render_prometheus(), mimetype="text/plain; version=0.0.4")
+
 @app.route("/logout")
 def logout():
+    if "user_id" in session:
+        forget_user_roles(session["user_id"])
     session.clear()
     return redirect("/")
 
@@ -0,0 +1,99 @@
+"""
+Search index service.
+
+Holds the full-text index over approved experiences (utils/search.py) in a single process, so web
+workers don't each download the Experiences tree and keep their own copy. The index follows the
+Experiences change stream and answers queries over HTTP on a local port; /api/search forwards to it
+through SEARCH_INDEX_URL.
+
+    GET /search?q=<query>&cursor=<cursor>&limit=<n>   {"results": [[id, fields], ...], "next_cursor": ...}
+    GET /health                                        200 once the first snapshot is indexed, else 503
+    GET /metrics                                       index metrics in Prometheus text format
+
+Usage (from the repository root):
+    python -m searchd.run
+    python -m searchd.run --host 127.0.0.1 --port 8765
+"""
+import argparse
+import json
+import logging
+import signal
+import sys
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+logger = logging.getLogger("searchd")
+
+
+def make_handler(index, max_limit):
+    class SearchHandler(BaseHTTPRequestHandler):
+        def send_json(self, status, body, headers=None):
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            url = urlsplit(self.path)
+            if url.path == "/metrics":
+                from utils.metrics import render_prometheus
+                data = render_prometheus().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+                return
+            if url.path not in ("/search", "/health"):
+                return self.send_json(404, {"error": "Not found"})
+            if not index.ready.is_set():
+                return self.send_json(503, {"error": "Index is loading"}, {"Retry-After": "5"})
+            if url.path == "/health":
+                return self.send_json(200, {"documents": len(index)})
+
+            args = {k: v[0] for k, v in parse_qs(url.query).items()}
+            try:
+                limit = min(max(int(args.get("limit", 20)), 1), max_limit)
+                matches, next_cursor = index.search(args.get("q", ""), args.get("cursor"), limit)
+            except ValueError:
+                return self.send_json(400, {"error": "Invalid cursor or limit"})
+            self.send_json(200, {"results": matches, "next_cursor": next_cursor})
+
+        def log_message(self, format, *args):
+            pass
+
+    return SearchHandler
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on")
+    parser.add_argument("--port", type=int, default=8765, help="port to listen on")
+    parser.add_argument("--max-limit", type=int, default=50, help="largest page size a query may ask for")
+    args = parser.parse_args(argv)
+
+    from utils.log import configure_logging
+    from utils.search import search_index, start_search_index, stop_search_index
+
+    configure_logging()
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(search_index, args.max_limit))
+    server.daemon_threads = True
+    # Turn SIGTERM into a normal exit so the change stream gets closed
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    try:
+        start_search_index()
+        logger.info("Search index serving on %s:%d", args.host, args.port)
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop_search_index()
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,362 @@
+"""
+Sitemap and static snapshot generator for public profiles.
+
+Prerenders /u/<id> and /s/<id> (plus their vanity URLs) into SNAPSHOT_DIR, where main.py serves them to
+crawlers without touching Firebase or Discord, and writes sharded sitemaps: sitemap.xml indexes
+sitemap-<n>.xml files of at most --shard-size URLs each.
+
+A manifest in SNAPSHOT_DIR records a digest of every profile's inputs (its approved experiences and the
+public user/server fields shown with them). A run re-renders only profiles that are new, whose digest
+changed or whose snapshot is older than --max-age (guild names and icons come from Discord), and removes
+snapshots of profiles that no longer exist. With --watch the generator stays subscribed to the
+Experiences change stream and every --interval seconds re-renders just the profiles touched by the
+changes it saw.
+
+Usage (from the repository root):
+    python -m sitegen.run
+    python -m sitegen.run --full
+    python -m sitegen.run --watch --interval 60
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from xml.sax.saxutils import escape
+
+SITE_URL = os.environ.get("SITE_URL", "https://servercv.com").rstrip("/")
+# The sitemap protocol's per-file limit
+DEFAULT_SHARD_SIZE = 50000
+MANIFEST_NAME = "manifest.json"
+PUBLIC_USER_FIELDS = ("username", "global_name", "avatar", "banner", "banner_color", "premium", "vanity_url", "socials")
+RENDER_USER_AGENT = "servercv-sitegen"
+
+logger = logging.getLogger("sitegen")
+
+
+def digest(value):
+    return hashlib.sha1(json.dumps(value, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def user_slugs(user_id, user):
+    slugs = [user_id]
+    if user.get("premium") and user.get("vanity_url"):
+        slugs.append(user["vanity_url"])
+    return slugs
+
+
+def collect_profiles(experiences, users, servers):
+    """
+    Returns {"u/<id>" or "s/<id>": profile} for every public profile with at least one approved experience.
+    A profile has its kind, id, slugs (URL names it is reachable under), input digest and lastmod timestamp.
+    """
+    by_user = defaultdict(list)
+    by_server = defaultdict(list)
+    for exp_id, exp in experiences.items():
+        if not isinstance(exp, dict) or exp.get("status") != "approved":
+            continue
+        public = {k: v for k, v in exp.items() if k != "history"}
+        by_user[str(exp.get("user_id"))].append((exp_id, public))
+        by_server[str(exp.get("server_id"))].append((exp_id, public))
+
+    def public_user(user_id):
+        user = users.get(user_id) or {}
+        return {k: user.get(k) for k in PUBLIC_USER_FIELDS}
+
+    def lastmod(exps):
+        return max((exp.get("approved_at") or exp.get("requested_at") or 0) for _, exp in exps)
+
+    profiles = {}
+    for user_id, exps in by_user.items():
+        user = users.get(user_id)
+        if not user:
+            # /u/<id> is a 404 without a user record
+            continue
+        approvers = sorted({str(exp["approved_by"]) for _, exp in exps if exp.get("approved_by")})
+        inputs = [public_user(user_id), sorted(exps, key=lambda e: e[0]), {a: public_user(a) for a in approvers}]
+        profiles[f"u/{user_id}"] = {"kind": "u", "id": user_id, "slugs": user_slugs(user_id, user), "digest": digest(inputs), "lastmod": lastmod(exps)}
+
+    for server_id, exps in by_server.items():
+        server = servers.get(server_id) or {}
+        slugs = [server_id] + ([server["vanity_url"]] if server.get("vanity_url") else [])
+        people = sorted({str(exp[k]) for _, exp in exps for k in ("user_id", "approved_by") if exp.get(k)})
+        inputs = [server, sorted(exps, key=lambda e: e[0]), {p: public_user(p) for p in people}]
+        profiles[f"s/{server_id}"] = {"kind": "s", "id": server_id, "slugs": slugs, "digest": digest(inputs), "lastmod": lastmod(exps)}
+    return profiles
+
+
+class SnapshotStore:
+    """
+    The snapshot directory: prerendered pages under u/ and s/, the manifest and the sitemaps.
+    """
+    def __init__(self, root):
+        self.root = root
+        self.manifest_path = os.path.join(root, MANIFEST_NAME)
+        try:
+            with open(self.manifest_path) as f:
+                self.manifest = json.load(f)
+        except (OSError, ValueError):
+            self.manifest = {}
+
+    def _write(self, path, data):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        # Readers never see a half-written page
+        os.replace(tmp, path)
+
+    def _remove(self, kind, slug):
+        try:
+            os.remove(os.path.join(self.root, kind, f"{slug}.html"))
+        except FileNotFoundError:
+            pass
+
+    def needs_render(self, key, profile, max_age, now):
+        entry = self.manifest.get(key)
+        return entry is None or entry["digest"] != profile["digest"] or entry["slugs"] != profile["slugs"] or now - entry["built_at"] > max_age
+
+    def save_page(self, key, profile, body, now):
+        previous = self.manifest.get(key, {}).get("slugs", [])
+        for slug in previous:
+            if slug not in profile["slugs"]:
+                self._remove(profile["kind"], slug)
+        for slug in profile["slugs"]:
+            self._write(os.path.join(self.root, profile["kind"], f"{slug}.html"), body)
+        self.manifest[key] = {"digest": profile["digest"], "slugs": profile["slugs"], "lastmod": profile["lastmod"], "built_at": now}
+
+    def drop(self, key):
+        entry = self.manifest.pop(key, None)
+        if entry:
+            kind = key.split("/", 1)[0]
+            for slug in entry["slugs"]:
+                self._remove(kind, slug)
+
+    def write_sitemaps(self, shard_size):
+        """
+        Rewrites the sitemap shards and index. Files whose content didn't change are left untouched.
+        """
+        entries = sorted((f"{SITE_URL}/{key.split('/', 1)[0]}/{entry['slugs'][-1]}", entry["lastmod"]) for key, entry in self.manifest.items())
+        shards = [entries[i:i + shard_size] for i in range(0, len(entries), shard_size)]
+        index = []
+        for n, shard in enumerate(shards, start=1):
+            urls = "".join(f"<url><loc>{escape(loc)}</loc><lastmod>{w3c_date(mod)}</lastmod></url>" for loc, mod in shard)
+            name = f"sitemap-{n}.xml"
+            self._write_if_changed(name, f'<?xml version="1.0" encoding="UTF-8"?>\n<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{urls}</urlset>\n')
+            index.append((name, max(mod for _, mod in shard)))
+        n = len(shards) + 1
+        while os.path.exists(os.path.join(self.root, f"sitemap-{n}.xml")):
+            os.remove(os.path.join(self.root, f"sitemap-{n}.xml"))
+            n += 1
+        sitemaps = "".join(f"<sitemap><loc>{SITE_URL}/{name}</loc><lastmod>{w3c_date(mod)}</lastmod></sitemap>" for name, mod in index)
+        self._write_if_changed("sitemap.xml", f'<?xml version="1.0" encoding="UTF-8"?>\n<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{sitemaps}</sitemapindex>\n')
+        return len(shards)
+
+    def _write_if_changed(self, name, text):
+        path = os.path.join(self.root, name)
+        data = text.encode()
+        try:
+            with open(path, "rb") as f:
+                if f.read() == data:
+                    return
+        except FileNotFoundError:
+            pass
+        self._write(path, data)
+
+    def save_manifest(self):
+        self._write(self.manifest_path, json.dumps(self.manifest).encode())
+
+
+def w3c_date(timestamp):
+    return datetime.fromtimestamp(float(timestamp or 0), timezone.utc).strftime("%Y-%m-%d")
+
+
+def make_renderer():
+    """
+    Renders pages through the app itself, so snapshots match what visitors get, with rate limits off.
+    """
+    from main import app
+    from app.dashboard import limiter
+
+    limiter.enabled = False
+    client = app.test_client()
+
+    def render(kind, entity_id):
+        response = client.get(f"/{kind}/{entity_id}", headers={"User-Agent": RENDER_USER_AGENT})
+        return response.get_data() if response.status_code == 200 else None
+    return render
+
+
+def load_users(user_ids=None):
+    from firebase_admin import db
+
+    if user_ids is None:
+        return db.reference("Dashboard Users").get() or {}
+    return {uid: user for uid in user_ids if (user := db.reference(f"Dashboard Users/{uid}").get())}
+
+
+def build(store, render, experiences, users, servers, max_age, shard_size, only=None, full=False):
+    """
+    Re-renders stale profiles (restricted to the keys in only, if given) and refreshes the sitemaps.
+    Returns (rendered, removed, failed).
+    """
+    profiles = collect_profiles(experiences, users, servers)
+    now = time.time()
+    rendered = failed = 0
+    for key, profile in profiles.items():
+        if only is not None and key not in only:
+            continue
+        if not full and not store.needs_render(key, profile, max_age, now):
+            continue
+        body = render(profile["kind"], profile["id"])
+        if body is None:
+            failed += 1
+            continue
+        store.save_page(key, profile, body, now)
+        rendered += 1
+
+    candidates = set(store.manifest) if only is None else set(only) & set(store.manifest)
+    gone = [key for key in candidates if key not in profiles]
+    for key in gone:
+        store.drop(key)
+    store.write_sitemaps(shard_size)
+    store.save_manifest()
+    return rendered, len(gone), failed
+
+
+def affected_profiles(exp):
+    if not isinstance(exp, dict):
+        return set()
+    keys = set()
+    if exp.get("user_id"):
+        keys.add(f"u/{exp['user_id']}")
+    if exp.get("server_id"):
+        keys.add(f"s/{exp['server_id']}")
+    return keys
+
+
+class ChangeWatcher:
+    """
+    Mirrors Experiences from the change stream and collects the profiles touched since the last flush.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.experiences = {}
+        self.dirty = set()
+        self.loaded = threading.Event()
+
+    def on_event(self, event):
+        if event.event_type not in ("put", "patch"):
+            return
+        keys = [k for k in event.path.strip("/").split("/") if k]
+        with self.lock:
+            if not keys and event.event_type == "put":
+                if self.loaded.is_set():
+                    # Reconnect snapshot: anything may have changed while disconnected
+                    previous = self.experiences
+                    for exp_id in set(previous) | set(event.data or {}):
+                        if previous.get(exp_id) != (event.data or {}).get(exp_id):
+                            self.dirty |= affected_profiles(previous.get(exp_id)) | affected_profiles((event.data or {}).get(exp_id))
+                self.experiences = event.data or {}
+                self.loaded.set()
+                return
+            if event.event_type == "put":
+                changes = [(keys, event.data)]
+            else:
+                changes = [(keys + [k for k in child.split("/") if k], value) for child, value in (event.data or {}).items()]
+            for change_keys, value in changes:
+                exp_id = change_keys[0]
+                before = self.experiences.get(exp_id)
+                self.dirty |= affected_profiles(before)
+                if len(change_keys) == 1:
+                    after = value
+                else:
+                    after = dict(before or {})
+                    if len(change_keys) == 2:
+                        if value is None:
+                            after.pop(change_keys[1], None)
+                        else:
+                            after[change_keys[1]] = value
+                if after is None:
+                    self.experiences.pop(exp_id, None)
+                else:
+                    self.experiences[exp_id] = after
+                self.dirty |= affected_profiles(after)
+
+    def take(self):
+        with self.lock:
+            dirty, self.dirty = self.dirty, set()
+            return dirty, dict(self.experiences)
+
+
+def watch(store, render, servers_loader, max_age, shard_size, interval):
+    from utils.firebase import listen_experiences
+
+    watcher = ChangeWatcher()
+    registration = listen_experiences(watcher.on_event)
+    try:
+        watcher.loaded.wait()
+        while True:
+            time.sleep(interval)
+            dirty, experiences = watcher.take()
+            if not dirty:
+                continue
+            user_ids = {key.split("/", 1)[1] for key in dirty if key.startswith("u/")}
+            # Server pages show their members' names, so those users are needed as well
+            dirty_servers = {key.split("/", 1)[1] for key in dirty if key.startswith("s/")}
+            for exp in experiences.values():
+                if isinstance(exp, dict) and str(exp.get("server_id")) in dirty_servers:
+                    user_ids.update(str(exp[k]) for k in ("user_id", "approved_by") if exp.get(k))
+            started = time.perf_counter()
+            rendered, removed, failed = build(store, render, experiences, load_users(user_ids), servers_loader(), max_age, shard_size, only=dirty, full=True)
+            logger.info("Rebuilt %d changed profiles (%d removed, %d failed) in %.1fs", rendered, removed, failed, time.perf_counter() - started)
+    finally:
+        registration.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--out", help="snapshot directory (default: SNAPSHOT_DIR)")
+    parser.add_argument("--full", action="store_true", help="re-render every profile")
+    parser.add_argument("--max-age", type=int, default=24 * 3600, help="re-render snapshots older than this many seconds")
+    parser.add_argument("--shard-size", type=int, default=DEFAULT_SHARD_SIZE, help="URLs per sitemap file")
+    parser.add_argument("--watch", action="store_true", help="keep running and follow the Experiences change stream")
+    parser.add_argument("--interval", type=float, default=60, help="seconds between rebuilds in --watch mode")
+    args = parser.parse_args(argv)
+
+    if args.out:
+        os.environ["SNAPSHOT_DIR"] = args.out
+    # Rendering never queries search, so pages skip the search service entirely
+    os.environ.setdefault("SEARCH_INDEX_ENABLED", "0")
+    # Payment webhooks are handled by the web workers
+    os.environ.setdefault("PAYMENT_WORKER_ENABLED", "0")
+    # Prerendering would count as traffic in Access Stats, and its caches don't need warming
+    os.environ.setdefault("ACCESS_STATS_ENABLED", "0")
+    os.environ.setdefault("WARMUP_ENABLED", "0")
+    logging.basicConfig(level=logging.INFO, format="%(message)s", stream=sys.stdout)
+
+    from firebase_admin import db
+    from utils.snapshots import SNAPSHOT_DIR
+
+    render = make_renderer()
+    store = SnapshotStore(SNAPSHOT_DIR)
+
+    def load_servers():
+        return db.reference("Dashboard Servers").get() or {}
+
+    started = time.perf_counter()
+    experiences = db.reference("Experiences").get() or {}
+    rendered, removed, failed = build(store, render, experiences, load_users(), load_servers(), args.max_age, max(1, min(args.shard_size, DEFAULT_SHARD_SIZE)), full=args.full)
+    print(f"{rendered} profiles rendered, {removed} removed, {failed} failed, {len(store.manifest)} in sitemap ({time.perf_counter() - started:.1f}s) -> {SNAPSHOT_DIR}")
+
+    if args.watch:
+        watch(store, render, load_servers, args.max_age, max(1, min(args.shard_size, DEFAULT_SHARD_SIZE)), args.interval)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+import os
+import threading
+from time import monotonic
+
+from flask import g, request
+
+from utils.metrics import inc, observe, set_gauge
+from utils.resilience import remaining
+
+QUEUE_TIMEOUT = float(os.environ.get("BULKHEAD_QUEUE_TIMEOUT", 2))
+WAIT_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+# (route class, URL rule prefixes). First match wins; unmatched routes use "default".
+ROUTE_CLASSES = (
+    ("server_pages", ("/s/", "/api/server/")),
+    ("profile_pages", ("/u/", "/experience/", "/api/search")),
+    ("admin_api", ("/api/guild/", "/api/server_settings/", "/view/", "/approve/", "/reject/", "/edit_pending/", "/edit_accepted/", "/delete/", "/delete_pending/")),
+    ("payment", ("/payment/", "/premium", "/api/premium/", "/api/payment/")),
+    ("oauth", ("/login",)),
+    ("images", ("/img/",)),
+)
+
+# (concurrent requests, queued requests); a limit of 0 disables the bulkhead for that class
+DEFAULT_LIMITS = {
+    "server_pages": (16, 16),
+    "profile_pages": (16, 16),
+    "admin_api": (8, 8),
+    "payment": (4, 4),
+    "oauth": (8, 8),
+    # Misses download and re-encode on the worker's CPU; hits are cheap but share the class
+    "images": (8, 32),
+    "default": (0, 0),
+}
+
+# Long-lived streams hold their slot for minutes; utils/live.py caps them separately
+EXEMPT_ENDPOINTS = {"static", "metrics", "dashboard.server_events"}
+
+
+class BulkheadFull(Exception):
+    def __init__(self, route_class, retry_after):
+        super().__init__(f"{route_class} is saturated")
+        self.route_class = route_class
+        self.retry_after = retry_after
+
+
+class Bulkhead:
+    """
+    Caps concurrent requests for one route class. Requests over the limit wait in a bounded
+    queue for up to QUEUE_TIMEOUT seconds (or the request deadline); the rest are rejected.
+    """
+    def __init__(self, name, limit, queue_size):
+        self.name = name
+        self.limit = limit
+        self.queue_size = queue_size
+        self.in_flight = 0
+        self.queued = 0
+        self._cond = threading.Condition()
+        set_gauge("servercv_bulkhead_limit", limit, route_class=name)
+        self._report()
+
+    def _report(self):
+        set_gauge("servercv_bulkhead_in_flight", self.in_flight, route_class=self.name)
+        set_gauge("servercv_bulkhead_queued", self.queued, route_class=self.name)
+
+    def acquire(self, timeout):
+        with self._cond:
+            if self.in_flight < self.limit:
+                self.in_flight += 1
+                self._report()
+                return True
+            if self.queued >= self.queue_size or timeout <= 0:
+                return False
+            start = monotonic()
+            self.queued += 1
+            self._report()
+            try:
+                acquired = self._cond.wait_for(lambda: self.in_flight < self.limit, timeout)
+                if acquired:
+                    self.in_flight += 1
+                return acquired
+            finally:
+                self.queued -= 1
+                self._report()
+                observe("servercv_bulkhead_wait_seconds", monotonic() - start, buckets=WAIT_BUCKETS, route_class=self.name)
+
+    def release(self):
+        with self._cond:
+            self.in_flight -= 1
+            self._report()
+            self._cond.notify()
+
+
+def _limits_for(route_class):
+    limit, queue_size = DEFAULT_LIMITS[route_class]
+    prefix = f"BULKHEAD_{route_class.upper()}"
+    return int(os.environ.get(f"{prefix}_LIMIT", limit)), int(os.environ.get(f"{prefix}_QUEUE", queue_size))
+
+
+bulkheads = {name: Bulkhead(name, *_limits_for(name)) for name in DEFAULT_LIMITS}
+
+
+def classify_request():
+    rule = request.url_rule.rule if request.url_rule else request.path
+    # The OAuth redirect lands on /dashboard?code=... and spends its time on the token exchange
+    if rule == "/dashboard" and request.args.get("code"):
+        return "oauth"
+    for route_class, prefixes in ROUTE_CLASSES:
+        if rule.startswith(prefixes):
+            return route_class
+    return "default"
+
+
+def init_bulkheads(app):
+    """
+    Registers request hooks that hold a slot in the request's route class bulkhead while it is served.
+    Rejected requests raise BulkheadFull, which main.py turns into a 503 with Retry-After.
+    """
+    @app.before_request
+    def enter_bulkhead():
+        if request.endpoint in EXEMPT_ENDPOINTS:
+            return
+        bulkhead = bulkheads[classify_request()]
+        if bulkhead.limit <= 0:
+            return
+        left = remaining()
+        timeout = QUEUE_TIMEOUT if left is None else min(QUEUE_TIMEOUT, left)
+        if not bulkhead.acquire(timeout):
+            inc("servercv_bulkhead_rejections_total", route_class=bulkhead.name)
+            raise BulkheadFull(bulkhead.name, max(1, round(QUEUE_TIMEOUT)))
+        g.bulkhead = bulkhead
+
+    @app.teardown_request
+    def leave_bulkhead(exc):
+        bulkhead = g.pop("bulkhead", None)
+        if bulkhead is not None:
+            bulkhead.release()
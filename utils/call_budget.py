@@ -0,0 +1,124 @@
+import logging
+import os
+import threading
+from collections import Counter
+from contextvars import ContextVar
+from functools import wraps
+from time import perf_counter
+
+from flask import current_app, request
+
+from utils.metrics import add_upstream_listener, normalize_path
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CALL_BUDGET = int(os.environ.get("CALL_BUDGET_DEFAULT", 25))
+REPEAT_THRESHOLD = int(os.environ.get("CALL_BUDGET_REPEAT_THRESHOLD", 3))
+CALL_SUMMARY_ENABLED = os.environ.get("CALL_SUMMARY_ENABLED", "1") == "1"
+
+_current = ContextVar("servercv_call_tracker", default=None)
+
+
+class CallTracker:
+    """
+    Collects every Firebase and Discord/PayPal call made while serving one request.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = perf_counter()
+        self.budget = DEFAULT_CALL_BUDGET
+        self.calls = []
+
+    def add(self, service, operation, target, seconds, error):
+        with self.lock:
+            self.calls.append((service, operation, target, seconds, error))
+
+    def summary(self):
+        with self.lock:
+            calls = list(self.calls)
+
+        by_service = {}
+        for service, _, _, seconds, error in calls:
+            entry = by_service.setdefault(service, {"count": 0, "seconds": 0.0, "errors": 0})
+            entry["count"] += 1
+            entry["seconds"] = round(entry["seconds"] + seconds, 4)
+            entry["errors"] += int(error)
+
+        # Reads only: repeated writes to the same node are usually intentional
+        reads = [(service, target) for service, operation, target, _, _ in calls
+                 if target and (operation in ("get", "query") or operation.startswith("GET "))]
+        duplicates = {f"{service} {target}": count for (service, target), count in Counter(reads).items() if count > 1}
+        patterns = Counter((service, normalize_path(target)) for service, target in reads)
+        repeated = {f"{service} {pattern}": count for (service, pattern), count in patterns.items() if count >= REPEAT_THRESHOLD}
+
+        return {
+            "route": request.url_rule.rule if request.url_rule else request.path,
+            "method": request.method,
+            "duration_ms": round((perf_counter() - self.started) * 1000, 1),
+            "calls": len(calls),
+            "budget": self.budget,
+            "by_service": by_service,
+            "duplicates": duplicates,
+            "repeated_patterns": repeated,
+        }
+
+
+def _record_call(service, operation, target, seconds, error):
+    tracker = _current.get()
+    if tracker is not None:
+        tracker.add(service, operation, target, seconds, error)
+
+
+def call_budget(limit):
+    """
+    Overrides the call budget for a single route. Place below @dashboard.route.
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            tracker = _current.get()
+            if tracker is not None:
+                tracker.budget = limit
+            return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def is_development():
+    return current_app.debug or os.environ.get("SERVERCV_ENV") == "development"
+
+
+def init_call_budget(app):
+    """
+    Registers request hooks that track upstream calls per request, emit a summary and,
+    in development, warn about duplicate reads, N+1 patterns and exceeded budgets.
+    """
+    add_upstream_listener(_record_call)
+
+    @app.before_request
+    def start_call_tracker():
+        _current.set(CallTracker())
+
+    @app.after_request
+    def emit_call_summary(response):
+        tracker = _current.get()
+        if tracker is None or not tracker.calls:
+            return response
+
+        summary = tracker.summary()
+        if CALL_SUMMARY_ENABLED:
+            logger.info("request calls", extra={"event": "request_calls", **summary})
+
+        if is_development():
+            route = summary["route"]
+            for key, count in summary["duplicates"].items():
+                logger.warning(f"{route}: {key} fetched {count} times in one request", extra={"event": "duplicate_read"})
+            for key, count in summary["repeated_patterns"].items():
+                logger.warning(f"{route}: possible N+1, {key} fetched {count} times", extra={"event": "repeated_read"})
+            if summary["calls"] > summary["budget"]:
+                logger.warning(f"{route}: {summary['calls']} upstream calls exceeds budget of {summary['budget']}", extra={"event": "call_budget_exceeded"})
+        return response
+
+    @app.teardown_request
+    def clear_call_tracker(exc):
+        _current.set(None)
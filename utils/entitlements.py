@@ -0,0 +1,83 @@
+import os
+
+from firebase_admin import db
+from config.settings import ALLOWED_PREMIUM_SERVERS
+
+from utils.cache import TTLCache
+
+EXP_LIMIT_FREE = 5
+DESC_LIMIT_FREE = 200
+DESC_LIMIT_PREMIUM = 3000
+SOCIAL_LIMIT_FREE = 3
+SOCIAL_LIMIT_PREMIUM = 10
+
+# Staff of these roles in an ALLOWED_PREMIUM_SERVERS server can redeem premium for free
+REDEEM_ROLES = ("Server Owner", "Administrator", "Moderator")
+
+# Each process caches on its own and invalidate_entitlements only reaches the one that handled the
+# change. Plans only ever go from free to premium, so premium is cached for long and free only briefly:
+# after an upgrade other workers catch up within ENTITLEMENT_FREE_CACHE_TTL seconds.
+ENTITLEMENT_CACHE_TTL = int(os.environ.get("ENTITLEMENT_CACHE_TTL", 300))
+ENTITLEMENT_FREE_CACHE_TTL = int(os.environ.get("ENTITLEMENT_FREE_CACHE_TTL", 5))
+_cache = TTLCache("entitlements", ENTITLEMENT_CACHE_TTL)
+
+
+class Entitlements:
+    """
+    What a user's plan allows. experience_limit is None when unlimited.
+    """
+    __slots__ = ("plan", "is_premium", "experience_limit", "description_limit", "social_limit")
+
+    def __init__(self, is_premium):
+        self.plan = "premium" if is_premium else "free"
+        self.is_premium = is_premium
+        self.experience_limit = None if is_premium else EXP_LIMIT_FREE
+        self.description_limit = DESC_LIMIT_PREMIUM if is_premium else DESC_LIMIT_FREE
+        self.social_limit = SOCIAL_LIMIT_PREMIUM if is_premium else SOCIAL_LIMIT_FREE
+
+    @property
+    def can_pin(self):
+        return self.is_premium
+
+    @property
+    def can_set_vanity_url(self):
+        return self.is_premium
+
+    def can_add_experience(self, current_count):
+        return self.experience_limit is None or current_count < self.experience_limit
+
+    def __repr__(self):
+        return f"Entitlements({self.plan!r})"
+
+
+FREE = Entitlements(False)
+PREMIUM = Entitlements(True)
+
+
+def get_entitlements(user_id, user_data=None):
+    """
+    Resolves a user's plan from the premium flag alone rather than the whole user record.
+    Pass user_data when the caller already fetched the record, to skip the read.
+    """
+    entitlements = _cache.get(user_id)
+    if entitlements is not None:
+        return entitlements
+    if user_data is not None:
+        is_premium = bool(user_data.get("premium", False))
+    else:
+        is_premium = bool(db.reference(f"Dashboard Users/{user_id}/premium").get())
+    entitlements = PREMIUM if is_premium else FREE
+    _cache.set(user_id, entitlements, ttl=None if is_premium else ENTITLEMENT_FREE_CACHE_TTL)
+    return entitlements
+
+
+def invalidate_entitlements(user_id):
+    _cache.delete(user_id)
+
+
+def is_premium_offer_server(server_id):
+    return server_id in ALLOWED_PREMIUM_SERVERS
+
+
+def can_redeem_server_premium(server_id, role):
+    return is_premium_offer_server(server_id) and role in REDEEM_ROLES
@@ -0,0 +1,87 @@
+import html
+
+CHRONOLOGY_FIELDS = ("start_year", "start_month", "end_year", "end_month")
+# Larger than any chronology key, so pinned entries sort ahead of everything else
+PINNED_OFFSET = 1 << 48
+# Subtrees stored under an experience node that the JSON APIs never send
+JSON_EXCLUDED_FIELDS = ("history",)
+
+
+def _to_int(value, default):
+    try:
+        return int(value or default)
+    except (TypeError, ValueError):
+        return default
+
+
+def chronology_key(data):
+    """
+    Packs (start_year, start_month, end_year, end_month) into one integer with the same ordering
+    as the tuple. Ongoing entries count as ending 12/9999.
+    """
+    start_year = _to_int(data.get("start_year"), 0)
+    start_month = _to_int(data.get("start_month"), 0)
+    end_year = _to_int(data.get("end_year"), 9999)
+    end_month = _to_int(data.get("end_month"), 12)
+    return ((start_year * 13 + start_month) * 10000 + end_year) * 13 + end_month
+
+
+class ExperienceRecord:
+    """
+    An experience as fetched from Firebase, parsed once per fetch.
+    Supports read access like the raw dict (exp["role_title"], exp.get(...)), keeps the chronology
+    sort key precomputed and caches HTML-escaped display fields.
+    """
+    __slots__ = ("id", "data", "sort_key", "_escaped")
+
+    def __init__(self, exp_id, data):
+        self.id = exp_id
+        self.data = data
+        self.sort_key = chronology_key(data)
+        self._escaped = {}
+
+    @property
+    def pinned_sort_key(self):
+        return self.sort_key + PINNED_OFFSET if self.data.get("is_pinned") else self.sort_key
+
+    def __getitem__(self, key):
+        if key == "id":
+            return self.id
+        return self.data[key]
+
+    def __setitem__(self, key, value):
+        self.data[key] = value
+        self._escaped.pop(key, None)
+        if key in CHRONOLOGY_FIELDS:
+            self.sort_key = chronology_key(self.data)
+
+    def __contains__(self, key):
+        return key == "id" or key in self.data
+
+    def get(self, key, default=None):
+        if key == "id":
+            return self.id
+        return self.data.get(key, default)
+
+    def escaped(self, key, default=""):
+        cache = self._escaped
+        if key in cache:
+            return cache[key]
+        value = self.data.get(key)
+        if value is None:
+            return html.escape(default)
+        cache[key] = escaped = html.escape(str(value))
+        return escaped
+
+    def to_json(self, escape=()):
+        """
+        Serializes for the JSON APIs. Fields in escape are HTML-escaped ("" when missing).
+        """
+        payload = {k: v for k, v in self.data.items() if k not in JSON_EXCLUDED_FIELDS}
+        payload["id"] = self.id
+        for key in escape:
+            payload[key] = self.escaped(key)
+        return payload
+
+    def __repr__(self):
+        return f"ExperienceRecord({self.id!r})"
@@ -1,12 +1,40 @@
 import firebase_admin
+import json
+import os
+import secrets
 import uuid
+from bisect import bisect_left
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
 from time import time
 
-from firebase_admin import credentials, db
+from firebase_admin import credentials, db, _sseclient
 from config.settings import FIREBASE_CRED, DATABASE_URL
+from utils.metrics import instrument_firebase
+from utils.resilience import FIREBASE_TIMEOUT, protect_firebase
+from utils.experience import ExperienceRecord, chronology_key
+from utils.cache import TTLCache
+from utils.entitlements import get_entitlements
+from utils.warmup import record_access
 
 cred = credentials.Certificate(FIREBASE_CRED)
-default_app = firebase_admin.initialize_app(cred, {"databaseURL": DATABASE_URL})
+default_app = firebase_admin.initialize_app(cred, {"databaseURL": DATABASE_URL, "httpTimeout": FIREBASE_TIMEOUT})
+instrument_firebase(db)
+protect_firebase(db)
+
+REGISTRY_CACHE_TTL = int(os.environ.get("REGISTRY_CACHE_TTL", 15))
+_registry_cache = TTLCache("server_registry", REGISTRY_CACHE_TTL, maxsize=int(os.environ.get("REGISTRY_CACHE_SIZE", 100)))
+REGISTRY_READ_CONCURRENCY = int(os.environ.get("REGISTRY_READ_CONCURRENCY", 8))
+SERVER_META_CACHE_TTL = int(os.environ.get("SERVER_META_CACHE_TTL", 60))
+_server_meta_cache = TTLCache("server_meta", SERVER_META_CACHE_TTL, maxsize=5000)
+USER_INFO_CACHE_TTL = int(os.environ.get("USER_INFO_CACHE_TTL", 60))
+_user_info_cache = TTLCache("user_info", USER_INFO_CACHE_TTL, maxsize=10000)
+VANITY_CACHE_TTL = int(os.environ.get("VANITY_CACHE_TTL", 120))
+_vanity_cache = TTLCache("vanity", VANITY_CACHE_TTL, maxsize=5000)
+VANITY_NODES = {"user": "Dashboard Users", "server": "Dashboard Servers"}
+# Checks Dashboard Users for orders activated before Payment Orders existed; set to 0 once
+# `python -m backfill.run payment-orders` has run
+PAYMENT_LEGACY_ORDER_LOOKUP = os.environ.get("PAYMENT_LEGACY_ORDER_LOOKUP", "1") == "1"
 
 def save_user_to_firebase(user, token):
     db.reference(f"Dashboard Users/{user['id']}").update({
@@ -17,15 +45,31 @@ def save_user_to_firebase(user, token):
         "banner": user.get("banner"),
         "banner_color": user.get("banner_color")
     })
+    invalidate_user_info(user["id"])
 
-def log_history(exp_id, action, user_id, details=None):
-    history_entry = {
+PUSH_CHARS = "-0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ_abcdefghijklmnopqrstuvwxyz"
+
+def generate_push_id():
+    """
+    Chronologically ordered key in the same format as push(), generated locally so it can go into a multi-path update.
+    """
+    now = int(time() * 1000)
+    stamp = ""
+    for _ in range(8):
+        stamp = PUSH_CHARS[now % 64] + stamp
+        now //= 64
+    return stamp + "".join(secrets.choice(PUSH_CHARS) for _ in range(12))
+
+def make_history_entry(action, user_id, details=None):
+    return {
         "action": action,
         "user_id": user_id,
         "timestamp": time(),
         "details": details or {}
     }
-    db.reference(f"Experiences/{exp_id}/history").push(history_entry)
+
+def log_history(exp_id, action, user_id, details=None):
+    db.reference(f"Experiences/{exp_id}/history").push(make_history_entry(action, user_id, details))
 
 def get_experience_history(exp_id):
     history = db.reference(f"Experiences/{exp_id}/history").get()
@@ -75,64 +119,245 @@ def approve_experience(exp_id, approved_by):
 def reject_experience(exp_id):
     db.reference(f"Experiences/{exp_id}").delete()
 
+def moderate_experiences(changes, user_id):
+    """
+    Applies [(exp_id, action)] with action "approve", "reject" or "delete" in one multi-path update.
+    Approvals get their history entry in the same write; rejected and deleted nodes are removed together
+    with the history stored under them, as with reject_experience.
+    """
+    updates = {}
+    now = time()
+    for exp_id, action in changes:
+        if action == "approve":
+            updates[f"{exp_id}/approved_by"] = user_id
+            updates[f"{exp_id}/approved_at"] = now
+            updates[f"{exp_id}/status"] = "approved"
+            updates[f"{exp_id}/history/{generate_push_id()}"] = make_history_entry("Approved", user_id)
+        else:
+            updates[exp_id] = None
+    if updates:
+        db.reference("Experiences").update(updates)
+
 def get_user_info_short(user_id):
     if not user_id:
         return {"name": "", "slug": ""}
+    record_access("user_info", user_id)
+    cached = _user_info_cache.get(user_id)
+    if cached is not None:
+        return dict(cached)
     user = db.reference(f"Dashboard Users/{user_id}").get()
     if not user:
-        return {"name": user_id, "slug": user_id}
-    
-    name = user.get("username", user_id)
-    slug = user.get("vanity_url") if user.get("premium", False) and user.get("vanity_url") else user_id
-    return {"name": name, "slug": slug}
+        info = {"name": user_id, "slug": user_id}
+    else:
+        name = user.get("username", user_id)
+        slug = user.get("vanity_url") if get_entitlements(user_id, user).can_set_vanity_url and user.get("vanity_url") else user_id
+        info = {"name": name, "slug": slug}
+    _user_info_cache.set(user_id, info)
+    return dict(info)
+
+def invalidate_user_info(user_id):
+    _user_info_cache.delete(user_id)
+
+def resolve_vanity(kind, vanity_url):
+    """
+    Returns the ID of the user or server ("user" or "server") that owns vanity_url, or None.
+    Only matches are cached, so a newly claimed name resolves straight away.
+    """
+    record_access(f"{kind}_vanity", vanity_url)
+    owner = _vanity_cache.get((kind, vanity_url))
+    if owner is None:
+        result = db.reference(VANITY_NODES[kind]).order_by_child("vanity_url").equal_to(vanity_url).get()
+        if not result:
+            return None
+        owner = list(result.keys())[0]
+        _vanity_cache.set((kind, vanity_url), owner)
+    return owner
+
+def invalidate_vanity(kind):
+    """
+    Forgets every cached user or server vanity URL, after one of them changes. Changes are rare
+    enough that tracking each owner's old name isn't worth it.
+    """
+    _vanity_cache.delete_where(lambda key: key[0] == kind)
 
 def get_username(user_id):
     return get_user_info_short(user_id)["name"]
 
+def make_server_experience_record(exp_id, exp, users=None):
+    """
+    Wraps a raw experience in an ExperienceRecord with the requester and approver names used by the server views.
+    users, if given, memoizes user lookups across calls.
+    """
+    def lookup(uid):
+        if users is None:
+            return get_user_info_short(uid)
+        if uid not in users:
+            users[uid] = get_user_info_short(uid)
+        return users[uid]
+
+    user_info = lookup(exp["user_id"])
+    exp["user_name"] = user_info["name"]
+    exp["user_slug"] = user_info["slug"]
+    
+    if exp.get("approved_by"):
+        approver_info = lookup(exp["approved_by"])
+        exp["approver_name"] = approver_info["name"]
+        exp["approver_slug"] = approver_info["slug"]
+    else:
+        exp["approver_name"] = ""
+        exp["approver_slug"] = ""
+    return ExperienceRecord(exp_id, exp)
+
 def get_all_experiences_for_server(server_id):
     ref = db.reference("Experiences")
     experiences = ref.order_by_child("server_id").equal_to(server_id).get()
     all_exp = []
     if experiences:
+        # Each get() returns freshly decoded dicts, so records wrap them without copying
         for k, exp in experiences.items():
-            exp_copy = exp.copy()
-            exp_copy["id"] = k
-            
-            user_info = get_user_info_short(exp["user_id"])
-            exp_copy["user_name"] = user_info["name"]
-            exp_copy["user_slug"] = user_info["slug"]
-            
-            if exp.get("approved_by"):
-                approver_info = get_user_info_short(exp["approved_by"])
-                exp_copy["approver_name"] = approver_info["name"]
-                exp_copy["approver_slug"] = approver_info["slug"]
-            else:
-                exp_copy["approver_name"] = ""
-                exp_copy["approver_slug"] = ""
-                
-            all_exp.append(exp_copy)
+            all_exp.append(make_server_experience_record(k, exp))
     return all_exp
 
+def get_server_registry(server_id):
+    """
+    Returns ([(sort key, experience id)] of a server's approved experiences in ascending order, raw
+    experiences by ID). Only the keys are cached, for REGISTRY_CACHE_TTL seconds, so paging through a
+    registry runs the query once; the raw experiences are None when the keys came from the cache.
+    """
+    keys = _registry_cache.get(server_id)
+    if keys is not None:
+        return keys, None
+    experiences = db.reference("Experiences").order_by_child("server_id").equal_to(server_id).get() or {}
+    keys = sorted((chronology_key(exp), k) for k, exp in experiences.items() if exp.get("status") == "approved")
+    _registry_cache.set(server_id, keys)
+    return keys, experiences
+
+def get_experiences(exp_ids):
+    """
+    Reads the given experiences, REGISTRY_READ_CONCURRENCY at a time. Returns {id: experience} for those that exist.
+    """
+    def read(exp_id):
+        return exp_id, db.reference(f"Experiences/{exp_id}").get()
+
+    with ThreadPoolExecutor(max_workers=REGISTRY_READ_CONCURRENCY) as pool:
+        # Each read runs in a copy of this context so it keeps the request's deadline
+        futures = [pool.submit(copy_context().run, read, exp_id) for exp_id in exp_ids]
+        return {exp_id: exp for exp_id, exp in (f.result() for f in futures) if isinstance(exp, dict)}
+
+def get_latest_server_request(server_id):
+    """
+    The newest experience request for a server, whose copy of the server's name, icon and banner is the
+    most recent one available before the bot syncs the server; None if it has none.
+    """
+    experiences = db.reference("Experiences").order_by_child("server_id").equal_to(server_id).get() or {}
+    return max(experiences.values(), key=lambda x: x.get("requested_at", 0), default=None)
+
+def server_meta_from_guild(guild):
+    """
+    The Servers/<id>/meta fields for a Discord API guild object.
+    """
+    return {
+        "server_name": guild.get("name", "Unknown Server"),
+        "server_icon": guild.get("icon"),
+        "server_banner": guild.get("banner"),
+        "description": guild.get("description"),
+        "member_count": guild.get("approximate_member_count"),
+        "updated_at": time(),
+    }
+
+def get_server_meta(server_id):
+    """
+    Returns Servers/<id>/meta (name, icon, banner, description, member count), or None if it hasn't
+    been written yet. The bot keeps the node current from guild events.
+    """
+    record_access("server_meta", server_id)
+    meta = _server_meta_cache.get(server_id)
+    if meta is None:
+        meta = db.reference(f"Servers/{server_id}/meta").get() or {}
+        _server_meta_cache.set(server_id, meta)
+    return meta or None
+
+def save_server_meta(server_id, meta):
+    """
+    Seeds the meta node for a server the bot hasn't synced yet. Later writes come from the bot.
+    """
+    db.reference(f"Servers/{server_id}/meta").set(meta)
+    _server_meta_cache.set(server_id, meta)
+
+def get_server_registry_page(server_id, cursor=None, limit=25):
+    """
+    Returns (records, next_cursor) for one page of a server's approved experiences.
+    The cursor is "<sort key>:<experience id>" of the last entry already shown. Only the returned page
+    is read (when the keys were cached) and enriched with user names. Raises ValueError for a malformed cursor.
+    """
+    keys, experiences = get_server_registry(server_id)
+    end = len(keys)
+    if cursor:
+        key, _, exp_id = cursor.partition(":")
+        end = bisect_left(keys, (int(key), exp_id))
+    page_keys = keys[max(0, end - limit):end][::-1]
+    if experiences is None:
+        experiences = get_experiences([exp_id for _, exp_id in page_keys])
+    users = {}
+    # Entries read after the keys were cached may have been unapproved or deleted since
+    records = [make_server_experience_record(exp_id, experiences[exp_id], users) for _, exp_id in page_keys
+               if experiences.get(exp_id, {}).get("status") == "approved"]
+    next_cursor = f"{page_keys[-1][0]}:{page_keys[-1][1]}" if page_keys and end > limit else None
+    return records, next_cursor
+
+def listen_server_experiences(server_id, callback):
+    """
+    Streams realtime updates for one server's experiences to callback(event).
+    Reference.listen() cannot take a query, so this opens the same SSE stream with orderBy/equalTo added.
+    That relies on firebase_admin internals; if an SDK upgrade changes them this raises, and the
+    live view falls back to polling.
+    """
+    ref = db.reference("Experiences")
+    client = ref._client
+    params = dict(client.params)
+    params["orderBy"] = json.dumps("server_id")
+    params["equalTo"] = json.dumps(server_id)
+    sse = _sseclient.SSEClient(client.base_url + ref._add_suffix(), client.create_listener_session(), params=params)
+    return db.ListenerRegistration(callback, sse)
+
+def listen_experiences(callback):
+    """
+    Streams realtime updates for every experience to callback(event), starting with the full snapshot.
+    """
+    return db.reference("Experiences").listen(callback)
+
+def get_experience(exp_id):
+    return db.reference(f"Experiences/{exp_id}").get()
+
 def get_user_experiences(user_id):
+    approved, _ = get_user_experiences_by_status(user_id)
+    return approved
+
+def get_user_experiences_by_status(user_id, include_approved=True):
+    """
+    Runs a single user-scoped query and splits the results into approved and pending ExperienceRecord lists.
+    With include_approved=False the approved list stays empty and its approver lookups are skipped.
+    """
     ref = db.reference("Experiences")
     experiences = ref.order_by_child("user_id").equal_to(user_id).get()
     approved = []
+    pending = []
     if experiences:
         for k, exp in experiences.items():
-            if exp.get("status") == "approved":
-                exp_copy = exp.copy()
-                exp_copy["id"] = k
-                
+            status = exp.get("status")
+            if status == "approved" and include_approved:
                 if exp.get("approved_by"):
                     approver_info = get_user_info_short(exp["approved_by"])
-                    exp_copy["approved_by_name"] = approver_info["name"]
-                    exp_copy["approved_by_slug"] = approver_info["slug"]
+                    exp["approved_by_name"] = approver_info["name"]
+                    exp["approved_by_slug"] = approver_info["slug"]
                 else:
-                    exp_copy["approved_by_name"] = "Unknown"
-                    exp_copy["approved_by_slug"] = ""
+                    exp["approved_by_name"] = "Unknown"
+                    exp["approved_by_slug"] = ""
                     
-                approved.append(exp_copy)
-    return approved
+                approved.append(ExperienceRecord(k, exp))
+            elif status == "pending":
+                pending.append(ExperienceRecord(k, exp))
+    return approved, pending
 
 def update_experience_end_date(exp_id, end_month, end_year, user_id=None):
     db.reference(f"Experiences/{exp_id}").update({
@@ -143,4 +368,68 @@ def update_experience_end_date(exp_id, end_month, end_year, user_id=None):
         log_history(exp_id, "End Date Updated", user_id, {"end_month": end_month, "end_year": end_year})
 
 def get_user_data(user_id):
-    return db.reference(f"Dashboard Users/{user_id}").get()
\ No newline at end of file
+    return db.reference(f"Dashboard Users/{user_id}").get()
+
+def legacy_order_claim(order_id):
+    """
+    Claim for an order activated before Payment Orders existed, found through the paypal_order_id
+    stored on the user, or None. Only used while PAYMENT_LEGACY_ORDER_LOOKUP is on.
+    """
+    users = db.reference("Dashboard Users").order_by_child("paypal_order_id").equal_to(order_id).get()
+    if not users:
+        return None
+    user_id, user = next(iter(users.items()))
+    since = user.get("premium_since", 0)
+    return {"user_id": user_id, "claimed_at": since, "status": "activated", "activated_at": since}
+
+def get_payment_order(order_id):
+    return db.reference(f"Payment Orders/{order_id}").get()
+
+def claim_payment_order(order_id, user_id):
+    """
+    Atomically records user_id as the owner of a PayPal order unless another user already claimed it.
+    Returns the stored claim, which belongs to someone else if the order was already used, including
+    orders activated before Payment Orders existed.
+    """
+    legacy = []
+
+    def claim(current):
+        if current:
+            return current
+        # Looked up at most once, however often the transaction retries
+        if not legacy:
+            legacy.append(legacy_order_claim(order_id) if PAYMENT_LEGACY_ORDER_LOOKUP else None)
+        return legacy[0] or {"user_id": user_id, "claimed_at": int(time()), "status": "claimed"}
+
+    return db.reference(f"Payment Orders/{order_id}").transaction(claim)
+
+def grant_premium_for_order(order_id, user_id, payment_details=None):
+    """
+    Grants premium and marks the order's claim as activated in one multi-path write.
+    """
+    now = int(time())
+    db.reference().update({
+        f"Dashboard Users/{user_id}/premium": True,
+        f"Dashboard Users/{user_id}/premium_since": now,
+        f"Dashboard Users/{user_id}/paypal_order_id": order_id,
+        f"Dashboard Users/{user_id}/payment_details": payment_details,
+        f"Payment Orders/{order_id}/status": "activated",
+        f"Payment Orders/{order_id}/activated_at": now,
+    })
+
+def backfill_payment_orders():
+    """
+    One-off: creates claim nodes for orders activated before Payment Orders existed,
+    so they can't be replayed by another account. Returns the number of claims written.
+    """
+    users = db.reference("Dashboard Users").order_by_child("paypal_order_id").start_at("").get() or {}
+    claims = db.reference("Payment Orders").get() or {}
+    updates = {}
+    for user_id, user in users.items():
+        order_id = user.get("paypal_order_id")
+        if order_id and order_id not in claims:
+            since = user.get("premium_since", 0)
+            updates[order_id] = {"user_id": user_id, "claimed_at": since, "status": "activated", "activated_at": since}
+    if updates:
+        db.reference("Payment Orders").update(updates)
+    return len(updates)
\ No newline at end of file
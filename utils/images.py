@@ -0,0 +1,217 @@
+import hashlib
+import io
+import os
+import re
+import threading
+from collections import OrderedDict
+from time import monotonic, time
+
+from PIL import Image, ImageSequence
+
+from utils.metrics import inc, record_cache
+
+IMAGE_CACHE_DIR = os.environ.get("IMAGE_CACHE_DIR", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "cache", "images"))
+IMAGE_CACHE_MAX_BYTES = int(os.environ.get("IMAGE_CACHE_MAX_BYTES", 512 * 1024 * 1024))
+# Every worker shares the directory, so each one recounts it this often to see the others' writes
+IMAGE_CACHE_RESCAN_INTERVAL = float(os.environ.get("IMAGE_CACHE_RESCAN_INTERVAL", 60))
+# Eviction frees space down to this fraction of IMAGE_CACHE_MAX_BYTES
+IMAGE_CACHE_EVICT_TO = float(os.environ.get("IMAGE_CACHE_EVICT_TO", 0.9))
+WEBP_QUALITY = int(os.environ.get("IMAGE_WEBP_QUALITY", 80))
+
+DISCORD_CDN = "https://cdn.discordapp.com"
+IMAGE_KINDS = ("avatars", "icons", "banners")
+# Discord only serves powers of two; requests are rounded up to the next one
+IMAGE_SIZES = (16, 32, 64, 128, 256, 512, 1024)
+IMAGE_HASH_RE = re.compile(r"^(a_)?[0-9a-f]{32}$")
+
+
+def snap_size(size):
+    return next((s for s in IMAGE_SIZES if s >= size), IMAGE_SIZES[-1])
+
+
+def discord_image_url(kind, entity_id, image_hash, size=128):
+    """
+    Proxy URL for a Discord avatar, icon or banner. The hash is part of the path, so a changed image
+    gets a new URL and the old one can be cached forever.
+    """
+    if not IMAGE_HASH_RE.match(image_hash) or not str(entity_id).isdigit():
+        return source_url(kind, entity_id, image_hash, snap_size(size))
+    return f"/img/{kind}/{entity_id}/{image_hash}.webp?size={snap_size(size)}"
+
+
+def source_url(kind, entity_id, image_hash, size):
+    ext = "gif" if image_hash.startswith("a_") else "png"
+    return f"{DISCORD_CDN}/{kind}/{entity_id}/{image_hash}.{ext}?size={size}"
+
+
+def to_webp(data, size):
+    """
+    Re-encodes an image as WebP no larger than size x size, keeping animation frames.
+    """
+    with Image.open(io.BytesIO(data)) as image:
+        out = io.BytesIO()
+        if getattr(image, "is_animated", False):
+            frames = []
+            durations = []
+            for frame in ImageSequence.Iterator(image):
+                frame = frame.convert("RGBA")
+                frame.thumbnail((size, size))
+                frames.append(frame)
+                durations.append(frame.info.get("duration", image.info.get("duration", 100)))
+            frames[0].save(out, "WEBP", save_all=True, append_images=frames[1:], duration=durations, loop=image.info.get("loop", 0), quality=WEBP_QUALITY)
+        else:
+            image = image.convert("RGBA" if image.mode in ("RGBA", "LA", "P") else "RGB")
+            image.thumbnail((size, size))
+            image.save(out, "WEBP", quality=WEBP_QUALITY, method=4)
+        return out.getvalue()
+
+
+class ImageCache:
+    """
+    Content-addressed disk cache: encoded images live under blobs/ named by their SHA-256, and index/
+    maps each (kind, id, hash, size) variant to its blob. Blobs are evicted least recently used once the
+    total passes IMAGE_CACHE_MAX_BYTES; a variant whose blob was evicted is simply fetched again.
+    Worker processes share the directory: a hit is whatever is on disk, and each process recounts the
+    directory every IMAGE_CACHE_RESCAN_INTERVAL seconds to see the others' writes and evictions.
+    """
+    def __init__(self, root, max_bytes):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._blobs = OrderedDict()
+        self._total = 0
+        self._scanned_at = None
+        self._fetch_locks = {}
+
+    def _scan(self):
+        """
+        Walks blobs/ for the LRU order (file modification times, which hits refresh) and the total
+        size, and deletes index entries whose blob is gone. Runs without the lock held.
+        """
+        started = time()
+        blobs = []
+        for dirpath, _, filenames in os.walk(os.path.join(self.root, "blobs")):
+            for name in filenames:
+                if name.endswith(".tmp"):
+                    continue
+                try:
+                    stat = os.stat(os.path.join(dirpath, name))
+                except FileNotFoundError:
+                    continue
+                blobs.append((stat.st_mtime, name, stat.st_size))
+        blobs.sort()
+        present = {name for _, name, _ in blobs}
+        for dirpath, _, filenames in os.walk(os.path.join(self.root, "index")):
+            for name in filenames:
+                path = os.path.join(dirpath, name)
+                try:
+                    # Entries written during the walk may point at blobs it didn't see
+                    if name.endswith(".tmp") or os.stat(path).st_mtime >= started:
+                        continue
+                    with open(path) as f:
+                        digest = f.read().strip()
+                    if digest not in present:
+                        os.remove(path)
+                except FileNotFoundError:
+                    continue
+        return OrderedDict((name, size) for _, name, size in blobs)
+
+    def _refresh(self):
+        with self._lock:
+            if self._scanned_at is not None and monotonic() - self._scanned_at < IMAGE_CACHE_RESCAN_INTERVAL:
+                return
+            # Claimed up front so concurrent puts don't all walk the directory
+            self._scanned_at = monotonic()
+        blobs = self._scan()
+        with self._lock:
+            self._blobs = blobs
+            self._total = sum(blobs.values())
+
+    def blob_path(self, digest):
+        return os.path.join(self.root, "blobs", digest[:2], digest)
+
+    def _index_path(self, key):
+        return os.path.join(self.root, "index", hashlib.sha1(key.encode()).hexdigest())
+
+    def open(self, key):
+        """
+        Returns (digest, open blob file) for key, or None. The file is opened here so a blob evicted
+        by another process afterwards can still be sent; one already gone counts as a miss.
+        """
+        digest = blob = None
+        try:
+            with open(self._index_path(key)) as f:
+                digest = f.read().strip()
+            path = self.blob_path(digest)
+            blob = open(path, "rb")
+            os.utime(path)
+        except OSError:
+            if blob is not None:
+                blob.close()
+                blob = None
+            if digest is not None:
+                with self._lock:
+                    self._total -= self._blobs.pop(digest, 0)
+        record_cache("image_proxy", blob is not None)
+        if blob is None:
+            return None
+        with self._lock:
+            if digest not in self._blobs:
+                # Written by another process since the last scan
+                self._blobs[digest] = os.fstat(blob.fileno()).st_size
+                self._total += self._blobs[digest]
+            self._blobs.move_to_end(digest)
+        return digest, blob
+
+    def put(self, key, data):
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.blob_path(digest)
+        self._refresh()
+        with self._lock:
+            if digest not in self._blobs:
+                _write_atomic(path, data)
+                self._blobs[digest] = len(data)
+                self._total += len(data)
+            self._blobs.move_to_end(digest)
+            _write_atomic(self._index_path(key), digest.encode())
+            self._evict()
+        return digest
+
+    def _evict(self):
+        if self._total <= self.max_bytes:
+            return
+        # Evicting below the limit leaves room for the next writes, so a full cache doesn't evict on every put
+        target = self.max_bytes * IMAGE_CACHE_EVICT_TO
+        while self._total > target and len(self._blobs) > 1:
+            digest, size = self._blobs.popitem(last=False)
+            self._total -= size
+            try:
+                os.remove(self.blob_path(digest))
+            except FileNotFoundError:
+                pass
+            inc("servercv_image_cache_evictions_total")
+
+    def fetch_lock(self, key):
+        """
+        One lock per variant, so concurrent misses for the same image fetch it once.
+        """
+        with self._lock:
+            lock = self._fetch_locks.get(key)
+            if lock is None:
+                lock = self._fetch_locks[key] = threading.Lock()
+            return lock
+
+    def release_fetch_lock(self, key):
+        with self._lock:
+            self._fetch_locks.pop(key, None)
+
+
+def _write_atomic(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{threading.get_ident()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+image_cache = ImageCache(IMAGE_CACHE_DIR, IMAGE_CACHE_MAX_BYTES)
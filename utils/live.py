@@ -0,0 +1,183 @@
+import logging
+import os
+import queue
+import threading
+from collections import Counter
+
+from utils.firebase import listen_server_experiences, make_server_experience_record
+from utils.metrics import inc, set_gauge
+
+SUBSCRIBER_QUEUE_SIZE = int(os.environ.get("LIVE_QUEUE_SIZE", 100))
+# Every open stream holds a worker thread, so they are capped well below the worker's thread count
+LIVE_MAX_STREAMS = int(os.environ.get("LIVE_MAX_STREAMS", 16))
+LIVE_MAX_STREAMS_PER_USER = int(os.environ.get("LIVE_MAX_STREAMS_PER_USER", 2))
+
+logger = logging.getLogger(__name__)
+
+_feeds = {}
+_lock = threading.Lock()
+_streams = Counter()
+
+
+class LiveUnavailable(Exception):
+    """
+    No stream can be opened right now (stream limit reached, or the listener couldn't start);
+    the page polls instead.
+    """
+    def __init__(self, reason):
+        super().__init__(reason)
+        self.reason = reason
+
+
+def _set_path(root, keys, value):
+    node = root
+    for key in keys[:-1]:
+        child = node.get(key)
+        if not isinstance(child, dict):
+            if value is None:
+                return
+            child = node[key] = {}
+        node = child
+    if value is None:
+        node.pop(keys[-1], None)
+    else:
+        node[keys[-1]] = value
+
+
+class ServerFeed:
+    """
+    One Firebase listener on a server's experiences, fanned out to every subscribed browser.
+    Subscribers receive ("upsert", ExperienceRecord), ("remove", exp_id), ("resync", None) when they fell behind
+    or a change couldn't be applied, and ("close", None) when the feed is gone and they should poll instead.
+    """
+    def __init__(self, server_id):
+        self.server_id = server_id
+        self.snapshot = {}
+        self.subscribers = set()
+        self.loaded = False
+        self.registration = None
+
+    def start(self):
+        self.registration = listen_server_experiences(self.server_id, self._on_event)
+
+    def stop(self):
+        if self.registration is not None:
+            # close() joins the listener thread, which may be blocked on a read
+            threading.Thread(target=self.registration.close, daemon=True).start()
+
+    def _on_event(self, event):
+        # firebase_admin's listener thread dies silently on the first exception a callback raises
+        try:
+            self._apply(event)
+        except Exception:
+            logger.exception("Could not apply live update for server %s", self.server_id)
+            inc("servercv_live_errors_total")
+            # Subscribers may have missed the change, so they reload the whole view
+            self.publish(("resync", None))
+
+    def _apply(self, event):
+        if event.event_type not in ("put", "patch"):
+            return
+        keys = [k for k in event.path.strip("/").split("/") if k]
+
+        if not keys and event.event_type == "put":
+            previous, self.snapshot = self.snapshot, event.data or {}
+            changed = set(previous) | set(self.snapshot)
+            if not self.loaded:
+                # Initial snapshot: subscribers already loaded the same state from /api/guild/<id>
+                self.loaded = True
+                return
+            changed = {k for k in changed if previous.get(k) != self.snapshot.get(k)}
+        elif event.event_type == "put":
+            _set_path(self.snapshot, keys, event.data)
+            # History entries live under the experience but don't change what the view shows
+            changed = set() if len(keys) > 1 and keys[1] == "history" else {keys[0]}
+        else:
+            changed = set()
+            for child, value in (event.data or {}).items():
+                child_keys = keys + [k for k in child.split("/") if k]
+                _set_path(self.snapshot, child_keys, value)
+                if not (len(child_keys) > 1 and child_keys[1] == "history"):
+                    changed.add(child_keys[0])
+
+        for exp_id in changed:
+            exp = self.snapshot.get(exp_id)
+            if isinstance(exp, dict) and exp.get("server_id") == self.server_id:
+                self.publish(("upsert", make_server_experience_record(exp_id, dict(exp))))
+            else:
+                self.publish(("remove", exp_id))
+
+    def publish(self, message):
+        with _lock:
+            subscribers = list(self.subscribers)
+        for q in subscribers:
+            try:
+                q.put_nowait(message)
+            except queue.Full:
+                # A stalled browser must not hold up the others; it reloads once it catches up
+                with q.mutex:
+                    q.queue.clear()
+                q.put_nowait(("resync", None))
+        inc("servercv_live_events_total", len(subscribers))
+
+
+def _release(user_id):
+    # Called with _lock held
+    _streams[user_id] -= 1
+    if _streams[user_id] <= 0:
+        del _streams[user_id]
+    set_gauge("servercv_live_streams_open", sum(_streams.values()))
+
+
+def subscribe(server_id, user_id):
+    """
+    Opens one stream of server_id's changes for user_id. Raises LiveUnavailable when the process or
+    the user is at the stream limit, or the server's listener can't be started.
+    """
+    with _lock:
+        if sum(_streams.values()) >= LIVE_MAX_STREAMS:
+            reason = "process_limit"
+        elif _streams[user_id] >= LIVE_MAX_STREAMS_PER_USER:
+            reason = "user_limit"
+        else:
+            reason = None
+        if reason:
+            inc("servercv_live_streams_rejected_total", reason=reason)
+            raise LiveUnavailable(reason)
+        _streams[user_id] += 1
+        set_gauge("servercv_live_streams_open", sum(_streams.values()))
+        feed = _feeds.get(server_id)
+        is_new = feed is None
+        if is_new:
+            feed = _feeds[server_id] = ServerFeed(server_id)
+        q = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        feed.subscribers.add(q)
+    if is_new:
+        try:
+            feed.start()
+        except Exception as e:
+            logger.warning("Could not start live feed for server %s: %s", server_id, e)
+            with _lock:
+                if _feeds.get(server_id) is feed:
+                    del _feeds[server_id]
+                feed.subscribers.discard(q)
+                _release(user_id)
+            # Streams that attached to this feed meanwhile would otherwise wait on it forever
+            feed.publish(("close", None))
+            inc("servercv_live_streams_rejected_total", reason="listener")
+            raise LiveUnavailable("listener") from e
+    return q
+
+
+def unsubscribe(server_id, q, user_id):
+    with _lock:
+        _release(user_id)
+        feed = _feeds.get(server_id)
+        if feed is None:
+            return
+        feed.subscribers.discard(q)
+        if feed.subscribers:
+            return
+        del _feeds[server_id]
+    feed.stop()
+
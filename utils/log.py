@@ -0,0 +1,140 @@
+import atexit
+import copy
+import json
+import logging
+import os
+import queue
+import random
+import re
+import sys
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+from flask import request
+
+from utils.metrics import inc
+
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
+LOG_QUEUE_SIZE = int(os.environ.get("LOG_QUEUE_SIZE", 10000))
+# Comma-separated event=rate pairs, e.g. "request_calls=0.1". Warnings and errors are never sampled.
+LOG_SAMPLE_RATES = {
+    event.strip(): float(rate)
+    for event, rate in (pair.split("=", 1) for pair in os.environ.get("LOG_SAMPLE_RATES", "request_calls=0.1").split(",") if "=" in pair)
+}
+
+_request_id = ContextVar("servercv_request_id", default=None)
+_VALID_REQUEST_ID = re.compile(r"^[A-Za-z0-9._-]{1,64}$")
+_RESERVED_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "request_id", "event"}
+_listener = None
+
+
+def get_request_id():
+    return _request_id.get()
+
+
+class RequestContextFilter(logging.Filter):
+    """
+    Stamps records with the current request ID and drops sampled-out events.
+    Runs on the calling thread, before the record is queued.
+    """
+    def filter(self, record):
+        record.request_id = _request_id.get()
+        event = getattr(record, "event", None)
+        rate = LOG_SAMPLE_RATES.get(event, 1.0) if event else 1.0
+        if rate < 1.0 and record.levelno < logging.WARNING and random.random() >= rate:
+            inc("servercv_log_records_sampled_out_total", event=event)
+            return False
+        return True
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    QueueHandler that drops records instead of blocking or raising when the writer falls behind.
+    """
+    def prepare(self, record):
+        # Resolve the message and traceback now, but leave formatting to the writer thread
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            inc("servercv_log_records_dropped_total")
+
+
+class JSONFormatter(logging.Formatter):
+    """
+    One JSON object per line. Extra fields passed with extra={...} are included as top-level keys.
+    """
+    def format(self, record):
+        payload = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key in ("event", "request_id"):
+            value = getattr(record, key, None)
+            if value is not None:
+                payload[key] = value
+        for key, value in vars(record).items():
+            if key not in _RESERVED_ATTRS and not key.startswith("_"):
+                payload[key] = value
+        if record.exc_info:
+            payload["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            payload["exc"] = record.exc_text
+        return json.dumps(payload, default=str)
+
+
+def configure_logging():
+    """
+    Routes the root logger through a bounded queue to a background thread that writes JSON lines to stdout,
+    so request threads never wait on the stream. Safe to call more than once.
+    """
+    global _listener
+    if _listener is not None:
+        return
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(JSONFormatter())
+
+    queue_handler = NonBlockingQueueHandler(queue.Queue(LOG_QUEUE_SIZE))
+    queue_handler.addFilter(RequestContextFilter())
+
+    root = logging.getLogger()
+    root.handlers = [queue_handler]
+    root.setLevel(LOG_LEVEL)
+
+    _listener = QueueListener(queue_handler.queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+
+
+def init_request_ids(app):
+    """
+    Registers request hooks that give every request an ID (an incoming X-Request-ID if valid, otherwise a new one),
+    attach it to log records and echo it in the X-Request-ID response header.
+    """
+    @app.before_request
+    def assign_request_id():
+        incoming = request.headers.get("X-Request-ID", "")
+        _request_id.set(incoming if _VALID_REQUEST_ID.match(incoming) else uuid.uuid4().hex)
+
+    @app.after_request
+    def return_request_id(response):
+        request_id = _request_id.get()
+        if request_id:
+            response.headers["X-Request-ID"] = request_id
+        return response
+
+    @app.teardown_request
+    def clear_request_id(exc):
+        _request_id.set(None)
@@ -0,0 +1,228 @@
+import os
+import re
+import threading
+from functools import wraps
+from time import perf_counter
+
+from flask import g, request
+
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN")
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+METRIC_HELP = {
+    "servercv_request_duration_seconds": ("histogram", "Flask request latency by route."),
+    "servercv_upstream_requests_total": ("counter", "Outbound calls to Discord, Firebase and PayPal."),
+    "servercv_upstream_duration_seconds": ("histogram", "Outbound call latency by upstream service."),
+    "servercv_cache_requests_total": ("counter", "Cache lookups by cache name and result."),
+    "servercv_live_events_total": ("counter", "Experience changes delivered to live server view subscribers."),
+    "servercv_live_streams_open": ("gauge", "Live server view streams currently open in this process."),
+    "servercv_live_streams_rejected_total": ("counter", "Live server view streams refused, by reason; those pages poll instead."),
+    "servercv_live_errors_total": ("counter", "Live feed changes that failed to apply; subscribers were told to reload."),
+    "servercv_circuit_breaker_transitions_total": ("counter", "Circuit breaker state changes by upstream service."),
+    "servercv_circuit_breaker_rejections_total": ("counter", "Upstream calls refused because the service's breaker was open."),
+    "servercv_bulkhead_in_flight": ("gauge", "Requests currently executing per route class."),
+    "servercv_bulkhead_queued": ("gauge", "Requests waiting for a slot per route class."),
+    "servercv_bulkhead_limit": ("gauge", "Configured concurrency limit per route class."),
+    "servercv_bulkhead_rejections_total": ("counter", "Requests rejected with 503 because their route class was saturated."),
+    "servercv_payment_events_total": ("counter", "PayPal webhook events by processing outcome."),
+    "servercv_log_records_dropped_total": ("counter", "Log records dropped because the log queue was full."),
+    "servercv_log_records_sampled_out_total": ("counter", "Log records skipped by event sampling."),
+    "servercv_search_index_documents": ("gauge", "Approved experiences in the search index."),
+    "servercv_search_index_terms": ("gauge", "Distinct terms in the search index."),
+    "servercv_search_index_rebuilds_total": ("counter", "Full search index rebuilds from a change stream snapshot."),
+    "servercv_search_index_errors_total": ("counter", "Change stream events the search index failed to apply."),
+    "servercv_search_query_seconds": ("histogram", "Search index lookup time, excluding user name enrichment."),
+    "servercv_snapshot_requests_total": ("counter", "Crawler requests for public profiles by snapshot hit or miss."),
+    "servercv_image_cache_evictions_total": ("counter", "Images evicted from the image proxy's disk cache."),
+    "servercv_bulkhead_wait_seconds": ("histogram", "Time requests spent queued for a route class slot."),
+    "servercv_warmup_keys_total": ("counter", "Hot keys preloaded at startup by kind and outcome."),
+    "servercv_warmup_seconds": ("gauge", "Duration of the last startup cache warm-up per process."),
+}
+
+_lock = threading.Lock()
+_counters = {}
+_gauges = {}
+_histograms = {}
+_upstream_listeners = []
+
+_ID_SEGMENT = re.compile(r"^(?=.*\d)[A-Za-z0-9_-]{8,}$")
+
+
+def _label_key(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def inc(name, amount=1, **labels):
+    key = (name, _label_key(labels))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + amount
+
+
+def set_gauge(name, value, **labels):
+    key = (name, _label_key(labels))
+    with _lock:
+        _gauges[key] = value
+
+
+def observe(name, value, buckets=LATENCY_BUCKETS, **labels):
+    key = (name, _label_key(labels))
+    with _lock:
+        hist = _histograms.get(key)
+        if hist is None:
+            hist = _histograms[key] = {"buckets": buckets, "counts": [0] * len(buckets), "sum": 0.0, "count": 0}
+        for i, bound in enumerate(hist["buckets"]):
+            if value <= bound:
+                hist["counts"][i] += 1
+                break
+        hist["sum"] += value
+        hist["count"] += 1
+
+
+def normalize_path(path):
+    """
+    Collapses IDs in an upstream URL path so metric labels stay low-cardinality,
+    e.g. /guilds/1234567890/channels -> /guilds/{id}/channels
+    """
+    segments = path.split("?")[0].split("/")
+    return "/".join("{id}" if _ID_SEGMENT.match(seg) else seg for seg in segments)
+
+
+def add_upstream_listener(listener):
+    """
+    Registers listener(service, operation, target, seconds, error), called after every recorded upstream call.
+    """
+    _upstream_listeners.append(listener)
+
+
+def record_upstream(service, operation, seconds, error=False, target=None):
+    inc("servercv_upstream_requests_total", service=service, operation=operation, outcome="error" if error else "ok")
+    observe("servercv_upstream_duration_seconds", seconds, service=service, operation=operation)
+    for listener in _upstream_listeners:
+        listener(service, operation, target, seconds, error)
+
+
+def record_cache(cache, hit):
+    inc("servercv_cache_requests_total", cache=cache, result="hit" if hit else "miss")
+
+
+def timed_upstream(service, operation, describe=None):
+    """
+    Decorator that records the wrapped call as an upstream call.
+    describe(*args, **kwargs), if given, returns the call target (path or query) passed to listeners.
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            start = perf_counter()
+            error = False
+            try:
+                return func(*args, **kwargs)
+            except Exception:
+                error = True
+                raise
+            finally:
+                target = describe(*args, **kwargs) if describe else None
+                record_upstream(service, operation, perf_counter() - start, error, target)
+        return wrapper
+    return decorator
+
+
+def describe_firebase_call(ref, *args, **kwargs):
+    path = getattr(ref, "path", None)
+    if path is not None:
+        return path
+    # firebase_admin.db.Query keeps its path and query parameters privately
+    params = getattr(ref, "_params", {}) or {}
+    query = "&".join(f"{k}={v}" for k, v in sorted(params.items()))
+    return f"{getattr(ref, '_pathurl', '?')}?{query}"
+
+
+def instrument_firebase(db):
+    """
+    Wraps Reference/Query methods of firebase_admin.db so every Realtime Database call is timed.
+    """
+    if getattr(db.Reference, "_servercv_instrumented", False):
+        return
+    for cls, methods in ((db.Reference, ("get", "set", "update", "push", "delete", "transaction")), (db.Query, ("get",))):
+        for method in methods:
+            operation = method if cls is db.Reference else "query"
+            setattr(cls, method, timed_upstream("firebase", operation, describe_firebase_call)(getattr(cls, method)))
+    db.Reference._servercv_instrumented = True
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    parts = []
+    for k, v in labels:
+        v = v.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+        parts.append(f'{k}="{v}"')
+    return "{" + ",".join(parts) + "}"
+
+
+def _format_value(value):
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def render_prometheus():
+    with _lock:
+        counters = dict(_counters)
+        gauges = dict(_gauges)
+        histograms = {k: {"buckets": v["buckets"], "counts": list(v["counts"]), "sum": v["sum"], "count": v["count"]} for k, v in _histograms.items()}
+
+    lines = []
+    described = set()
+
+    def describe(name):
+        if name in described:
+            return
+        described.add(name)
+        metric_type, help_text = METRIC_HELP.get(name, ("untyped", name))
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {metric_type}")
+
+    for (name, labels), value in sorted(counters.items()):
+        describe(name)
+        lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+
+    for (name, labels), value in sorted(gauges.items()):
+        describe(name)
+        lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+
+    for (name, labels), hist in sorted(histograms.items()):
+        describe(name)
+        cumulative = 0
+        for bound, count in zip(hist["buckets"], hist["counts"]):
+            cumulative += count
+            lines.append(f"{name}_bucket{_format_labels(labels + (('le', _format_value(float(bound))),))} {cumulative}")
+        lines.append(f"{name}_bucket{_format_labels(labels + (('le', '+Inf'),))} {hist['count']}")
+        lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(hist['sum'])}")
+        lines.append(f"{name}_count{_format_labels(labels)} {hist['count']}")
+
+    return "\n".join(lines) + "\n"
+
+
+def is_metrics_request_authorized():
+    if not METRICS_TOKEN:
+        return False
+    return request.headers.get("Authorization") == f"Bearer {METRICS_TOKEN}"
+
+
+def init_metrics(app):
+    """
+    Registers request hooks that record per-route latency histograms.
+    """
+    @app.before_request
+    def start_request_timer():
+        g.metrics_start = perf_counter()
+
+    @app.after_request
+    def record_request_latency(response):
+        start = g.pop("metrics_start", None)
+        if start is not None:
+            route = request.url_rule.rule if request.url_rule else "unmatched"
+            observe("servercv_request_duration_seconds", perf_counter() - start, route=route, method=request.method, status=response.status_code)
+        return response
@@ -0,0 +1,164 @@
+import logging
+import os
+import queue
+import threading
+from time import monotonic, time
+
+from firebase_admin import db
+from config.settings import PREMIUM_ONE_TIME_PRICE
+
+from utils.firebase import claim_payment_order, grant_premium_for_order, get_user_data
+from utils.entitlements import invalidate_entitlements
+from utils.metrics import inc
+
+WEBHOOK_QUEUE_SIZE = int(os.environ.get("PAYPAL_WEBHOOK_QUEUE_SIZE", 1000))
+PAYMENT_WORKER_ENABLED = os.environ.get("PAYMENT_WORKER_ENABLED", "1") == "1"
+HANDLED_EVENTS = ("PAYMENT.CAPTURE.COMPLETED",)
+# Events still marked queued in Firebase (dropped on a full queue, or waiting to retry) are swept up this often
+PAYMENT_SWEEP_INTERVAL = float(os.environ.get("PAYMENT_SWEEP_INTERVAL", 60))
+# Failed events are retried after PAYMENT_RETRY_BASE, 2x, 4x... seconds, up to this many attempts in all
+PAYMENT_EVENT_MAX_ATTEMPTS = int(os.environ.get("PAYMENT_EVENT_MAX_ATTEMPTS", 5))
+PAYMENT_RETRY_BASE = float(os.environ.get("PAYMENT_RETRY_BASE", 30))
+
+logger = logging.getLogger(__name__)
+
+_queue = queue.Queue(maxsize=WEBHOOK_QUEUE_SIZE)
+# Event IDs waiting in _queue or being processed, so the startup requeue can't add one twice
+_queued = set()
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def record_webhook_event(event):
+    """
+    Stores a verified webhook event under Payment Events/<event id> and queues it for processing.
+    Returns False for redeliveries of an event that was already recorded.
+    """
+    event_id = event["id"]
+    created = False
+
+    def store(current):
+        nonlocal created
+        created = not current
+        return current or {"event_type": event.get("event_type"), "resource": event.get("resource"), "received_at": int(time()), "status": "queued"}
+
+    stored = db.reference(f"Payment Events/{event_id}").transaction(store)
+    if not created:
+        return False
+    start_worker()
+    enqueue(event_id, stored)
+    return True
+
+
+def enqueue(event_id, stored):
+    """
+    Queues an event unless it is already queued. Returns False if the queue is full.
+    """
+    with _worker_lock:
+        if event_id in _queued:
+            return True
+        try:
+            _queue.put_nowait((event_id, stored))
+        except queue.Full:
+            # Still marked queued in Firebase; the worker's next sweep picks it up
+            inc("servercv_payment_events_total", outcome="dropped")
+            logger.warning("Payment event queue full, deferring %s", event_id)
+            return False
+        _queued.add(event_id)
+    return True
+
+
+def start_worker():
+    """
+    Starts the processing thread, which requeues events stored but never processed at start and
+    every PAYMENT_SWEEP_INTERVAL seconds. Called at app startup, so those don't wait for the next webhook.
+    """
+    global _worker
+    if not PAYMENT_WORKER_ENABLED:
+        return
+    with _worker_lock:
+        if _worker is not None and _worker.is_alive():
+            return
+        _worker = threading.Thread(target=_run, name="paypal-webhooks", daemon=True)
+        _worker.start()
+
+
+def _run():
+    requeue_unprocessed()
+    swept_at = monotonic()
+    while True:
+        timeout = max(0, swept_at + PAYMENT_SWEEP_INTERVAL - monotonic())
+        try:
+            event_id, stored = _queue.get(timeout=timeout)
+        except queue.Empty:
+            requeue_unprocessed()
+            swept_at = monotonic()
+            continue
+        try:
+            outcome = process_event(stored)
+        except Exception:
+            logger.exception("Failed to process payment event %s", event_id)
+            outcome = "failed"
+        update = {"status": outcome, "processed_at": int(time())}
+        attempts = stored.get("attempts", 0) + 1
+        if outcome == "failed" and attempts < PAYMENT_EVENT_MAX_ATTEMPTS:
+            # PayPal won't redeliver an event it got a 2xx for, so a transient error must not lose it
+            outcome = "retry"
+            update = {"status": "queued", "attempts": attempts, "retry_at": int(time() + PAYMENT_RETRY_BASE * 2 ** (attempts - 1))}
+        inc("servercv_payment_events_total", outcome=outcome)
+        try:
+            db.reference(f"Payment Events/{event_id}").update(update)
+        except Exception:
+            logger.exception("Could not record outcome of payment event %s", event_id)
+        finally:
+            with _worker_lock:
+                _queued.discard(event_id)
+        if monotonic() - swept_at >= PAYMENT_SWEEP_INTERVAL:
+            requeue_unprocessed()
+            swept_at = monotonic()
+
+
+def requeue_unprocessed():
+    """
+    Picks up events recorded but never processed, e.g. because the process restarted or the queue was
+    full, and failed events whose retry time has come.
+    """
+    try:
+        pending = db.reference("Payment Events").order_by_child("status").equal_to("queued").get() or {}
+    except Exception:
+        logger.exception("Could not load unprocessed payment events")
+        return
+    now = time()
+    for event_id, stored in pending.items():
+        if stored.get("retry_at", 0) > now:
+            continue
+        if not enqueue(event_id, stored):
+            break
+
+
+def process_event(stored):
+    """
+    Grants premium for a completed capture. Safe to run more than once for the same order.
+    Returns the outcome recorded on the event.
+    """
+    if stored.get("event_type") not in HANDLED_EVENTS:
+        return "ignored"
+
+    capture = stored.get("resource") or {}
+    order_id = ((capture.get("supplementary_data") or {}).get("related_ids") or {}).get("order_id")
+    user_id = capture.get("custom_id")
+    if capture.get("status") != "COMPLETED" or not order_id or not user_id:
+        return "ignored"
+    if float((capture.get("amount") or {}).get("value", 0)) < float(PREMIUM_ONE_TIME_PRICE):
+        return "rejected"
+    if get_user_data(user_id) is None:
+        return "rejected"
+
+    claim = claim_payment_order(order_id, user_id)
+    if claim.get("user_id") != user_id:
+        logger.warning("PayPal order %s captured for %s but already claimed by %s", order_id, user_id, claim.get("user_id"))
+        return "conflict"
+    if claim.get("status") != "activated":
+        grant_premium_for_order(order_id, user_id, {"source": "webhook", "capture_id": capture.get("id"), "amount": capture.get("amount")})
+        invalidate_entitlements(user_id)
+    return "processed"
@@ -0,0 +1,109 @@
+import base64
+import os
+import threading
+import zlib
+from datetime import datetime, timezone
+from time import monotonic
+from urllib.parse import urlsplit
+
+from cryptography import x509
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.asymmetric import padding
+from config.settings import PAYPAL_CLIENT_ID, PAYPAL_CLIENT_SECRET, PAYPAL_API_BASE
+
+from utils.cache import TTLCache
+from utils.metrics import record_cache
+from utils.request import requests_session
+
+PAYPAL_WEBHOOK_ID = os.environ.get("PAYPAL_WEBHOOK_ID")
+
+# Refresh this many seconds before PayPal's expires_in so a token never expires mid-request
+TOKEN_REFRESH_MARGIN = 300
+
+_token_lock = threading.Lock()
+_token = {"value": None, "expires": 0.0}
+# Webhook signing certificates, keyed by the PAYPAL-CERT-URL they were fetched from
+_cert_cache = TTLCache("paypal_cert", 24 * 3600, maxsize=16)
+
+
+def get_access_token(force_refresh=False):
+    """
+    Client-credentials access token, reused until shortly before it expires.
+    """
+    with _token_lock:
+        cached = not force_refresh and _token["value"] and monotonic() < _token["expires"]
+        record_cache("paypal_token", bool(cached))
+        if cached:
+            return _token["value"]
+
+        r = requests_session.post(
+            f"{PAYPAL_API_BASE}/v1/oauth2/token",
+            auth=(PAYPAL_CLIENT_ID, PAYPAL_CLIENT_SECRET),
+            headers={"Accept": "application/json", "Accept-Language": "en_US"},
+            data={"grant_type": "client_credentials"}
+        )
+        r.raise_for_status()
+        payload = r.json()
+        _token["value"] = payload["access_token"]
+        _token["expires"] = monotonic() + max(0, int(payload.get("expires_in", 0)) - TOKEN_REFRESH_MARGIN)
+        return _token["value"]
+
+
+def paypal_get(path):
+    """
+    GET against the PayPal REST API with the cached token. A 401 (token revoked early) refreshes it once.
+    """
+    url = f"{PAYPAL_API_BASE}{path}"
+    r = requests_session.get(url, headers={"Authorization": f"Bearer {get_access_token()}"})
+    if r.status_code == 401:
+        r = requests_session.get(url, headers={"Authorization": f"Bearer {get_access_token(force_refresh=True)}"})
+    r.raise_for_status()
+    return r.json()
+
+
+def get_order(order_id):
+    return paypal_get(f"/v2/checkout/orders/{order_id}")
+
+
+def _load_certificate(cert_url):
+    cached = _cert_cache.get(cert_url)
+    if cached is not None:
+        return cached
+    r = requests_session.get(cert_url)
+    r.raise_for_status()
+    cert = x509.load_pem_x509_certificate(r.content)
+    _cert_cache.set(cert_url, cert)
+    return cert
+
+
+def is_paypal_cert_url(cert_url):
+    parts = urlsplit(cert_url)
+    return parts.scheme == "https" and (parts.hostname or "").endswith(".paypal.com")
+
+
+def verify_webhook_signature(headers, body):
+    """
+    Checks a webhook delivery's SHA256withRSA signature over "<transmission id>|<time>|<webhook id>|<crc32 of body>"
+    against PayPal's signing certificate, fetched once per certificate URL.
+    """
+    transmission_id = headers.get("PAYPAL-TRANSMISSION-ID")
+    transmission_time = headers.get("PAYPAL-TRANSMISSION-TIME")
+    signature = headers.get("PAYPAL-TRANSMISSION-SIG")
+    cert_url = headers.get("PAYPAL-CERT-URL")
+    if not (PAYPAL_WEBHOOK_ID and transmission_id and transmission_time and signature and cert_url):
+        return False
+    if headers.get("PAYPAL-AUTH-ALGO", "SHA256withRSA") != "SHA256withRSA" or not is_paypal_cert_url(cert_url):
+        return False
+
+    cert = _load_certificate(cert_url)
+    now = datetime.now(timezone.utc)
+    if not (cert.not_valid_before_utc <= now <= cert.not_valid_after_utc):
+        return False
+
+    message = f"{transmission_id}|{transmission_time}|{PAYPAL_WEBHOOK_ID}|{zlib.crc32(body)}".encode()
+    try:
+        cert.public_key().verify(base64.b64decode(signature), message, padding.PKCS1v15(), hashes.SHA256())
+    except (InvalidSignature, ValueError):
+        return False
+    return True
@@ -0,0 +1,79 @@
+"""
+Discord permission bits and the role labels ServerCV derives from them.
+Roles are classified with precomputed integer masks instead of decoding permission names.
+"""
+
+PERMISSIONS = {
+    1: "Create Instant Invite",
+    2: "Kick Members",
+    4: "Ban Members",
+    8: "Administrator",
+    16: "Manage Channels",
+    32: "Manage Guild",
+    64: "Add Reactions",
+    128: "View Audit Log",
+    256: "Priority Speaker",
+    512: "Stream",
+    1024: "View Channel",
+    2048: "Send Messages",
+    4096: "Send TTS Messages",
+    8192: "Manage Messages",
+    16384: "Embed Links",
+    32768: "Attach Files",
+    65536: "Read Message History",
+    131072: "Mention Everyone",
+    262144: "Use External Emojis",
+    524288: "View Guild Insights",
+    1048576: "Connect",
+    2097152: "Speak",
+    4194304: "Mute Members",
+    8388608: "Deafen Members",
+    16777216: "Move Members",
+    33554432: "Use VAD",
+    67108864: "Change Nickname",
+    134217728: "Manage Nicknames",
+    268435456: "Manage Roles",
+    536870912: "Manage Webhooks",
+    1073741824: "Manage Emojis and Stickers",
+    2147483648: "Use Application Commands",
+    4294967296: "Request to Speak",
+    8589934592: "Manage Events",
+    17179869184: "Manage Threads",
+    34359738368: "Create Public Threads",
+    68719476736: "Create Private Threads",
+    137438953472: "Use External Stickers",
+    274877906944: "Send Messages in Threads",
+    549755813888: "Use Embedded Activities",
+    1099511627776: "Moderate Members",
+}
+
+MOD_PERMS = ["Manage Channels", "Manage Guild", "Kick Members", "Ban Members", "Manage Messages", "Manage Nicknames", "Manage Roles", "Manage Webhooks"]
+
+PERMISSION_BITS = {name: bit for bit, name in PERMISSIONS.items()}
+ADMINISTRATOR = PERMISSION_BITS["Administrator"]
+# Bits are distinct powers of two, so the sum is the OR of all moderator permissions
+MOD_MASK = sum(PERMISSION_BITS[name] for name in MOD_PERMS)
+
+def classify_permissions(perm_int, owner=False):
+    if owner:
+        return "Server Owner"
+    if perm_int & ADMINISTRATOR:
+        return "Administrator"
+    if perm_int & MOD_MASK:
+        return "Moderator"
+    return "Member"
+
+def classify_guild(guild):
+    """
+    Returns "Server Owner", "Administrator", "Moderator" or "Member" for a partial guild from /users/@me/guilds.
+    """
+    return classify_permissions(int(guild.get("permissions", 0)), guild.get("owner", False))
+
+def classify_guilds(guilds):
+    """
+    Classifies a whole /users/@me/guilds response, returning role labels in the same order.
+    """
+    return [classify_guild(g) for g in guilds]
+
+def has_admin_access(guild):
+    return bool(guild.get("owner")) or bool(int(guild.get("permissions", 0)) & ADMINISTRATOR)
@@ -0,0 +1,108 @@
+import html
+import os
+import sys
+import threading
+from collections import Counter
+from time import perf_counter
+
+from utils.theme import wrap_page
+
+ADMIN_USER_IDS = {uid.strip() for uid in os.environ.get("ADMIN_USER_IDS", "").split(",") if uid.strip()}
+PROFILE_INTERVAL = float(os.environ.get("PROFILE_INTERVAL", 0.005))
+PROFILE_FORMATS = ("collapsed", "html")
+
+
+class StackSampler:
+    """
+    Samples the stack of one thread at a fixed interval from a background thread.
+    Stacks are kept in collapsed form ("outer;inner;leaf" -> samples), as read by flamegraph.pl and speedscope.
+    """
+    def __init__(self, thread_id, interval=PROFILE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.duration = 0.0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="servercv-profiler", daemon=True)
+
+    def start(self):
+        self._started = perf_counter()
+        self._thread.start()
+
+    def stop(self):
+        if self._stop.is_set():
+            return
+        self._stop.set()
+        self._thread.join()
+        self.duration = perf_counter() - self._started
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            self.stacks[";".join(reversed(stack))] += 1
+
+    def collapsed(self):
+        return "\n".join(f"{stack} {count}" for stack, count in self.stacks.most_common()) + "\n"
+
+    def html_report(self, title):
+        total = sum(self.stacks.values()) or 1
+        self_counts = Counter()
+        inclusive_counts = Counter()
+        for stack, count in self.stacks.items():
+            frames = stack.split(";")
+            self_counts[frames[-1]] += count
+            for name in set(frames):
+                inclusive_counts[name] += count
+
+        def rows(counter):
+            out = ""
+            for name, count in counter.most_common(30):
+                out += f'<tr class="border-b border-gray-800"><td class="py-1 pr-4 font-mono text-xs break-all">{html.escape(name)}</td><td class="py-1 text-right">{count}</td><td class="py-1 text-right">{count * 100 / total:.1f}%</td></tr>'
+            return out
+
+        content = f"""
+        <div class="glass p-6 rounded-xl space-y-6">
+            <div>
+                <h1 class="text-2xl font-semibold text-white">Profile: {html.escape(title)}</h1>
+                <p class="text-sm text-gray-400">{sum(self.stacks.values())} samples every {self.interval * 1000:.0f} ms over {self.duration * 1000:.0f} ms</p>
+            </div>
+            <div>
+                <h2 class="text-lg font-semibold text-white mb-2">Self time</h2>
+                <table class="w-full text-sm text-gray-300">{rows(self_counts)}</table>
+            </div>
+            <div>
+                <h2 class="text-lg font-semibold text-white mb-2">Inclusive time</h2>
+                <table class="w-full text-sm text-gray-300">{rows(inclusive_counts)}</table>
+            </div>
+            <div>
+                <h2 class="text-lg font-semibold text-white mb-2">Collapsed stacks</h2>
+                <pre class="text-xs text-gray-400 bg-gray-900/50 p-4 rounded overflow-x-auto">{html.escape(self.collapsed())}</pre>
+            </div>
+        </div>
+        """
+        return wrap_page("Profile", content)
+
+
+def requested_profile_format(request, session):
+    """
+    Returns "collapsed" or "html" if the current request asks to be profiled and the user is an admin.
+    """
+    fmt = request.args.get("_profile") or request.headers.get("X-ServerCV-Profile")
+    if fmt not in PROFILE_FORMATS:
+        return None
+    if session.get("user_id") not in ADMIN_USER_IDS:
+        return None
+    return fmt
+
+
+def start_profiling():
+    sampler = StackSampler(threading.get_ident())
+    sampler.start()
+    return sampler
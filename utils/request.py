@@ -1,12 +1,59 @@
 import requests
 from concurrent.futures import ThreadPoolExecutor
-from config.settings import BOT_TOKEN, API_BASE
+from contextvars import copy_context
+from time import perf_counter
+from urllib.parse import urlsplit
+from config.settings import BOT_TOKEN, API_BASE, PAYPAL_API_BASE
 
 from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
 
-requests_session = requests.Session()
-retry_strategy = Retry(
+from utils.metrics import record_upstream, normalize_path
+from utils.resilience import DeadlineRetry, UpstreamUnavailable, call_timeout, get_breaker, is_deadline_cut
+from utils.permissions import has_admin_access
+
+
+def get_upstream_service(url):
+    if url.startswith(API_BASE):
+        return "discord"
+    if url.startswith(PAYPAL_API_BASE):
+        return "paypal"
+    return urlsplit(url).hostname or "unknown"
+
+
+class InstrumentedSession(requests.Session):
+    """
+    requests.Session that records every outbound call in the metrics registry.
+    Calls go through the upstream's circuit breaker and are timed out within the request's deadline budget.
+    """
+    def request(self, method, url, *args, **kwargs):
+        service = get_upstream_service(url)
+        kwargs["timeout"] = call_timeout(service, kwargs.get("timeout"))
+        breaker = get_breaker(service)
+        if not breaker.allow():
+            raise UpstreamUnavailable(service, "circuit open")
+
+        start = perf_counter()
+        error = cut_short = False
+        try:
+            response = super().request(method, url, *args, **kwargs)
+            error = response.status_code >= 500
+            return response
+        except Exception as e:
+            error = True
+            cut_short = is_deadline_cut(e)
+            raise
+        finally:
+            # A call cut short by the request's deadline says nothing about the upstream either way
+            if not error:
+                breaker.record_success()
+            elif not cut_short:
+                breaker.record_failure()
+            operation = f"{method.upper()} {normalize_path(urlsplit(url).path)}"
+            record_upstream(service, operation, perf_counter() - start, error, f"{method.upper()} {url}")
+
+
+requests_session = InstrumentedSession()
+retry_strategy = DeadlineRetry(
     total=3,
     status_forcelist=[429, 500, 502, 503, 504],
     allowed_methods=["HEAD", "GET", "OPTIONS", "POST", "PATCH"],
@@ -44,7 +91,7 @@ def verify_guild_access(guild_id, discord_token, api_base=API_BASE, bot_token=BO
             if not guild:
                 return False, {"error": "Guild not found or you don't have access to this guild anymore."}, 404
 
-            if require_admin and not (guild.get("owner") or (int(guild.get("permissions", 0)) & 0x8)):
+            if require_admin and not has_admin_access(guild):
                 return False, {"error": "You need administrator permissions to configure this guild."}, 403
             
             return True, guild, None
@@ -70,11 +117,11 @@ def verify_guild_access(guild_id, discord_token, api_base=API_BASE, bot_token=BO
     # Execute verifications concurrently
     if require_bot_in_guild:
         with ThreadPoolExecutor(max_workers=2) as executor:
-            future_guild = executor.submit(fetch_user_guilds)
+            future_guild = executor.submit(copy_context().run, fetch_user_guilds)
             if user_guilds_only:
                 future_bot_verification = executor.submit(lambda: (True, None, None))
             else:
-                future_bot_verification = executor.submit(fetch_bot_guilds)
+                future_bot_verification = executor.submit(copy_context().run, fetch_bot_guilds)
 
             guild_success, guild_data, guild_status = future_guild.result()
             if not guild_success:
@@ -0,0 +1,255 @@
+import logging
+import os
+import threading
+from contextvars import ContextVar
+from functools import wraps
+from time import monotonic
+
+import requests
+from urllib3.exceptions import ConnectTimeoutError, MaxRetryError, ReadTimeoutError, ResponseError
+from urllib3.util.retry import Retry
+
+from utils.metrics import inc
+
+logger = logging.getLogger(__name__)
+
+REQUEST_DEADLINE = float(os.environ.get("REQUEST_DEADLINE", 10))
+BREAKER_FAILURE_THRESHOLD = int(os.environ.get("BREAKER_FAILURE_THRESHOLD", 5))
+BREAKER_RESET_TIMEOUT = float(os.environ.get("BREAKER_RESET_TIMEOUT", 30))
+
+# (connect, read) seconds for a single attempt, before the request deadline is applied
+UPSTREAM_TIMEOUTS = {
+    "discord": (3.05, float(os.environ.get("DISCORD_TIMEOUT", 5))),
+    "paypal": (3.05, float(os.environ.get("PAYPAL_TIMEOUT", 10))),
+    "firebase": (3.05, float(os.environ.get("FIREBASE_TIMEOUT", 5))),
+}
+FIREBASE_TIMEOUT = UPSTREAM_TIMEOUTS["firebase"][1]
+DEFAULT_TIMEOUT = (3.05, 10)
+
+_deadline = ContextVar("servercv_deadline", default=None)
+# Whether the last call_timeout in this context was shortened to fit the request deadline
+_timeout_capped = ContextVar("servercv_timeout_capped", default=False)
+DEADLINE_EXCEEDED = "request deadline exceeded"
+
+
+class UpstreamUnavailable(requests.exceptions.ConnectionError):
+    """
+    Raised instead of calling an upstream whose breaker is open or when the request deadline has passed.
+    Subclasses ConnectionError so existing requests error handling covers it.
+    """
+    def __init__(self, service, reason):
+        super().__init__(f"{service} unavailable: {reason}")
+        self.service = service
+        self.reason = reason
+
+
+class CircuitBreaker:
+    """
+    Opens after failure_threshold consecutive failures and rejects calls for reset_timeout seconds,
+    then lets a single trial call through (half-open) to decide whether to close again.
+    """
+    def __init__(self, service, failure_threshold=BREAKER_FAILURE_THRESHOLD, reset_timeout=BREAKER_RESET_TIMEOUT):
+        self.service = service
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def _transition(self, state):
+        self.state = state
+        inc("servercv_circuit_breaker_transitions_total", service=self.service, state=state)
+
+    def allow(self):
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and monotonic() - self.opened_at >= self.reset_timeout:
+                self._transition("half_open")
+            if self.state == "half_open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+        inc("servercv_circuit_breaker_rejections_total", service=self.service)
+        return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self._trial_in_flight = False
+            if self.state != "closed":
+                self._transition("closed")
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.state == "half_open" or (self.state == "closed" and self.failures >= self.failure_threshold):
+                self.opened_at = monotonic()
+                self._transition("open")
+
+    def retry_after(self):
+        return max(1, int(self.reset_timeout - (monotonic() - self.opened_at)) + 1)
+
+
+breakers = {service: CircuitBreaker(service) for service in UPSTREAM_TIMEOUTS}
+
+
+def get_breaker(service):
+    breaker = breakers.get(service)
+    if breaker is None:
+        breaker = breakers.setdefault(service, CircuitBreaker(service))
+    return breaker
+
+
+def is_available(service):
+    """
+    True unless the service's breaker is open. Does not consume the half-open trial call.
+    """
+    breaker = get_breaker(service)
+    return breaker.state != "open" or monotonic() - breaker.opened_at >= breaker.reset_timeout
+
+
+def remaining():
+    """
+    Seconds left in the current request's deadline budget, or None outside a request.
+    """
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - monotonic()
+
+
+def call_timeout(service, requested=None):
+    """
+    Per-attempt (connect, read) timeout for an upstream call, capped by the remaining request budget.
+    """
+    if requested is None:
+        connect, read = UPSTREAM_TIMEOUTS.get(service, DEFAULT_TIMEOUT)
+    elif isinstance(requested, tuple):
+        connect, read = requested
+    else:
+        connect = read = requested
+    left = remaining()
+    if left is None:
+        _timeout_capped.set(False)
+        return (connect, read)
+    if left <= 0:
+        raise UpstreamUnavailable(service, DEADLINE_EXCEEDED)
+    _timeout_capped.set(left < max(connect, read))
+    return (min(connect, left), min(read, left))
+
+
+def is_deadline_cut(exc):
+    """
+    True if exc only means the call ran out of the request's deadline: its timeout was shortened to
+    fit the deadline and expired, or the deadline had already passed. That says nothing about the
+    upstream's health, so breakers don't count it.
+    """
+    # firebase_admin wraps the requests exception it got
+    exc = getattr(exc, "cause", None) or exc
+    if isinstance(exc, UpstreamUnavailable):
+        return exc.reason == DEADLINE_EXCEEDED
+    # A timeout DeadlineRetry gave up on reaches requests as a ConnectionError around MaxRetryError
+    if exc.args and isinstance(exc.args[0], MaxRetryError):
+        exc = exc.args[0].reason
+    return isinstance(exc, (requests.exceptions.Timeout, ConnectTimeoutError, ReadTimeoutError)) and _timeout_capped.get()
+
+
+def guard_upstream(service, is_failure=lambda exc: True):
+    """
+    Decorator that checks the service's breaker and the request deadline before the call
+    and reports the outcome to the breaker afterwards.
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            left = remaining()
+            if left is not None and left <= 0:
+                raise UpstreamUnavailable(service, DEADLINE_EXCEEDED)
+            breaker = get_breaker(service)
+            if not breaker.allow():
+                raise UpstreamUnavailable(service, "circuit open")
+            try:
+                result = func(*args, **kwargs)
+            except Exception as e:
+                if is_deadline_cut(e):
+                    raise
+                if is_failure(e):
+                    breaker.record_failure()
+                else:
+                    breaker.record_success()
+                raise
+            breaker.record_success()
+            return result
+        return wrapper
+    return decorator
+
+
+class DeadlineRetry(Retry):
+    """
+    urllib3 Retry that gives up instead of backing off past the current request's deadline.
+    """
+    def increment(self, method=None, url=None, response=None, error=None, _pool=None, _stacktrace=None):
+        new_retry = super().increment(method, url, response, error, _pool, _stacktrace)
+        left = remaining()
+        if left is not None:
+            wait = max(new_retry.get_backoff_time(), (response is not None and new_retry.get_retry_after(response)) or 0)
+            if wait >= left:
+                raise MaxRetryError(_pool, url, error or ResponseError(DEADLINE_EXCEEDED))
+        return new_retry
+
+
+def protect_firebase(db):
+    """
+    Puts Realtime Database calls behind the firebase breaker and the request deadline.
+    Each HTTP call is timed out at the httpTimeout given to initialize_app or at what is left of the
+    request's deadline, whichever is sooner, and isn't retried past the deadline. firebase_admin has no
+    public hook for per-call timeouts, so this wraps its internal client; if that client changes,
+    calls keep the fixed httpTimeout.
+    """
+    if getattr(db.Reference, "_servercv_protected", False):
+        return
+    for cls, methods in ((db.Reference, ("get", "set", "update", "push", "delete", "transaction")), (db.Query, ("get",))):
+        for method in methods:
+            setattr(cls, method, guard_upstream("firebase", is_firebase_failure)(getattr(cls, method)))
+
+    client_cls = getattr(db, "_Client", None)
+    if client_cls is not None and hasattr(client_cls, "request"):
+        request = client_cls.request
+
+        @wraps(request)
+        def request_within_deadline(self, method, url, **kwargs):
+            session = self.session
+            if not getattr(session, "_servercv_deadline_retry", False):
+                # Same policy as the SDK's default, but no retry once the deadline has passed
+                retry = DeadlineRetry(connect=1, read=1, status=4, status_forcelist=[500, 503], raise_on_status=False, backoff_factor=0.5, allowed_methods=None)
+                session.mount("http://", requests.adapters.HTTPAdapter(max_retries=retry))
+                session.mount("https://", requests.adapters.HTTPAdapter(max_retries=retry))
+                session._servercv_deadline_retry = True
+            if "timeout" not in kwargs:
+                kwargs["timeout"] = call_timeout("firebase")
+            return request(self, method, url, **kwargs)
+
+        client_cls.request = request_within_deadline
+    else:
+        logger.warning("firebase_admin client not found; Firebase calls use the fixed httpTimeout")
+    db.Reference._servercv_protected = True
+
+
+def is_firebase_failure(exc):
+    # Permission and not-found errors mean the database answered; only outages should trip the breaker
+    from firebase_admin import exceptions
+    return not isinstance(exc, (exceptions.NotFoundError, exceptions.PermissionDeniedError, exceptions.InvalidArgumentError, UpstreamUnavailable))
+
+
+def init_deadlines(app):
+    """
+    Registers request hooks that give every request a REQUEST_DEADLINE budget shared by its upstream calls.
+    """
+    @app.before_request
+    def start_deadline():
+        _deadline.set(monotonic() + REQUEST_DEADLINE)
+
+    @app.teardown_request
+    def clear_deadline(exc):
+        _deadline.set(None)
@@ -0,0 +1,317 @@
+import logging
+import os
+import re
+import threading
+from bisect import bisect_left, insort
+from time import perf_counter, sleep
+
+import requests
+
+from utils.experience import chronology_key
+from utils.firebase import get_experience, listen_experiences
+from utils.metrics import inc, observe, set_gauge
+from utils.request import InstrumentedSession
+from utils.resilience import UpstreamUnavailable
+
+SEARCH_INDEX_ENABLED = os.environ.get("SEARCH_INDEX_ENABLED", "1") == "1"
+# The index runs in its own process (python -m searchd.run); web workers query it over HTTP
+SEARCH_INDEX_URL = os.environ.get("SEARCH_INDEX_URL", "http://127.0.0.1:8765").rstrip("/")
+SEARCH_INDEX_TIMEOUT = (0.5, float(os.environ.get("SEARCH_INDEX_TIMEOUT", 2)))
+# Change events in a row that may fail to apply before the stream is reopened for a fresh snapshot
+SEARCH_INDEX_MAX_ERRORS = int(os.environ.get("SEARCH_INDEX_MAX_ERRORS", 3))
+
+SEARCH_FIELDS = ("role_title", "server_name", "description")
+# Kept per approved experience so a partial update (e.g. an edit) can be re-indexed without a read
+STORED_FIELDS = SEARCH_FIELDS + ("status", "server_id", "server_icon", "user_id", "approved_by", "approved_at", "is_pinned", "start_month", "start_year", "end_month", "end_year")
+MAX_QUERY_TERMS = 8
+# Entries of the rarest term's list checked per request; bounds the cost of sparse multi-term queries
+MAX_SCAN = int(os.environ.get("SEARCH_MAX_SCAN", 5000))
+QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1)
+
+TOKEN_RE = re.compile(r"[^\W_]+")
+STOP_WORDS = frozenset(("a", "an", "and", "as", "at", "by", "for", "in", "is", "it", "of", "on", "or", "the", "to", "was", "with"))
+
+logger = logging.getLogger(__name__)
+
+
+def tokenize(text):
+    return [t for t in TOKEN_RE.findall(str(text).casefold()) if t not in STOP_WORDS]
+
+
+def _stored(exp):
+    return {k: exp[k] for k in STORED_FIELDS if k in exp}
+
+
+class SearchIndex:
+    """
+    In-process inverted index over approved experiences.
+    Each term maps to a list of (sort key, experience id) kept in ascending order, so a page of results
+    newest first is a bisect plus a short backwards walk instead of a sort of every match.
+    Only approved entries are held; fetch(exp_id) loads the full entry when one gets approved.
+    """
+    def __init__(self, fetch=None):
+        self.fetch = fetch
+        self._lock = threading.Lock()
+        self.docs = {}
+        self.keys = {}
+        self.terms = {}
+        self.postings = {}
+        self.ready = threading.Event()
+
+    def __len__(self):
+        return len(self.keys)
+
+    def rebuild(self, experiences):
+        """
+        Replaces the whole index from a full {experience id: experience} snapshot.
+        """
+        docs, keys, terms, postings = {}, {}, {}, {}
+        for exp_id, exp in experiences.items():
+            if not isinstance(exp, dict) or exp.get("status") != "approved":
+                continue
+            doc = docs[exp_id] = _stored(exp)
+            key = keys[exp_id] = (chronology_key(doc), exp_id)
+            doc_terms = terms[exp_id] = self._doc_terms(doc)
+            for term in doc_terms:
+                postings.setdefault(term, []).append(key)
+        for posting in postings.values():
+            posting.sort()
+        with self._lock:
+            self.docs, self.keys, self.terms, self.postings = docs, keys, terms, postings
+        self.ready.set()
+        inc("servercv_search_index_rebuilds_total")
+        self._report()
+
+    def upsert(self, exp_id, exp):
+        with self._lock:
+            self._unindex(exp_id)
+            if isinstance(exp, dict) and exp.get("status") == "approved":
+                self.docs[exp_id] = _stored(exp)
+                self._index(exp_id)
+            else:
+                self.docs.pop(exp_id, None)
+        self._report()
+
+    def update_fields(self, exp_id, keys, value):
+        # Only direct fields matter; nested subtrees such as history don't change what is indexed
+        if len(keys) != 1 or keys[0] not in STORED_FIELDS:
+            return
+        field = keys[0]
+        with self._lock:
+            doc = self.docs.get(exp_id)
+        if doc is None:
+            # Fields of entries that aren't approved aren't kept, so an approval needs the whole entry
+            if field == "status" and value == "approved" and self.fetch is not None:
+                self.upsert(exp_id, self.fetch(exp_id))
+            return
+        with self._lock:
+            self._unindex(exp_id)
+            if value is None:
+                doc.pop(field, None)
+            else:
+                doc[field] = value
+            if doc.get("status") == "approved":
+                self._index(exp_id)
+            else:
+                del self.docs[exp_id]
+        self._report()
+
+    def _doc_terms(self, doc):
+        terms = set()
+        for field in SEARCH_FIELDS:
+            if doc.get(field):
+                terms.update(tokenize(doc[field]))
+        return frozenset(terms)
+
+    def _index(self, exp_id):
+        doc = self.docs[exp_id]
+        key = self.keys[exp_id] = (chronology_key(doc), exp_id)
+        doc_terms = self.terms[exp_id] = self._doc_terms(doc)
+        for term in doc_terms:
+            insort(self.postings.setdefault(term, []), key)
+
+    def _unindex(self, exp_id):
+        key = self.keys.pop(exp_id, None)
+        if key is None:
+            return
+        for term in self.terms.pop(exp_id, ()):
+            posting = self.postings[term]
+            i = bisect_left(posting, key)
+            if i < len(posting) and posting[i] == key:
+                del posting[i]
+            if not posting:
+                del self.postings[term]
+
+    def _report(self):
+        set_gauge("servercv_search_index_documents", len(self.keys))
+        set_gauge("servercv_search_index_terms", len(self.postings))
+
+    def search(self, query, cursor=None, limit=20):
+        """
+        Returns ([(experience id, stored fields)], next_cursor) for experiences matching every query term,
+        newest first. The cursor is "<sort key>:<experience id>" of the last entry already covered, as in
+        get_server_registry_page; a page can come back short when MAX_SCAN is reached before it fills.
+        Raises ValueError for a malformed cursor.
+        """
+        start = perf_counter()
+        query_terms = list(dict.fromkeys(tokenize(query)))[:MAX_QUERY_TERMS]
+        after = None
+        if cursor:
+            key, _, exp_id = cursor.partition(":")
+            after = (int(key), exp_id)
+
+        results = []
+        resume_at = None
+        with self._lock:
+            postings = [self.postings.get(term) for term in query_terms]
+            if query_terms and all(postings):
+                # Walk the rarest term's list and check the others against each document's term set
+                posting = min(postings, key=len)
+                others = query_terms if len(query_terms) > 1 else ()
+                i = bisect_left(posting, after) if after else len(posting)
+                stop = max(0, i - MAX_SCAN)
+                while i > stop:
+                    i -= 1
+                    key = posting[i]
+                    if others and not self.terms[key[1]].issuperset(others):
+                        continue
+                    if len(results) == limit:
+                        resume_at = results[-1][0]
+                        break
+                    results.append((key, dict(self.docs[key[1]])))
+                else:
+                    if stop > 0:
+                        # Scan budget spent: the page may be short (even empty) but the cursor moves on
+                        resume_at = posting[stop]
+
+        observe("servercv_search_query_seconds", perf_counter() - start, buckets=QUERY_BUCKETS)
+        next_cursor = f"{resume_at[0]}:{resume_at[1]}" if resume_at else None
+        return [(key[1], doc) for key, doc in results], next_cursor
+
+    def on_event(self, event):
+        """
+        Applies one event from the Experiences change stream. A put at the root (the initial snapshot,
+        and again after every reconnect) rebuilds the index.
+        """
+        if event.event_type not in ("put", "patch"):
+            return
+        keys = [k for k in event.path.strip("/").split("/") if k]
+        if event.event_type == "put":
+            changes = [(keys, event.data)]
+        else:
+            changes = [(keys + [k for k in child.split("/") if k], value) for child, value in (event.data or {}).items()]
+
+        for change_keys, value in changes:
+            if not change_keys:
+                self.rebuild(value or {})
+            elif len(change_keys) == 1:
+                self.upsert(change_keys[0], value)
+            else:
+                self.update_fields(change_keys[0], change_keys[1:], value)
+
+
+search_index = SearchIndex(fetch=get_experience)
+_registration = None
+_running = False
+_errors = 0
+_start_lock = threading.Lock()
+# No retries: a query either answers within the page's budget or the page says search is unavailable
+_session = InstrumentedSession()
+
+
+class SearchUnavailable(Exception):
+    pass
+
+
+def _on_event(event):
+    """
+    Change stream callback. firebase_admin's listener thread dies silently on the first exception a
+    callback raises, so errors stop here; after SEARCH_INDEX_MAX_ERRORS in a row the index is marked
+    not ready and the stream is reopened, which rebuilds it from a fresh snapshot.
+    """
+    global _errors
+    try:
+        search_index.on_event(event)
+    except Exception:
+        _errors += 1
+        inc("servercv_search_index_errors_total")
+        logger.exception("Could not apply experience change to the search index (%d in a row)", _errors)
+        if _errors >= SEARCH_INDEX_MAX_ERRORS:
+            _errors = 0
+            search_index.ready.clear()
+            # close() joins this listener thread, so the stream is replaced from another one
+            threading.Thread(target=_resubscribe, name="search-resubscribe", daemon=True).start()
+    else:
+        _errors = 0
+
+
+def _resubscribe():
+    global _registration
+    with _start_lock:
+        registration, _registration = _registration, None
+    if registration is None:
+        return
+    registration.close()
+    delay = 1
+    while True:
+        try:
+            registration = listen_experiences(_on_event)
+            break
+        except Exception:
+            logger.warning("Could not reopen the experience change stream, retrying in %ds", delay, exc_info=True)
+            sleep(delay)
+            delay = min(delay * 2, 60)
+    with _start_lock:
+        if _running and _registration is None:
+            _registration = registration
+            logger.info("Search index resubscribed to experience changes")
+            return
+    registration.close()
+
+
+def start_search_index():
+    """
+    Subscribes the index to the Experiences change stream. The first event is the full snapshot,
+    so the index is ready once it has been applied. Only searchd.run calls this.
+    """
+    global _registration, _running
+    with _start_lock:
+        if _running:
+            return
+        _registration = listen_experiences(_on_event)
+        _running = True
+    logger.info("Search index subscribed to experience changes")
+
+
+def stop_search_index():
+    """
+    Closes the change stream. Its listener thread isn't a daemon, so the process can't exit until this runs.
+    """
+    global _registration, _running
+    with _start_lock:
+        registration, _registration = _registration, None
+        _running = False
+    if registration is not None:
+        registration.close()
+
+
+def query_search_index(query, cursor=None, limit=20):
+    """
+    Runs SearchIndex.search in the search process. Raises SearchUnavailable while it is down or still
+    loading, and ValueError for a malformed cursor.
+    """
+    if not SEARCH_INDEX_ENABLED:
+        raise SearchUnavailable()
+    params = {"q": query, "limit": limit}
+    if cursor:
+        params["cursor"] = cursor
+    try:
+        r = _session.get(f"{SEARCH_INDEX_URL}/search", params=params, timeout=SEARCH_INDEX_TIMEOUT)
+    except (requests.exceptions.RequestException, UpstreamUnavailable) as e:
+        raise SearchUnavailable() from e
+    if r.status_code == 400:
+        raise ValueError(r.json().get("error"))
+    if r.status_code != 200:
+        raise SearchUnavailable()
+    body = r.json()
+    return [(exp_id, doc) for exp_id, doc in body["results"]], body["next_cursor"]
@@ -0,0 +1,53 @@
+import os
+import re
+
+from flask import request, send_file
+
+from utils.metrics import inc
+
+SNAPSHOT_DIR = os.environ.get("SNAPSHOT_DIR", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "snapshots"))
+SNAPSHOT_MAX_AGE = int(os.environ.get("SNAPSHOT_MAX_AGE", 3600))
+
+CRAWLER_KEYWORDS = ("bot", "crawler", "spider", "scraper", "discordbot", "twitterbot", "facebookexternalhit")
+# /u/<id or vanity> and /s/<id or vanity>; anything else is served live
+SNAPSHOT_PATH_RE = re.compile(r"^/(u|s)/([A-Za-z0-9_]{1,64})/?$")
+SITEMAP_RE = re.compile(r"^sitemap(-\d{1,5})?\.xml$")
+
+
+def is_crawler(user_agent):
+    user_agent = (user_agent or "").lower()
+    return any(keyword in user_agent for keyword in CRAWLER_KEYWORDS)
+
+
+def snapshot_path(kind, name):
+    return os.path.join(SNAPSHOT_DIR, kind, f"{name}.html")
+
+
+def sitemap_path(filename):
+    """
+    Path of a generated sitemap file, or None if filename isn't one (sitemap.xml or sitemap-<n>.xml).
+    """
+    if not SITEMAP_RE.match(filename):
+        return None
+    return os.path.join(SNAPSHOT_DIR, filename)
+
+
+def init_snapshots(app):
+    """
+    Registers a request hook that answers crawler requests for public profiles from the prerendered
+    snapshots written by sitegen.run, before rate limiting or any Firebase/Discord call.
+    Profiles without a snapshot fall through to the live route.
+    """
+    @app.before_request
+    def serve_crawler_snapshot():
+        if request.method != "GET" or request.args:
+            return None
+        match = SNAPSHOT_PATH_RE.match(request.path)
+        if not match or not is_crawler(request.headers.get("User-Agent")):
+            return None
+        path = snapshot_path(*match.groups())
+        if not os.path.isfile(path):
+            inc("servercv_snapshot_requests_total", kind=match.group(1), result="miss")
+            return None
+        inc("servercv_snapshot_requests_total", kind=match.group(1), result="hit")
+        return send_file(path, mimetype="text/html", max_age=SNAPSHOT_MAX_AGE, conditional=True)
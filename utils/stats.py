@@ -0,0 +1,229 @@
+import logging
+import os
+import re
+from datetime import datetime, timezone
+
+from firebase_admin import db
+
+from utils.cache import TTLCache
+
+STATS_CACHE_TTL = int(os.environ.get("SERVER_STATS_CACHE_TTL", 30))
+_cache = TTLCache("server_stats", STATS_CACHE_TTL, maxsize=2000)
+
+# Characters Firebase doesn't allow in keys
+_KEY_UNSAFE = re.compile(r"[.$#\[\]/]+")
+ROLE_KEY_MAX = 64
+
+logger = logging.getLogger(__name__)
+
+# Server Stats/<server id> holds running sums over the server's approved experiences:
+#   approved, active                    counts (active = no end date)
+#   active_dated, active_start_sum      active entries with a valid start, and the sum of their start month indexes
+#   ended_dated, ended_tenure_sum       ended entries with valid dates, and the sum of their lengths in months
+#   roles/<key>                         {"label", "count"} of active entries per role title
+#   starts_by_year, ends_by_year        {year: count}, for staff over time
+#   complete                            set once the node was computed from all of the server's entries
+# Average tenure is derived at read time, so ongoing tenure keeps growing without rewriting anything.
+# Changes are only folded into complete nodes; a server without one (it predates stats, or has no
+# approved entries yet) is computed from its entries on the next read.
+
+
+def month_index(year, month):
+    try:
+        year, month = int(year), int(month)
+    except (TypeError, ValueError):
+        return None
+    if not 1 <= month <= 12:
+        return None
+    return year * 12 + month - 1
+
+
+def role_key(title):
+    key = " ".join(_KEY_UNSAFE.sub(" ", str(title or "")).casefold().split())
+    return key[:ROLE_KEY_MAX]
+
+
+def contribution(exp):
+    """
+    The amounts one experience adds to its server's stats, as {(path...): amount}. Only approved entries count.
+    """
+    if not exp or exp.get("status") != "approved":
+        return {}
+    start = month_index(exp.get("start_year"), exp.get("start_month"))
+    ended = bool(exp.get("end_year"))
+    end = month_index(exp.get("end_year"), exp.get("end_month")) if ended else None
+
+    delta = {("approved",): 1}
+    if not ended:
+        delta[("active",)] = 1
+        key = role_key(exp.get("role_title"))
+        if key:
+            delta[("roles", key, "count")] = 1
+        if start is not None:
+            delta[("active_dated",)] = 1
+            delta[("active_start_sum",)] = start
+    elif start is not None and end is not None:
+        delta[("ended_dated",)] = 1
+        delta[("ended_tenure_sum",)] = max(0, end - start)
+        delta[("ends_by_year", str(end // 12))] = 1
+    if start is not None:
+        delta[("starts_by_year", str(start // 12))] = 1
+    return delta
+
+
+def diff(before, after):
+    delta = dict(contribution(after))
+    for path, amount in contribution(before).items():
+        delta[path] = delta.get(path, 0) - amount
+    return {path: amount for path, amount in delta.items() if amount}
+
+
+def _add(stats, delta):
+    for path, amount in delta.items():
+        node = stats
+        for key in path[:-1]:
+            node = node.setdefault(key, {})
+        node[path[-1]] = node.get(path[-1], 0) + amount
+
+
+def _finish(stats, labels):
+    roles = stats.get("roles") or {}
+    for key, label in labels.items():
+        if key in roles:
+            roles[key]["label"] = label
+    # Drop emptied buckets so the node stays small
+    for section in ("roles", "starts_by_year", "ends_by_year"):
+        entries = stats.get(section) or {}
+        for key in [k for k, v in entries.items() if (v.get("count", 0) if isinstance(v, dict) else v) <= 0]:
+            del entries[key]
+    return stats
+
+
+def _apply(stats, delta, labels):
+    _add(stats, delta)
+    return _finish(stats, labels)
+
+
+def record_experience_changes(changes):
+    """
+    Folds [(before, after)] experience snapshots (None for a missing entry) into the affected servers'
+    stats, one transaction per server. Called after approve, edit, end and delete writes.
+    """
+    by_server = {}
+    for before, after in changes:
+        exp = after or before
+        if not exp or not exp.get("server_id"):
+            continue
+        delta = diff(before, after)
+        if not delta:
+            continue
+        server_delta, labels = by_server.setdefault(str(exp["server_id"]), ({}, {}))
+        for path, amount in delta.items():
+            server_delta[path] = server_delta.get(path, 0) + amount
+        key = role_key((after or {}).get("role_title"))
+        if ("roles", key, "count") in contribution(after):
+            labels[key] = after.get("role_title")
+
+    for server_id, (delta, labels) in by_server.items():
+        try:
+            db.reference(f"Server Stats/{server_id}").transaction(lambda current: _apply(current, delta, labels) if current and current.get("complete") else current)
+        except Exception:
+            # The next backfill_server_stats run repairs a missed update
+            logger.exception("Could not update stats for server %s", server_id)
+        _cache.delete(server_id)
+
+
+def record_experience_change(before, after):
+    record_experience_changes([(before, after)])
+
+
+def get_server_stats(server_id, now=None):
+    """
+    Reads Server Stats/<server id> and derives the figures shown on the server profile, or None if the
+    server has no approved experiences.
+    """
+    stats = _cache.get(server_id)
+    if stats is None:
+        stats = db.reference(f"Server Stats/{server_id}").get() or {}
+        if not stats.get("complete"):
+            stats = compute_stored_stats(server_id)
+        _cache.set(server_id, stats)
+    if stats.get("approved", 0) <= 0:
+        return None
+
+    now = now or datetime.now(timezone.utc)
+    now_index = now.year * 12 + now.month - 1
+    dated = stats.get("active_dated", 0) + stats.get("ended_dated", 0)
+    tenure_sum = stats.get("ended_tenure_sum", 0) + stats.get("active_dated", 0) * now_index - stats.get("active_start_sum", 0)
+    roles = sorted(((r.get("label") or key, r.get("count", 0)) for key, r in (stats.get("roles") or {}).items() if r.get("count", 0) > 0), key=lambda r: (-r[1], r[0]))
+
+    starts = {int(y): n for y, n in (stats.get("starts_by_year") or {}).items()}
+    ends = {int(y): n for y, n in (stats.get("ends_by_year") or {}).items()}
+    staff_by_year = []
+    if starts:
+        staff = 0
+        for year in range(min(starts), now.year + 1):
+            staff += starts.get(year, 0) - ends.get(year, 0)
+            staff_by_year.append((year, max(0, staff)))
+
+    return {
+        "approved": stats.get("approved", 0),
+        "active": max(0, stats.get("active", 0)),
+        "average_tenure_months": tenure_sum / dated if dated else None,
+        "roles": roles,
+        "staff_by_year": staff_by_year,
+    }
+
+
+def compute_server_stats(experiences):
+    """
+    Builds every server's stats from {experience id: experience} in one pass.
+    """
+    by_server = {}
+    labels = {}
+    for exp in experiences.values():
+        if not isinstance(exp, dict) or not exp.get("server_id"):
+            continue
+        delta = contribution(exp)
+        if not delta:
+            continue
+        server_id = str(exp["server_id"])
+        _add(by_server.setdefault(server_id, {}), delta)
+        key = role_key(exp.get("role_title"))
+        if ("roles", key, "count") in delta:
+            labels.setdefault(server_id, {})[key] = exp.get("role_title")
+    for server_id, stats in by_server.items():
+        _finish(stats, labels.get(server_id, {}))
+        stats["complete"] = True
+    return by_server
+
+
+def compute_stored_stats(server_id):
+    """
+    Computes one server's stats from its entries and stores them, unless a complete node was written
+    meanwhile. Queries Firebase directly: the registry cache can be seconds behind.
+    """
+    experiences = db.reference("Experiences").order_by_child("server_id").equal_to(server_id).get() or {}
+    stats = compute_server_stats(experiences).get(str(server_id)) or {"complete": True}
+    try:
+        return db.reference(f"Server Stats/{server_id}").transaction(lambda current: current if current and current.get("complete") else stats) or stats
+    except Exception:
+        logger.exception("Could not store stats for server %s", server_id)
+        return stats
+
+
+def backfill_server_stats():
+    """
+    One-off (and repair): recomputes Server Stats for every server from a single read of Experiences.
+    Returns the number of servers written.
+    """
+    experiences = db.reference("Experiences").get() or {}
+    stats = compute_server_stats(experiences)
+    existing = db.reference("Server Stats").get(shallow=True) or {}
+    # Servers without approved entries keep an empty complete node, so reads don't recompute them
+    updates = {server_id: {"complete": True} for server_id in existing if server_id not in stats}
+    updates.update(stats)
+    if updates:
+        db.reference("Server Stats").update(updates)
+    _cache.clear()
+    return len(stats)
@@ -145,6 +145,17 @@ def wrap_page(title, content, nav_links=None, favicon_url=None, csrf_token=None)
     """
 
 
+PAGE_CONTENT_MARKER = "<!--servercv:content-->"
+
+
+def wrap_page_parts(title, nav_links=None, favicon_url=None, csrf_token=None):
+    """
+    Returns (head, tail) of a wrapped page, for responses that stream the content in between
+    """
+    head, tail = wrap_page(title, PAGE_CONTENT_MARKER, nav_links, favicon_url, csrf_token).split(PAGE_CONTENT_MARKER)
+    return head, tail
+
+
 def error_page(message, status_code=400):
     content = f"""
     <div class="max-w-md mx-auto">
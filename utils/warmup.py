@@ -0,0 +1,141 @@
+import logging
+import os
+import re
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, wait
+from time import perf_counter, sleep
+
+from firebase_admin import db
+
+from utils.metrics import inc, set_gauge
+
+WARMUP_ENABLED = os.environ.get("WARMUP_ENABLED", "1") != "0"
+WARMUP_KEYS_PER_KIND = int(os.environ.get("WARMUP_KEYS_PER_KIND", 200))
+WARMUP_CONCURRENCY = int(os.environ.get("WARMUP_CONCURRENCY", 16))
+WARMUP_TIMEOUT = float(os.environ.get("WARMUP_TIMEOUT", 20))
+
+ACCESS_STATS_ENABLED = os.environ.get("ACCESS_STATS_ENABLED", "1") != "0"
+ACCESS_STATS_FLUSH_INTERVAL = float(os.environ.get("ACCESS_STATS_FLUSH_INTERVAL", 300))
+# Stored scores are multiplied by this on every flush, so "hot" means recently hot
+ACCESS_STATS_DECAY = float(os.environ.get("ACCESS_STATS_DECAY", 0.5))
+ACCESS_STATS_MAX_KEYS = int(os.environ.get("ACCESS_STATS_MAX_KEYS", 1000))
+
+# Access Stats/<kind>/<key> holds a decayed access count, merged in by every process that serves the key
+ACCESS_STATS_PATH = "Access Stats"
+# Keys Firebase can't store are simply not tracked
+_KEY_UNSAFE = re.compile(r"[.$#\[\]/]")
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_counts = {}
+_local = threading.local()
+_flusher = None
+
+
+def record_access(kind, key):
+    """
+    Counts one lookup of key for the next access stats flush. Lookups made by the warm-up itself
+    aren't counted, so preloading doesn't keep a key hot.
+    """
+    if not ACCESS_STATS_ENABLED or getattr(_local, "warming", False):
+        return
+    key = str(key)
+    if not key or _KEY_UNSAFE.search(key):
+        return
+    with _lock:
+        _counts.setdefault(kind, Counter())[key] += 1
+
+
+def merge_scores(current, counts):
+    scores = {key: score * ACCESS_STATS_DECAY for key, score in (current or {}).items() if isinstance(score, (int, float))}
+    for key, count in counts.items():
+        scores[key] = scores.get(key, 0) + count
+    top = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:ACCESS_STATS_MAX_KEYS]
+    return {key: round(score, 3) for key, score in top if score >= 0.01}
+
+
+def flush_access_stats():
+    """
+    Merges the counts gathered since the last flush into Access Stats, one transaction per kind.
+    """
+    global _counts
+    with _lock:
+        counts, _counts = _counts, {}
+    for kind, kind_counts in counts.items():
+        try:
+            db.reference(f"{ACCESS_STATS_PATH}/{kind}").transaction(lambda current: merge_scores(current, kind_counts))
+        except Exception:
+            logger.warning("Could not flush access stats for %s", kind, exc_info=True)
+
+
+def start_access_stats():
+    """
+    Starts the background thread that flushes access counts every ACCESS_STATS_FLUSH_INTERVAL seconds.
+    """
+    global _flusher
+    if not ACCESS_STATS_ENABLED:
+        return
+    with _lock:
+        if _flusher is not None:
+            return
+
+        def run():
+            while True:
+                sleep(ACCESS_STATS_FLUSH_INTERVAL)
+                flush_access_stats()
+
+        _flusher = threading.Thread(target=run, name="access-stats", daemon=True)
+        _flusher.start()
+
+
+def hot_keys(scores, limit):
+    return [key for key, _ in sorted((scores or {}).items(), key=lambda item: item[1], reverse=True)[:limit]]
+
+
+def _load(load, key):
+    _local.warming = True
+    try:
+        load(key)
+    finally:
+        _local.warming = False
+
+
+def warm_up(loaders, name, limit=WARMUP_KEYS_PER_KIND, workers=WARMUP_CONCURRENCY, timeout=WARMUP_TIMEOUT):
+    """
+    Preloads the hottest keys of each kind by calling loaders[kind](key), which is expected to fill
+    its cache as a side effect. Runs at most workers loads at once and gives up on whatever is left
+    after timeout seconds. Returns (keys loaded, seconds taken).
+    """
+    if not WARMUP_ENABLED:
+        return 0, 0.0
+    started = perf_counter()
+    try:
+        stats = db.reference(ACCESS_STATS_PATH).get() or {}
+    except Exception:
+        logger.warning("Skipping %s warm-up, access stats unavailable", name, exc_info=True)
+        return 0, 0.0
+
+    jobs = [(kind, key) for kind in loaders for key in hot_keys(stats.get(kind), limit)]
+    pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="warmup")
+    futures = {pool.submit(_load, loaders[kind], key): kind for kind, key in jobs}
+    done, _ = wait(futures, timeout=timeout)
+    # Loads still running finish in the background; queued ones are dropped
+    pool.shutdown(wait=False, cancel_futures=True)
+
+    loaded = 0
+    for future, kind in futures.items():
+        if future not in done:
+            result = "timeout"
+        elif future.exception() is not None:
+            result = "error"
+        else:
+            result = "loaded"
+            loaded += 1
+        inc("servercv_warmup_keys_total", kind=kind, result=result)
+
+    elapsed = perf_counter() - started
+    set_gauge("servercv_warmup_seconds", elapsed, process=name)
+    logger.info("Warmed %d of %d hot keys for %s in %.2fs", loaded, len(jobs), name, elapsed)
+    return loaded, elapsed